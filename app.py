@@ -1,30 +1,30 @@
 import json
 import os
 import shutil
+import time
 from datetime import datetime
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi import FastAPI, Request, Form, File, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from typing import Optional
 import re
-from pyswip import Prolog
 
 # Import parser functions from the new modular parser
-from parser import parse_input, query_prolog, add_fact_to_prolog
+from parser import parse_input, query_prolog, add_fact_to_prolog, ingest_statements
+from provenance import get_provenance_log, apply_change
+from tracing import trace, append_trace_log
+from metrics import REQUEST_LATENCY, REQUESTS, REQUESTS_IN_FLIGHT, register_collector, render_metrics
+from logs import get_logger
 
 def cleanup_unsaved_chats():
     """Clean up any chat folders that don't have save flags at startup."""
-    print("Starting cleanup of unsaved chats...")
-    
     if not os.path.exists("chats"):
-        print("chats directory does not exist, nothing to clean up")
         return
     
     # Get all chat folders
     try:
         chat_folders = [f for f in os.listdir("chats") if f.startswith("chat_")]
-        print(f"Found {len(chat_folders)} chat folders")
         
         deleted_count = 0
         for folder in chat_folders:
@@ -33,20 +33,19 @@ def cleanup_unsaved_chats():
             
             # Check if this chat has a save flag
             if not os.path.exists(saved_flag_file):
-                print(f"Deleting unsaved chat folder: {folder}")
+                log.debug("deleting unsaved chat folder", folder=folder)
                 try:
                     shutil.rmtree(chat_folder)
                     deleted_count += 1
-                    print(f"Successfully deleted {folder}")
                 except Exception as e:
-                    print(f"Error deleting {folder}: {e}")
+                    log.error("error deleting unsaved chat folder", folder=folder, error=e)
             else:
-                print(f"Keeping saved chat folder: {folder}")
+                log.debug("keeping saved chat folder", folder=folder)
         
-        print(f"Cleanup complete. Deleted {deleted_count} unsaved chat folders.")
+        log.info("cleaned up unsaved chats", folders=len(chat_folders), deleted=deleted_count)
         
     except Exception as e:
-        print(f"Error during cleanup: {e}")
+        log.error("error during cleanup", error=e)
 
 app = FastAPI()
 
@@ -59,6 +58,47 @@ templates = Jinja2Templates(directory="templates")
 # Global variable to track current chat session
 current_chat_session = None
 
+log = get_logger("app")
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request for /metrics, labelled by route template rather than raw path"""
+    start = time.perf_counter()
+    REQUESTS_IN_FLIGHT.inc()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route=path, method=request.method)
+        REQUESTS.inc(route=path, method=request.method, status=status)
+
+def session_samples():
+    """Chat sessions and the worker threads that run the (synchronous) endpoints, for /metrics."""
+    import anyio.to_thread
+    
+    chat_folders = [f for f in os.listdir("chats") if f.startswith("chat_")] if os.path.exists("chats") else []
+    limiter = anyio.to_thread.current_default_thread_limiter().statistics()
+    return [
+        ("family_chat_sessions", {}, len(chat_folders)),
+        ("family_chat_session_active", {}, 1 if current_chat_session else 0),
+        ("family_executor_threads_busy", {}, limiter.borrowed_tokens),
+        ("family_executor_threads_limit", {}, limiter.total_tokens),
+        ("family_executor_queue_depth", {}, limiter.tasks_waiting),
+    ]
+
+register_collector({
+    "family_chat_sessions": ("gauge", "Chat session folders on disk."),
+    "family_chat_session_active": ("gauge", "Whether a chat session is open."),
+    "family_executor_threads_busy": ("gauge", "Worker threads running synchronous endpoints."),
+    "family_executor_threads_limit": ("gauge", "Worker threads available to synchronous endpoints."),
+    "family_executor_queue_depth": ("gauge", "Requests waiting for a worker thread."),
+}, session_samples)
+
 def create_chat_session():
     """Create a new chat session with its own folder and knowledge base."""
     global current_chat_session
@@ -96,76 +136,56 @@ def create_chat_session():
 
 def check_saved_chat_exists():
     """Check if there's a saved chat session available."""
-    print("check_saved_chat_exists called")
-    
     if not os.path.exists("chats"):
-        print("chats directory does not exist")
         return False
     
     # Find the most recent chat folder
     chat_folders = [f for f in os.listdir("chats") if f.startswith("chat_")]
-    print(f"Found chat folders: {chat_folders}")
     
     if not chat_folders:
-        print("No chat folders found")
         return False
     
     # Sort by timestamp and get the most recent
     chat_folders.sort(reverse=True)
     latest_folder = chat_folders[0]
     chat_folder = os.path.join("chats", latest_folder)
-    print(f"Checking folder: {chat_folder}")
     
     # Check if this chat session has been saved (has a saved flag)
     saved_flag_file = os.path.join(chat_folder, "saved.flag")
-    print(f"Saved flag exists: {os.path.exists(saved_flag_file)}")
     
     if not os.path.exists(saved_flag_file):
-        print("No saved flag found")
+        log.debug("latest chat is not saved", folder=chat_folder)
         return False
     
     kb_file = os.path.join(chat_folder, "relationships.pl")
     history_file = os.path.join(chat_folder, "chat_history.json")
     
-    print(f"KB file exists: {os.path.exists(kb_file)}")
-    print(f"History file exists: {os.path.exists(history_file)}")
-    
     if not os.path.exists(kb_file) or not os.path.exists(history_file):
-        print("Required files missing")
+        log.warning("saved chat is missing files", folder=chat_folder)
         return False
     
-    print("Saved chat exists")
     return True
 
 def load_last_chat_session():
     """Load the most recent saved chat session."""
     global current_chat_session
     
-    print("load_last_chat_session called")
-    
     if not check_saved_chat_exists():
-        print("No saved chat exists")
         return None
     
     # Find the most recent chat folder
     chat_folders = [f for f in os.listdir("chats") if f.startswith("chat_")]
-    print(f"Found chat folders: {chat_folders}")
     
     if not chat_folders:
-        print("No chat folders found")
         return None
     
     chat_folders.sort(reverse=True)
     latest_folder = chat_folders[0]
     chat_folder = os.path.join("chats", latest_folder)
-    print(f"Loading from folder: {chat_folder}")
     
     kb_file = os.path.join(chat_folder, "relationships.pl")
     history_file = os.path.join(chat_folder, "chat_history.json")
     
-    print(f"KB file exists: {os.path.exists(kb_file)}")
-    print(f"History file exists: {os.path.exists(history_file)}")
-    
     current_chat_session = {
         "folder": chat_folder,
         "kb_file": kb_file,
@@ -173,15 +193,13 @@ def load_last_chat_session():
         "timestamp": latest_folder.replace("chat_", "")
     }
     
-    print(f"Loaded chat session: {current_chat_session}")
+    log.info("loaded chat session", folder=chat_folder)
     return current_chat_session
 
 def save_chat_session():
     """Mark the current chat session as saved."""
     global current_chat_session
     
-    print(f"save_chat_session called. Current session: {current_chat_session}")
-    
     if current_chat_session:
         # Check if there's already a saved chat that's different from current
         existing_saved = None
@@ -196,53 +214,45 @@ def save_chat_session():
         
         # If there's an existing saved chat, delete it first
         if existing_saved:
-            print(f"Deleting existing saved chat: {existing_saved}")
+            log.info("replacing saved chat", folder=existing_saved)
             try:
                 shutil.rmtree(existing_saved)
-                print("Existing saved chat deleted")
             except Exception as e:
-                print(f"Error deleting existing saved chat: {e}")
+                log.error("error deleting existing saved chat", folder=existing_saved, error=e)
         
         # Mark current session as saved
         saved_flag_file = os.path.join(current_chat_session["folder"], "saved.flag")
-        print(f"Creating saved flag file: {saved_flag_file}")
         try:
             with open(saved_flag_file, "w") as f:
                 f.write("saved")
-            print("Saved flag file created successfully")
+            log.info("saved chat session", folder=current_chat_session["folder"])
             return True
         except Exception as e:
-            print(f"Error creating saved flag file: {e}")
+            log.error("error creating saved flag file", path=saved_flag_file, error=e)
             return False
     else:
-        print("No current session to save")
+        log.warning("no current session to save")
         return False
 
 def delete_chat_session():
     """Delete the current chat session folder."""
     global current_chat_session
     
-    print(f"Attempting to delete chat session: {current_chat_session}")
-    
     if current_chat_session:
-        print(f"Current session folder: {current_chat_session['folder']}")
-        print(f"Folder exists: {os.path.exists(current_chat_session['folder'])}")
-        
         if os.path.exists(current_chat_session["folder"]):
-            print(f"Deleting folder: {current_chat_session['folder']}")
             try:
                 shutil.rmtree(current_chat_session["folder"])
-                print("Chat session deleted successfully")
+                log.info("deleted chat session", folder=current_chat_session["folder"])
                 current_chat_session = None
                 return True
             except Exception as e:
-                print(f"Error deleting folder: {e}")
+                log.error("error deleting chat session", folder=current_chat_session["folder"], error=e)
                 return False
         else:
-            print(f"Folder does not exist: {current_chat_session['folder']}")
+            log.warning("chat session folder does not exist", folder=current_chat_session["folder"])
             return False
     else:
-        print("No current chat session to delete")
+        log.warning("no current chat session to delete")
         return False
 
 def get_chat_history():
@@ -274,6 +284,22 @@ def get_current_kb_file():
         return current_chat_session["kb_file"]
     return "relationships.pl"
 
+def use_current_kb_file():
+    """Point the parser modules at the current session's knowledge base file."""
+    import parser
+    import fact_manager
+    import validation
+    import query_handler
+    import clarification
+    
+    # Update the current_kb_file in all modules
+    current_kb_file = get_current_kb_file()
+    parser.current_kb_file = current_kb_file
+    fact_manager.current_kb_file = current_kb_file
+    validation.current_kb_file = current_kb_file
+    query_handler.current_kb_file = current_kb_file
+    clarification.current_kb_file = current_kb_file
+
 @app.get("/", response_class=HTMLResponse)
 def index(request: Request):
     """Main landing page with app description and options"""
@@ -299,28 +325,22 @@ def load_chat(request: Request):
     """Load the last saved chat session"""
     global current_chat_session
     
-    print(f"Load chat request received. Current session: {current_chat_session}")
-    
     # Check if current session is already a saved session
     if current_chat_session and os.path.exists(os.path.join(current_chat_session["folder"], "saved.flag")):
-        print("Current session is already a saved session, redirecting with mode=load")
         return RedirectResponse(url="/menu-chat?mode=load")
     
     # If there's a current session that's not saved, delete it
     if current_chat_session:
-        print("Deleting unsaved current session before loading saved chat")
+        log.debug("deleting unsaved session before loading saved chat", folder=current_chat_session["folder"])
         delete_chat_session()
     
     # Try to load the last saved chat
-    print("Attempting to load last saved chat session")
     session = load_last_chat_session()
-    print(f"Load result: {session}")
     
     if session:
-        print("Successfully loaded saved chat, redirecting with mode=load")
         return RedirectResponse(url="/menu-chat?mode=load")
     else:
-        print("No saved chat found, creating new session")
+        log.info("no saved chat found, creating new session")
         # If no saved chat exists, create a new one
         create_chat_session()
         return RedirectResponse(url="/menu-chat")
@@ -357,24 +377,20 @@ async def process_menu_chat(request: Request, message: str = Form(...), chat_his
         create_chat_session()
     
     # Set the knowledge base file for the parser modules
-    import parser
-    import fact_manager
-    import validation
-    import query_handler
+    use_current_kb_file()
     
-    # Update the current_kb_file in all modules
-    current_kb_file = get_current_kb_file()
-    parser.current_kb_file = current_kb_file
-    fact_manager.current_kb_file = current_kb_file
-    validation.current_kb_file = current_kb_file
-    query_handler.current_kb_file = current_kb_file
-    
-    try:
-        # Parse and process the message
-        response = parse_input(message.strip())
-    except Exception as e:
-        print(f"Error processing message: {e}")
-        response = f"Error processing message: {str(e)}"
+    # Record which facts this message adds or removes, and where its time goes
+    provenance = get_provenance_log(get_current_kb_file())
+    provenance.begin()
+    with trace("chat", request.headers.get("x-request-id", "")) as turn:
+        try:
+            # Parse and process the message
+            response = parse_input(message.strip())
+        except Exception as e:
+            log.error("error processing message", error=e)
+            response = f"Error processing message: {str(e)}"
+    provenance.end(message.strip())
+    append_trace_log(get_current_kb_file(), turn)
     
     # Parse existing chat history
     try:
@@ -392,18 +408,94 @@ async def process_menu_chat(request: Request, message: str = Form(...), chat_his
     # Save the updated history
     save_chat_history(history_list)
     
-    return templates.TemplateResponse("menu_chat.html", {
+    page = templates.TemplateResponse("menu_chat.html", {
         "request": request, 
         "chat_history": history_list,
         "current_session_folder": current_chat_session["folder"] if current_chat_session else None
     })
+    page.headers["Server-Timing"] = turn.server_timing()
+    page.headers["X-Request-ID"] = turn.request_id
+    return page
+
+@app.post("/ingest")
+async def ingest(request: Request, text: Optional[str] = Form(None), file: Optional[UploadFile] = File(None), policy: Optional[str] = Form(None)):
+    """Add a paragraph or file of statements to the current session in one pass
+
+    Follow-up questions are answered by the clarification policy; questions about which
+    side of the family a grandparent, aunt or uncle is on are always deferred.
+    """
+    global current_chat_session
+    from clarification import CLARIFICATION_POLICIES
+    
+    if policy and policy not in CLARIFICATION_POLICIES:
+        return JSONResponse(status_code=400, content={"error": f"policy must be one of {', '.join(CLARIFICATION_POLICIES)}"})
+    
+    content = text or ""
+    if file is not None:
+        content += "\n" + (await file.read()).decode("utf-8", errors="replace")
+    if not content.strip():
+        return JSONResponse(status_code=400, content={"error": "No statements provided."})
+    
+    # Ensure we have a current session
+    if not current_chat_session:
+        create_chat_session()
+    use_current_kb_file()
+    
+    provenance = get_provenance_log(get_current_kb_file())
+    provenance.begin()
+    try:
+        with trace("ingest", request.headers.get("x-request-id", "")) as turn:
+            results = ingest_statements(content, policy or "")
+    except Exception as e:
+        log.error("error ingesting statements", error=e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    finally:
+        # Each statement is recorded on its own; this only keeps what the writes changed
+        # beyond them, such as placeholder parents merged into real ones
+        provenance.end("Ingest: facts merged while writing the batch", kind="ingest")
+    append_trace_log(get_current_kb_file(), turn)
+    
+    summary = {}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    # Questions the policy left for a person, to be answered by resending those statements in the chat
+    deferred = [{"line": r["line"], "statement": r["statement"], "question": r["message"]} for r in results if r["status"] == "deferred"]
+    return JSONResponse(content={"summary": summary, "results": results, "deferred": deferred},
+                        headers={"Server-Timing": turn.server_timing(), "X-Request-ID": turn.request_id})
+
+@app.post("/import-gedcom")
+def import_gedcom_file(file: UploadFile = File(...), validation: str = Form("deferred")):
+    """Stream a GEDCOM file into the current session's knowledge base"""
+    import io
+    from gedcom_import import import_gedcom, VALIDATION_MODES
+    from fact_manager import FactManager
+    from validation import RelationshipValidator
+    
+    if validation not in VALIDATION_MODES:
+        return JSONResponse(status_code=400, content={"error": f"validation must be one of {', '.join(VALIDATION_MODES)}"})
+    
+    # Ensure we have a current session
+    if not current_chat_session:
+        create_chat_session()
+    use_current_kb_file()
+    
+    provenance = get_provenance_log(get_current_kb_file())
+    provenance.begin()
+    try:
+        lines = io.TextIOWrapper(file.file, encoding="utf-8", errors="replace")
+        report = import_gedcom(lines, get_current_kb_file(), FactManager(), RelationshipValidator(), validation)
+    except Exception as e:
+        log.error("error importing gedcom file", filename=file.filename, error=e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    finally:
+        provenance.end(f"GEDCOM import: {file.filename}", kind="gedcom")
+    
+    return JSONResponse(content=report)
 
 @app.post("/save-chat")
 async def save_chat(request: Request):
     """Save the current chat session"""
-    print("Save chat request received")
     success = save_chat_session()
-    print(f"Save result: {success}")
     return JSONResponse(content={"success": success})
 
 @app.post("/delete-chat")
@@ -415,26 +507,123 @@ async def delete_chat(request: Request):
     body = await request.json()
     session_folder = body.get("session_folder", "")
     
-    print(f"Delete request received. Session folder: {session_folder}")
-    print(f"Current session: {current_chat_session}")
-    
     # If we have a session folder from the frontend, use it
     if session_folder and os.path.exists(session_folder):
-        print(f"Deleting folder from request: {session_folder}")
         try:
             shutil.rmtree(session_folder)
             current_chat_session = None
-            print("Chat session deleted successfully")
+            log.info("deleted chat session", folder=session_folder)
             return JSONResponse(content={"success": True})
         except Exception as e:
-            print(f"Error deleting folder: {e}")
+            log.error("error deleting chat session", folder=session_folder, error=e)
             return JSONResponse(content={"success": False})
     
     # Fallback to current session
     success = delete_chat_session()
-    print(f"Delete chat session result: {success}")
     return JSONResponse(content={"success": success})
 
+@app.get("/relations/{relation}")
+def list_relation_pairs(relation: str):
+    """Return every pair of people in a relation for the current session, computed in bulk"""
+    from kinship_matrix import relation_pairs, SUPPORTED_RELATIONS
+    
+    if relation not in SUPPORTED_RELATIONS:
+        return JSONResponse(status_code=404, content={"error": f"Unsupported relation: {relation}", "supported": SUPPORTED_RELATIONS})
+    
+    try:
+        pairs = relation_pairs(get_current_kb_file(), relation)
+    except RuntimeError as e:
+        return JSONResponse(status_code=501, content={"error": str(e)})
+    except Exception as e:
+        log.error("error computing relation pairs", relation=relation, error=e)
+        return JSONResponse(status_code=500, content={"error": str(e)})
+    
+    return JSONResponse(content={"relation": relation, "count": len(pairs), "pairs": [list(pair) for pair in pairs]})
+
+@app.get("/export")
+def export_session(format: str = "csv", derived: str = ""):
+    """Stream the current session's facts, and optionally derived relations, as CSV, NDJSON or GEDCOM"""
+    from exporter import export_stream, EXPORT_FORMATS
+    from kinship_matrix import SUPPORTED_RELATIONS, matrices_available
+    
+    if format not in EXPORT_FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"})
+    
+    # derived=all or a comma-separated list such as derived=sibling_of,cousin_of
+    relations = SUPPORTED_RELATIONS if derived == "all" else [r.strip() for r in derived.split(",") if r.strip()]
+    unknown = [r for r in relations if r not in SUPPORTED_RELATIONS]
+    if unknown:
+        return JSONResponse(status_code=400, content={"error": f"Unsupported relations: {', '.join(unknown)}", "supported": SUPPORTED_RELATIONS})
+    if relations and format != "gedcom" and not matrices_available():
+        return JSONResponse(status_code=501, content={"error": "NumPy is required to export derived relations."})
+    
+    kb_file = get_current_kb_file()
+    extension = "ged" if format == "gedcom" else format
+    return StreamingResponse(
+        export_stream(kb_file, format, relations),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename=family.{extension}"}
+    )
+
+@app.get("/provenance")
+def list_provenance(fact: Optional[str] = None):
+    """List the statements of the current session and what they changed, or the statements behind one fact"""
+    provenance = get_provenance_log(get_current_kb_file())
+    if fact:
+        return JSONResponse(content={"fact": fact.strip(), **provenance.producers(fact)})
+    return JSONResponse(content={"statements": provenance.history()})
+
+@app.get("/provenance/{statement_id}")
+def statement_provenance(statement_id: int):
+    """Return the facts one statement added and removed"""
+    record = get_provenance_log(get_current_kb_file()).statement(statement_id)
+    if record is None:
+        return JSONResponse(status_code=404, content={"error": f"No statement with id {statement_id}"})
+    return JSONResponse(content=record)
+
+@app.post("/provenance/{statement_id}/retract")
+def retract_statement(statement_id: int):
+    """Reverse the effects of one statement, leaving facts other statements also produced"""
+    use_current_kb_file()
+    provenance = get_provenance_log(get_current_kb_file())
+    record = provenance.statement(statement_id)
+    if record is None:
+        return JSONResponse(status_code=404, content={"error": f"No statement with id {statement_id}"})
+    if statement_id in provenance.retracted:
+        return JSONResponse(status_code=409, content={"error": f"Statement {statement_id} was already retracted"})
+    if statement_id not in provenance.applied:
+        return JSONResponse(status_code=409, content={"error": f"Statement {statement_id} is not in effect; it was undone"})
+    
+    remove, restore = provenance.retraction_for(statement_id)
+    message = apply_change(get_current_kb_file(), remove, restore, f"Retract: {record['statement']}", "retract", retracts=statement_id)
+    if message.startswith("Error"):
+        return JSONResponse(status_code=500, content={"error": message})
+    return JSONResponse(content={"message": message, "removed": remove, "restored": restore})
+
+@app.get("/profile/queries")
+def query_profile(top: int = 20, sort: str = "total"):
+    """List the Prolog query templates that cost the most, by total time, calls, mean, p95 or rows"""
+    from query_profile import get_query_profiler, QueryProfiler
+    
+    if sort not in QueryProfiler.SORT_KEYS:
+        return JSONResponse(status_code=400, content={"error": f"sort must be one of {', '.join(QueryProfiler.SORT_KEYS)}"})
+    profiler = get_query_profiler()
+    return JSONResponse(content={"templates": len(profiler.templates), "top": profiler.top(top, sort)})
+
+@app.post("/profile/queries/reset")
+def reset_query_profile():
+    """Start profiling Prolog queries from scratch"""
+    from query_profile import get_query_profiler
+    
+    get_query_profiler().reset()
+    return JSONResponse(content={"success": True})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request latency per route, sessions, engines, consults, KB sizes and caches"""
+    # Runs on the event loop, where the worker thread statistics can be read
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.get("/exit", response_class=HTMLResponse)
 def exit_program(request: Request):
     """Exit page"""
@@ -0,0 +1,7 @@
+"""End-to-end benchmarks of the chat pipeline on synthetic family trees.
+
+    python -m benchmarks.run --sizes 10,100,1000,10000,100000 --messages 50
+
+generator.py writes the trees as chat sentences, run.py times every message through
+parse -> validate -> write -> query and stats.py turns the timings into percentiles.
+"""
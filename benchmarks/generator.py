@@ -0,0 +1,107 @@
+import random
+import re
+from dataclasses import dataclass
+from itertools import product
+from typing import Iterator, List, NamedTuple, Optional
+
+# Two-letter syllables; names are made of them, so they stay [A-Z][a-z]+ like the parser expects
+SYLLABLES = ["".join(pair) for pair in product("bdfgklmnprstvz", "aeiou")]
+
+@dataclass
+class TreeSpec:
+    """Shape of a synthetic family tree.
+
+    `generations` of None keeps adding generations for as long as sentences are read.
+    Each couple has `branching` children; `half_sibling_rate` is the share of children
+    whose father is a different partner of their mother, and `missing_gender_rate` the
+    share of people whose gender is never stated (their parent links use "is a child of").
+    """
+    generations: Optional[int] = 5
+    branching: int = 3
+    half_sibling_rate: float = 0.1
+    missing_gender_rate: float = 0.1
+    seed: int = 0
+
+def person_name(number: int) -> str:
+    """Return a unique pronounceable name for a person number, e.g. 0 -> "Beba"."""
+    syllables = []
+    number += len(SYLLABLES)  # at least two syllables
+    while number:
+        number, digit = divmod(number, len(SYLLABLES))
+        syllables.append(SYLLABLES[digit])
+    return "".join(reversed(syllables)).capitalize()
+
+class Person(NamedTuple):
+    name: str
+    gender: str
+    # False if the sentences never say whether they are male or female
+    stated: bool
+
+class _Tree:
+    """Person numbering and genders while a tree is generated."""
+
+    def __init__(self, spec: TreeSpec):
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+        self.count = 0
+
+    def person(self, gender: str) -> Person:
+        """Create the next person, leaving some genders unstated."""
+        name = person_name(self.count)
+        self.count += 1
+        return Person(name, gender, self.random.random() >= self.spec.missing_gender_rate)
+
+    def parent_sentence(self, parent: Person, child: Person) -> str:
+        """State a parent link, without giving away a gender that is meant to stay unknown."""
+        if not parent.stated:
+            return f"{child.name} is a child of {parent.name}."
+        return f"{parent.name} is the {'father' if parent.gender == 'male' else 'mother'} of {child.name}."
+
+def generate_statements(spec: TreeSpec) -> Iterator[str]:
+    """Yield the sentences describing a tree, founders first, one generation after another."""
+    tree = _Tree(spec)
+    father = tree.person("male")
+    mother = tree.person("female")
+    couples = [(father, mother)]
+    generation = 1
+    while couples and (spec.generations is None or generation < spec.generations):
+        next_couples = []
+        for father, mother in couples:
+            for _ in range(spec.branching):
+                gender = tree.random.choice(("male", "female"))
+                child = tree.person(gender)
+                child_father = father
+                if tree.random.random() < spec.half_sibling_rate:
+                    # A child of the mother's other partner is a half-sibling of the rest
+                    child_father = tree.person("male")
+                yield tree.parent_sentence(child_father, child)
+                yield tree.parent_sentence(mother, child)
+                if child.stated:
+                    yield f"{child.name} is {gender}."
+
+                spouse = tree.person("female" if gender == "male" else "male")
+                next_couples.append((child, spouse) if gender == "male" else (spouse, child))
+        couples = next_couples
+        generation += 1
+
+def question_for(statement: str) -> str:
+    """Return a question about the people a generated sentence mentions."""
+    match = re.match(r"^([A-Z][a-z]+) is the (?:father|mother) of ([A-Z][a-z]+)\.$", statement)
+    if match:
+        return f"Who are the ancestors of {match.group(2)}?"
+    match = re.match(r"^([A-Z][a-z]+) is a child of ([A-Z][a-z]+)\.$", statement)
+    if match:
+        return f"Who are the siblings of {match.group(1)}?"
+    match = re.match(r"^([A-Z][a-z]+) is (?:male|female)\.$", statement)
+    if match:
+        return f"Who is the mother of {match.group(1)}?"
+    return ""
+
+def take_statements(spec: TreeSpec, count: int) -> List[str]:
+    """Return the first `count` sentences of a tree."""
+    statements = []
+    for statement in generate_statements(spec):
+        if len(statements) >= count:
+            break
+        statements.append(statement)
+    return statements
@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.generator import TreeSpec, generate_statements, question_for
+from benchmarks.stats import summarize, format_table
+
+# Stages timed for every message, in pipeline order
+STAGES = ("parse", "validate", "write", "query", "total")
+
+DEFAULT_SIZES = (10, 100, 1000, 10000, 100000)
+
+# Known conversations and the outcome of each sentence, replayed by --check
+SCENARIOS = {
+    "sibling group of stated cousins": (
+        ("Carl is a cousin of Dan.", "added"),
+        ("Carl, Dan, and Eve are siblings.", "rejected"),
+    ),
+    "sibling group of cousins through their parents": (
+        ("Ann is the mother of Carl.", "added"),
+        ("Bob is the father of Dan.", "added"),
+        ("Ann and Bob are siblings.", "clarified"),
+        ("Carl, Dan, and Eve are siblings.", "rejected"),
+    ),
+    "sibling group with an aunt": (
+        ("Ann and Bob are siblings.", "clarified"),
+        ("Bob is the father of Dan.", "added"),
+        ("Ann, Dan, and Eve are siblings.", "rejected"),
+    ),
+    "sibling group with a parent": (
+        ("Ann is the mother of Carl.", "added"),
+        ("Carl, Ann, and Eve are siblings.", "rejected"),
+    ),
+    "sibling group growing by one": (
+        ("Carl, Dan, and Eve are siblings.", "added"),
+        ("Carl, Dan, Eve, and Fay are siblings.", "added"),
+    ),
+}
+
+def use_kb_file(kb_file: str):
+    """Point the pipeline modules at a knowledge base file, as the app does per session."""
+    import parser
+    import fact_manager
+    import validation
+    import query_handler
+    import clarification
+
+    for module in (parser, fact_manager, validation, query_handler, clarification):
+        module.current_kb_file = kb_file
+
+def seed_knowledge_base(kb_file: str, statements, size: int, chat) -> int:
+    """Write the facts of the first sentences until the file holds `size` facts; returns the count."""
+    from rule_writer import write_correct_rules
+    from statement_ir import parse_facts
+
+    with open(kb_file, "w", encoding="utf-8") as f:
+        write_correct_rules(f)
+
+    facts = []
+    seen = set()
+    for statement in statements:
+        fact, _ = chat.fact_manager._parse_statement_to_fact(statement, chat.statement_patterns)
+        for parsed in parse_facts(fact):
+            if parsed.line not in seen:
+                seen.add(parsed.line)
+                facts.append(parsed.line)
+        if len(facts) >= size:
+            break
+    if facts:
+        chat.fact_manager.store_facts(facts)
+    return len(facts)
+
+def time_message(chat, statement: str, policy: str) -> Tuple[Dict[str, float], str]:
+    """Run one sentence through parse -> validate -> write -> query; returns stage seconds and the outcome."""
+    from statement_ir import parse_facts
+
+    fact_manager = chat.fact_manager
+    timings = {}
+    start = time.perf_counter()
+
+    fact, name_error = fact_manager._parse_statement_to_fact(statement, chat.statement_patterns)
+    facts = parse_facts(fact)
+    parsed = time.perf_counter()
+    timings["parse"] = parsed - start
+
+    outcome = chat.validator.validate(statement, facts) if facts else None
+    validated = time.perf_counter()
+    timings["validate"] = validated - parsed
+
+    if outcome is None:
+        status = "unrecognized"
+    elif outcome.valid:
+        reply = fact_manager._write_fact_to_file(fact, statement)
+        status = "known" if reply == "I already knew that." else "added"
+    elif outcome.action:
+        fact_manager.snapshot = chat.validator.snapshot()
+        reply = fact_manager._handle_validation_message(outcome, statement)
+        _, question = chat.clarification_handler.resolve(reply, policy)
+        status = "deferred" if question is not None else "clarified"
+    else:
+        status = "rejected"
+    written = time.perf_counter()
+    timings["write"] = written - validated
+
+    question = question_for(statement)
+    if question:
+        chat.query_handler.handle_question(question, chat.question_patterns)
+    queried = time.perf_counter()
+    timings["query"] = queried - written
+    timings["total"] = queried - start
+    return timings, status
+
+def run_size(spec: TreeSpec, size: int, messages: int, policy: str, workdir: str) -> Tuple[int, Dict[str, List[float]], Dict[str, int]]:
+    """Seed a knowledge base with `size` facts and time the next `messages` sentences of the tree."""
+    from parser import FamilyRelationshipParser
+
+    kb_file = os.path.join(workdir, f"relationships_{size}.pl")
+    use_kb_file(kb_file)
+    chat = FamilyRelationshipParser()
+
+    statements = generate_statements(spec)
+    facts = seed_knowledge_base(kb_file, statements, size, chat)
+
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    outcomes: Dict[str, int] = {}
+    for statement in statements:
+        if messages <= 0:
+            break
+        message_timings, status = time_message(chat, statement, policy)
+        for stage in STAGES:
+            timings[stage].append(message_timings[stage])
+        outcomes[status] = outcomes.get(status, 0) + 1
+        messages -= 1
+    return facts, timings, outcomes
+
+def check_scenarios(policy: str, workdir: str) -> List[str]:
+    """Replay SCENARIOS on empty knowledge bases; returns a line per sentence with another outcome."""
+    from parser import FamilyRelationshipParser
+    from rule_writer import write_correct_rules
+
+    failures = []
+    for number, (name, conversation) in enumerate(SCENARIOS.items()):
+        kb_file = os.path.join(workdir, f"scenario_{number}.pl")
+        with open(kb_file, "w", encoding="utf-8") as f:
+            write_correct_rules(f)
+        use_kb_file(kb_file)
+        chat = FamilyRelationshipParser()
+        for statement, expected in conversation:
+            _, status = time_message(chat, statement, policy)
+            if status != expected:
+                failures.append(f"{name}: {statement!r} was {status}, expected {expected}")
+    return failures
+
+def main(argv=None):
+    arguments = argparse.ArgumentParser(description="Time the chat pipeline on synthetic family trees.")
+    arguments.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                           help="comma-separated knowledge base sizes, in facts")
+    arguments.add_argument("--messages", type=int, default=50, help="sentences timed per size")
+    arguments.add_argument("--branching", type=int, default=3)
+    arguments.add_argument("--half-sibling-rate", type=float, default=0.1)
+    arguments.add_argument("--missing-gender-rate", type=float, default=0.1)
+    arguments.add_argument("--seed", type=int, default=0)
+    arguments.add_argument("--policy", default="assume_full_siblings",
+                           help="clarification policy answering follow-up questions")
+    arguments.add_argument("--json", help="also write the results to this file")
+    arguments.add_argument("--verbose", action="store_true", help="keep the pipeline's debug output")
+    arguments.add_argument("--check", action="store_true",
+                           help="replay the known scenarios instead of timing, and fail on any other outcome")
+    options = arguments.parse_args(argv)
+
+    from logs import configure
+    configure(level="debug" if options.verbose else "error")
+
+    if options.check:
+        with tempfile.TemporaryDirectory(prefix="family_check_") as workdir:
+            with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(sys.stdout if options.verbose else quiet):
+                failures = check_scenarios(options.policy, workdir)
+        for failure in failures:
+            print(failure, file=sys.stderr)
+        print(f"{len(SCENARIOS)} scenarios, {len(failures)} unexpected outcomes", file=sys.stderr)
+        sys.exit(1 if failures else 0)
+
+    # The tree grows as far as the largest size needs
+    spec = TreeSpec(generations=None, branching=options.branching, half_sibling_rate=options.half_sibling_rate,
+                    missing_gender_rate=options.missing_gender_rate, seed=options.seed)
+    sizes = [int(size) for size in options.sizes.split(",") if size.strip()]
+
+    rows = []
+    report = []
+    with tempfile.TemporaryDirectory(prefix="family_bench_") as workdir:
+        for size in sizes:
+            with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(sys.stdout if options.verbose else quiet):
+                facts, timings, outcomes = run_size(spec, size, options.messages, options.policy, workdir)
+            stages = {stage: summarize(values) for stage, values in timings.items()}
+            for stage, summary in stages.items():
+                rows.append(dict(summary, facts=facts, stage=stage))
+            report.append({"size": size, "facts": facts, "outcomes": outcomes, "stages": stages})
+            print(f"{facts} facts: {outcomes}", file=sys.stderr)
+
+    print(format_table(rows))
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
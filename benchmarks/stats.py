@@ -0,0 +1,35 @@
+from typing import Dict, List, Sequence
+
+# Percentiles reported for every stage
+PERCENTILES = (50, 90, 95, 99)
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Return the p-th percentile of some values, interpolating between the closest two."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Return count, mean, the reported percentiles and max of some latencies."""
+    summary = {"count": len(values), "mean": sum(values) / len(values) if values else 0.0}
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(values, p)
+    summary["max"] = max(values) if values else 0.0
+    return summary
+
+def format_table(rows: List[Dict[str, object]]) -> str:
+    """Lay out summaries (with "facts" and "stage" keys) as an aligned text table, in milliseconds."""
+    columns = ["facts", "stage", "count", "mean"] + [f"p{p}" for p in PERCENTILES] + ["max"]
+    cells = [columns]
+    for row in rows:
+        line = []
+        for column in columns:
+            value = row[column]
+            line.append(f"{value * 1000:.2f}" if isinstance(value, float) else str(value))
+        cells.append(line)
+    widths = [max(len(line[i]) for line in cells) for i in range(len(columns))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(line, widths)) for line in cells)
@@ -1,339 +1,235 @@
+import os
 import re
-from typing import Dict, Any
+from typing import Dict, Tuple, Optional
 from fact_manager import FactManager
+from clarification_state import PendingClarification, get_pending, set_pending
+from utils import safe_prolog_query, validate_name
+from logs import get_logger
+
+# Global variable for current knowledge base file
+current_kb_file = "relationships.pl"
+
+log = get_logger("clarification")
+
+# (pending question kind, answer) -> handler method; "*" stands for a person's name
+TRANSITIONS: Dict[Tuple[str, str], str] = {
+    ("parent_of_siblings", "yes"): "_parent_of_siblings_yes",
+    ("parent_of_siblings", "no"): "_parent_of_siblings_no",
+    ("aunt_uncle_side", "father"): "_aunt_uncle_side",
+    ("aunt_uncle_side", "mother"): "_aunt_uncle_side",
+    ("aunt_uncle_maternal", "yes"): "_aunt_uncle_maternal",
+    ("aunt_uncle_maternal", "no"): "_aunt_uncle_maternal",
+    ("aunt_uncle_full_sibling", "yes"): "_aunt_uncle_full_sibling_yes",
+    ("aunt_uncle_full_sibling", "no"): "_aunt_uncle_full_sibling_no",
+    ("aunt_uncle_shared_mother", "yes"): "_aunt_uncle_shared_mother",
+    ("aunt_uncle_shared_mother", "no"): "_aunt_uncle_shared_mother",
+    ("full_sibling", "yes"): "_full_sibling_yes",
+    ("full_sibling", "no"): "_full_sibling_no",
+    ("sibling_shared_mother", "yes"): "_sibling_shared_mother",
+    ("sibling_shared_mother", "no"): "_sibling_shared_mother",
+    ("sibling_mother", "none"): "_sibling_mother_none",
+    ("sibling_mother", "*"): "_sibling_mother",
+    ("grandparent_side", "yes"): "_grandparent_side",
+    ("grandparent_side", "no"): "_grandparent_side",
+    ("grandparent_side", "maternal"): "_grandparent_side",
+    ("grandparent_side", "paternal"): "_grandparent_side",
+}
+
+# Fixed answers, which are never taken for a name
+ANSWER_WORDS = {answer for _, answer in TRANSITIONS if answer != "*"}
+
+# Answers given on the user's behalf when statements are ingested in bulk; a question
+# kind a policy does not answer is deferred into the ingestion report. Which side of the
+# family a grandparent, aunt or uncle is on (grandparent_side, aunt_uncle_side,
+# aunt_uncle_maternal, and the aunt_uncle_* questions that follow them) is a fact no
+# policy can assume, so those questions are always deferred.
+CLARIFICATION_POLICIES: Dict[str, Dict[str, str]] = {
+    # New parents are shared by the whole sibling group and stated siblings share both parents
+    "assume_full_siblings": {"full_sibling": "yes", "parent_of_siblings": "yes"},
+    # A new parent belongs to the named child only
+    "assume_child_only": {"parent_of_siblings": "no"},
+    "defer": {},
+}
+DEFAULT_CLARIFICATION_POLICY = os.environ.get("FAMILY_CLARIFICATION_POLICY", "defer").strip().lower()
 
 class ClarificationHandler:
     def __init__(self):
         self.fact_manager = FactManager()
-    
-    def handle_response(self, response: str, clarification_context: Dict[str, Any]) -> str:
-        """Handle clarification responses from the user."""
+
+    def _transition(self, kind: str, answer: str) -> Optional[str]:
+        """Return the handler for an answer to a question of the given kind, if the answer fits.
+
+        Fixed answers match in any case; a name must be written as one (capitalized), as typed.
+        """
+        answer = answer.strip()
+        handler = TRANSITIONS.get((kind, answer.lower()))
+        if handler is None and answer.lower() not in ANSWER_WORDS and validate_name(answer)[0]:
+            handler = TRANSITIONS.get((kind, "*"))
+        return handler
+
+    def expects(self, response: str) -> bool:
+        """Check whether the session is waiting on a question this response answers."""
+        pending = get_pending(current_kb_file)
+        return pending is not None and self._transition(pending.kind, response) is not None
+
+    def handle_response(self, response: str) -> str:
+        """Answer the session's pending question and move to the next one, if any."""
+        pending = get_pending(current_kb_file)
+        if pending is None:
+            return "There is no question waiting for an answer."
+
+        log.debug("answer to pending question", response=response, kind=pending.kind, statement=pending.statement)
+
+        handler = self._transition(pending.kind, response)
         response = response.lower().strip()
-        
-        print(f"DEBUG: handle_response called with response='{response}'")
-        print(f"DEBUG: clarification_context={clarification_context}")
-        
-        # Check for grandparent clarification first (most specific)
-        if "grandparent" in clarification_context:
-            return self._handle_grandparent_response(response, clarification_context)
-        # Check for sophisticated aunt/uncle clarification
-        elif clarification_context.get("clarification_type") == "aunt_uncle_sophisticated":
-            return self._handle_aunt_uncle_sophisticated_response(response, clarification_context)
-        # Check for aunt/uncle sibling clarification
-        elif clarification_context.get("clarification_type") == "aunt_uncle_sibling":
-            return self._handle_aunt_uncle_sibling_response(response, clarification_context)
-        # Check for aunt/uncle half-sibling shared parent clarification
-        elif clarification_context.get("clarification_type") == "aunt_uncle_half_sibling_shared_parent":
-            return self._handle_aunt_uncle_half_sibling_shared_parent_response(response, clarification_context)
-        # Check for full sibling clarification
-        elif clarification_context.get("clarification_type") == "full_sibling":
-            return self._handle_full_sibling_response(response, clarification_context)
-        # Check for half-sibling shared parent clarification
-        elif clarification_context.get("clarification_type") == "half_sibling_shared_parent":
-            return self._handle_half_sibling_shared_parent_response(response, clarification_context)
-        # Check for sibling parent clarifications (more specific)
-        elif response == "yes" and clarification_context.get("siblings") and "," in clarification_context.get("siblings", ""):
-            print(f"DEBUG: Calling _handle_sibling_parent_yes_response")
-            return self._handle_sibling_parent_yes_response(clarification_context)
-        elif response == "no" and clarification_context.get("siblings") and "," in clarification_context.get("siblings", ""):
-            print(f"DEBUG: Calling _handle_sibling_parent_no_response")
-            return self._handle_sibling_parent_no_response(clarification_context)
-        elif response == "yes":
-            return self._handle_yes_response(clarification_context)
-        elif response == "no":
-            return self._handle_no_response(clarification_context)
-
-
-        elif response in ["father", "mother"]:
-            return self._handle_aunt_uncle_response(response, clarification_context)
-        elif response in ["half-sibling", "half-brother", "half-sister"]:
-            return self._handle_sibling_response(response, clarification_context)
-        elif response == "none":
-            return self._handle_sibling_none_response(clarification_context)
-        else:
-            # Check if this is a name (for sibling parent clarification)
-            if clarification_context.get("siblings") == "sibling_clarification":
-                return self._handle_sibling_parent_response(response, clarification_context)
-            else:
-                return "Please respond with 'yes' or 'no'."
-    
-    def _handle_yes_response(self, context: Dict[str, Any]) -> str:
-        """Handle 'yes' responses for parent clarifications."""
-        new_parent = context["new_parent"]
-        child = context["child"]
-        siblings = context["siblings"]
-        
+        if handler is None:
+            answers = [answer for kind, answer in TRANSITIONS if kind == pending.kind and answer != "*"]
+            return f"Please respond with exactly {' or '.join(repr(answer) for answer in answers)} (without the apostrophes)."
+
+        # The question is answered from the engine that asked it; a follow-up keeps it
+        self.fact_manager.engine = pending.snapshot.restore() if pending.snapshot else None
+        set_pending(current_kb_file, None)
+        try:
+            reply, follow_up = getattr(self, handler)(response, pending)
+        finally:
+            self.fact_manager.engine = None
+        set_pending(current_kb_file, follow_up)
+        return reply
+
+    def resolve(self, reply: str, policy: str) -> Tuple[str, Optional[PendingClarification]]:
+        """Answer the session's pending questions from a policy, one follow-up after another.
+        
+        Returns the last reply and the question the policy could not answer, if any; that
+        question is taken off the session, for the caller to report.
+        """
+        answers = CLARIFICATION_POLICIES[policy]
+        while True:
+            pending = get_pending(current_kb_file)
+            if pending is None:
+                return reply, None
+            answer = answers.get(pending.kind)
+            if answer is None or self._transition(pending.kind, answer) is None:
+                set_pending(current_kb_file, None)
+                return reply, pending
+            reply = self.handle_response(answer)
+            if get_pending(current_kb_file) is pending:
+                # The answer was not accepted in this case; leave the question to a person
+                set_pending(current_kb_file, None)
+                return reply, pending
+
+    def _parent_of_siblings_yes(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """The new parent is also the parent of the child's siblings."""
+        details = pending.details
+        new_parent, child, siblings = details["new_parent"], details["child"], details["siblings"]
+
+        if "," in siblings:
+            # Child first, then the siblings that were asked about
+            sibling_names = [s.strip() for s in details.get("siblings_needing_parent", siblings).split(',')]
+            unique_siblings = [s for s in sibling_names if s != child]
+            children_needing_parent = f"{child},{','.join(unique_siblings)}"
+            log.debug("adding parent for siblings", new_parent=new_parent, children=children_needing_parent)
+            return self.fact_manager.add_parent_for_all_siblings(new_parent, child, children_needing_parent, pending.statement), None
         if siblings == "update_shared_parent":
-            return self.fact_manager.update_shared_parent_relationships(new_parent, child)
-        elif siblings and siblings != "sibling_clarification":
-            return self.fact_manager.add_parent_for_all_siblings(new_parent, child, siblings)
-        else:
-            return self.fact_manager.add_parent_for_child_only(new_parent, child)
-    
-    def _handle_no_response(self, context: Dict[str, Any]) -> str:
-        """Handle 'no' responses for parent clarifications."""
-        new_parent = context["new_parent"]
-        child = context["child"]
-        siblings = context["siblings"]
-        
-        if siblings and siblings != "sibling_clarification":
-            return self.fact_manager.add_parent_for_child_only(new_parent, child)
-        else:
-            return self.fact_manager.add_parent_for_child_only(new_parent, child)
-    
-
-    
-    def _handle_aunt_uncle_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle aunt/uncle clarification responses."""
-        aunt_uncle = context["new_parent"]
-        niece_nephew = context["child"]
-        parent = context["siblings"]
-        original_statement = context.get("original_statement", "")
-        
+            return self.fact_manager.update_shared_parent_relationships(new_parent, child), None
+        if siblings:
+            return self.fact_manager.add_parent_for_all_siblings(new_parent, child, siblings), None
+        return self.fact_manager.add_parent_for_child_only(new_parent, child), None
+
+    def _parent_of_siblings_no(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """The new parent is the child's parent only."""
+        details = pending.details
+        if "," in details["siblings"]:
+            # The siblings keep a shared parent of their own
+            return self.fact_manager.add_parent_with_shared_parent(details["new_parent"], details["child"], details["siblings"], pending.statement), None
+        return self.fact_manager.add_parent_for_child_only(details["new_parent"], details["child"]), None
+
+    def _aunt_uncle_side(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """The aunt/uncle is a sibling of the parent's father or mother."""
+        details = pending.details
         if response == "father":
-            return self.fact_manager.add_aunt_uncle_father_relationship(aunt_uncle, parent, niece_nephew, original_statement)
-        elif response == "mother":
-            return self.fact_manager.add_aunt_uncle_mother_relationship(aunt_uncle, parent, niece_nephew, original_statement)
-        else:
-            return f"That's impossible! Invalid response '{response}' for aunt/uncle clarification."
-    
-    def _handle_aunt_uncle_sophisticated_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle sophisticated aunt/uncle clarification responses."""
-        aunt_uncle = context["aunt_uncle"]
-        niece_nephew = context["niece_nephew"]
-        parent = context["parent"]
-        original_statement = context.get("original_statement", "")
-        
-        # Store the maternal/paternal response for later use
+            return self.fact_manager.add_aunt_uncle_father_relationship(details["aunt_uncle"], details["parent"], details["niece_nephew"], pending.statement), None
+        return self.fact_manager.add_aunt_uncle_mother_relationship(details["aunt_uncle"], details["parent"], details["niece_nephew"], pending.statement), None
+
+    def _aunt_uncle_maternal(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """Find the parent on the side the user named and ask whether they are full siblings."""
+        details = pending.details
+        aunt_uncle, niece_nephew = details["aunt_uncle"], details["niece_nephew"]
         is_maternal = (response == "yes")
-        
-        # Determine the correct parent to ask about based on maternal/paternal
-        from pyswip import Prolog
-        from utils import safe_prolog_query
-        from fact_manager import current_kb_file
-        
-        prolog = Prolog()
-        prolog.consult(current_kb_file)
-        
-        # Find the correct parent based on maternal/paternal
-        if is_maternal:
-            # For maternal aunt/uncle, find the mother of the niece/nephew
-            mother_results = safe_prolog_query(prolog, f"mother_of(X, {niece_nephew})")
-            if mother_results:
-                target_parent = mother_results[0]["X"]
-            else:
-                # Fallback to the original parent if mother not found
-                target_parent = parent
-        else:
-            # For paternal aunt/uncle, find the father of the niece/nephew
-            father_results = safe_prolog_query(prolog, f"father_of(X, {niece_nephew})")
-            if father_results:
-                target_parent = father_results[0]["X"]
-            else:
-                # Fallback to the original parent if father not found
-                target_parent = parent
-        
-        # Update context for the next clarification
-        context.update({
-            "aunt_uncle": aunt_uncle,
-            "niece_nephew": niece_nephew,
-            "parent": target_parent,  # Use the correct parent
-            "is_maternal": is_maternal,
-            "original_statement": original_statement,
-            "clarification_type": "aunt_uncle_sibling"
-        })
-        
-        # Ask if they are full siblings
-        return f"Clarification needed: Are {aunt_uncle.capitalize()} and {target_parent.capitalize()} full siblings? Answer with exactly 'yes' or 'no'."
-    
-    def _handle_aunt_uncle_sibling_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle aunt/uncle sibling clarification responses."""
-        aunt_uncle = context["aunt_uncle"]
-        niece_nephew = context["niece_nephew"]
-        parent = context["parent"]
-        is_maternal = context["is_maternal"]
-        original_statement = context.get("original_statement", "")
-        
-        if response == "yes":
-            # Full siblings - add sophisticated aunt/uncle relationship
-            return self.fact_manager.add_aunt_uncle_sophisticated_relationship(
-                aunt_uncle, niece_nephew, parent, is_maternal, original_statement
-            )
-        elif response == "no":
-            # Half siblings - ask which parent they share (same as sibling logic)
-            context["clarification_type"] = "aunt_uncle_half_sibling_shared_parent"
-            context["aunt_uncle"] = aunt_uncle
-            context["parent"] = parent
-            context["niece_nephew"] = niece_nephew
-            context["is_maternal"] = is_maternal
-            context["original_statement"] = original_statement
-            return f"Do {aunt_uncle.capitalize()} and {parent.capitalize()} share a mother? Answer with exactly 'yes' or 'no' (without the apostrophes)."
-        else:
-            return f"That's impossible! Invalid response '{response}' for aunt/uncle sibling clarification."
-    
-    def _handle_aunt_uncle_shared_parent_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle aunt/uncle shared parent clarification responses."""
-        aunt_uncle = context["aunt_uncle"]
-        niece_nephew = context["niece_nephew"]
-        parent = context["parent"]
-        original_statement = context.get("original_statement", "")
-        
-        # Add half-sibling aunt/uncle relationship with shared parent
-        return self.fact_manager.add_aunt_uncle_half_sibling_relationship(
-            aunt_uncle, niece_nephew, parent, response, original_statement
-        )
-    
-    def _handle_aunt_uncle_half_sibling_shared_parent_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle aunt/uncle half-sibling shared parent clarification responses."""
-        aunt_uncle = context["aunt_uncle"]
-        niece_nephew = context["niece_nephew"]
-        parent = context["parent"]
-        is_maternal = context["is_maternal"]
-        original_statement = context.get("original_statement", "")
-        
-        if response == "yes":
-            # They share a mother, so the father is the different parent
-            return self.fact_manager.add_aunt_uncle_half_sibling_with_shared_mother(
-                aunt_uncle, niece_nephew, parent, is_maternal, original_statement
-            )
-        elif response == "no":
-            # They share a father, so the mother is the different parent
-            return self.fact_manager.add_aunt_uncle_half_sibling_with_shared_father(
-                aunt_uncle, niece_nephew, parent, is_maternal, original_statement
-            )
-        else:
-            return "Please respond with exactly 'yes' or 'no' (without the apostrophes)."
-    
-    def _handle_full_sibling_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle full sibling clarification responses."""
-        person1 = context["person1"]
-        person2 = context["person2"]
-        original_statement = context.get("original_statement", "")
-        
+
+        # Mother for a maternal aunt/uncle, father for a paternal one; the stated parent otherwise
+        prolog = self.fact_manager._engine()
+        side = "mother_of" if is_maternal else "father_of"
+        results = safe_prolog_query(prolog, f"{side}(X, {niece_nephew})")
+        target_parent = results[0]["X"] if results else details["parent"]
+
+        follow_up = pending.follow_up("aunt_uncle_full_sibling", parent=target_parent, is_maternal=is_maternal)
+        return f"Clarification needed: Are {aunt_uncle.capitalize()} and {target_parent.capitalize()} full siblings? Answer with exactly 'yes' or 'no'.", follow_up
+
+    def _aunt_uncle_full_sibling_yes(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """Full siblings: the aunt/uncle gets the parent's parents."""
+        details = pending.details
+        return self.fact_manager.add_aunt_uncle_sophisticated_relationship(
+            details["aunt_uncle"], details["niece_nephew"], details["parent"], details["is_maternal"], pending.statement
+        ), None
+
+    def _aunt_uncle_full_sibling_no(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """Half siblings: ask which parent they share, as for siblings."""
+        details = pending.details
+        follow_up = pending.follow_up("aunt_uncle_shared_mother")
+        return f"Do {details['aunt_uncle'].capitalize()} and {details['parent'].capitalize()} share a mother? Answer with exactly 'yes' or 'no' (without the apostrophes).", follow_up
+
+    def _aunt_uncle_shared_mother(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """A shared mother means different fathers, and the other way round."""
+        details = pending.details
+        args = (details["aunt_uncle"], details["niece_nephew"], details["parent"], details["is_maternal"], pending.statement)
         if response == "yes":
-            return self.fact_manager.add_full_sibling_relationship(person1, person2, original_statement)
-        elif response == "no":
-            # For half-siblings, ask which parent they share
-            context["clarification_type"] = "half_sibling_shared_parent"
-            context["person1"] = person1
-            context["person2"] = person2
-            return f"Do {person1.capitalize()} and {person2.capitalize()} share a mother? Answer with exactly 'yes' or 'no' (without the apostrophes)."
-        else:
-            return "Please respond with exactly 'yes' or 'no' (without the apostrophes)."
-    
-    def _handle_half_sibling_shared_parent_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle half-sibling shared parent clarification responses."""
-        person1 = context["person1"]
-        person2 = context["person2"]
-        original_statement = context.get("original_statement", "")
-        
+            return self.fact_manager.add_aunt_uncle_half_sibling_with_shared_mother(*args), None
+        return self.fact_manager.add_aunt_uncle_half_sibling_with_shared_father(*args), None
+
+    def _full_sibling_yes(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """Full siblings share both parents."""
+        details = pending.details
+        return self.fact_manager.add_full_sibling_relationship(details["person1"], details["person2"], pending.statement), None
+
+    def _full_sibling_no(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """Half siblings: ask which parent they share."""
+        details = pending.details
+        follow_up = pending.follow_up("sibling_shared_mother")
+        return f"Do {details['person1'].capitalize()} and {details['person2'].capitalize()} share a mother? Answer with exactly 'yes' or 'no' (without the apostrophes).", follow_up
+
+    def _sibling_shared_mother(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """A shared mother means different fathers, and the other way round."""
+        details = pending.details
         if response == "yes":
-            # They share a mother, so the father is the different parent
-            return self.fact_manager.add_half_sibling_with_shared_mother(person1, person2, original_statement)
-        elif response == "no":
-            # They share a father, so the mother is the different parent
-            return self.fact_manager.add_half_sibling_with_shared_father(person1, person2, original_statement)
-        else:
-            return "Please respond with exactly 'yes' or 'no' (without the apostrophes)."
-    
-    def _handle_sibling_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle sibling clarification responses."""
-        person1 = context["new_parent"]
-        person2 = context["child"]
-        original_statement = context.get("original_statement", "")
-        
-        if response == "half-sibling":
-            return self.fact_manager.add_half_sibling_relationship(person1, person2)
-        elif response == "half-brother":
-            return self.fact_manager.add_half_brother_relationship(person1, person2)
-        elif response == "half-sister":
-            return self.fact_manager.add_half_sister_relationship(person1, person2)
-        else:
-            return f"That's impossible! Invalid response '{response}' for sibling clarification."
-    
-    def _handle_sibling_parent_response(self, parent_name: str, context: Dict[str, Any]) -> str:
-        """Handle sibling parent clarification responses."""
-        person1 = context["person1"]
-        person2 = context["person2"]
-        
-        # Add the shared mother relationship
-        result = self.fact_manager.add_shared_mother_relationship(parent_name, person1, person2)
-        
-        # Ask for the father
-        context["shared_mother"] = parent_name
-        context["siblings"] = "sibling_father_clarification"
-        
-        return f"{result}\n\nNow, who is the father of both {person1.capitalize()} and {person2.capitalize()}? (If they have different fathers, say 'none')"
-    
-    def _handle_sibling_none_response(self, context: Dict[str, Any]) -> str:
-        """Handle 'none' response for sibling parent clarification."""
-        person1 = context["person1"]
-        person2 = context["person2"]
-        
-        return f"I understand that {person1.capitalize()} and {person2.capitalize()} don't share a mother. This means they are not full siblings. Would you like to specify them as half-siblings instead?"
-    
-    def _handle_sibling_parent_yes_response(self, context: Dict[str, Any]) -> str:
-        """Handle 'yes' response for sibling parent clarification."""
-        new_parent = context["new_parent"]
-        child = context["child"]
-        siblings = context["siblings"]
-        original_statement = context.get("original_statement", "")
-        
-        # Get the siblings that were mentioned in the clarification (the ones that need the parent)
-        # The clarification context should have the specific siblings that need the parent
-        siblings_needing_parent = context.get("siblings_needing_parent", siblings)
-        
-        # Parse the siblings that need the parent
-        sibling_names = [s.strip() for s in siblings_needing_parent.split(',')]
-        # Remove the child from the sibling list to avoid duplicates
-        unique_siblings = [s for s in sibling_names if s != child]
-        # Create list with child first, then unique siblings that need the parent
-        children_needing_parent = f"{child},{','.join(unique_siblings)}"
-        print(f"DEBUG: _handle_sibling_parent_yes_response - children_needing_parent={children_needing_parent}")
-        return self.fact_manager.add_parent_for_all_siblings(new_parent, child, children_needing_parent, original_statement)
-    
-
-    
-    def _handle_grandparent_response(self, response: str, context: Dict[str, Any]) -> str:
-        """Handle grandparent clarification responses."""
-        grandparent = context["grandparent"]
-        grandchild = context["grandchild"]
-        grandparent_gender = context["grandparent_gender"]
-        original_statement = context.get("original_statement", "")
-        
-        # Determine grandparent type based on response
-        if grandparent_gender == "female":
-            if response == "yes":
-                grandparent_type = "maternal"
-            elif response == "no":
-                grandparent_type = "paternal"
-            else:
-                return "Please answer with exactly 'yes' or 'no'."
-        elif grandparent_gender == "male":
-            if response == "yes":
-                grandparent_type = "paternal"
-            elif response == "no":
-                grandparent_type = "maternal"
-            else:
-                return "Please answer with exactly 'yes' or 'no'."
+            return self.fact_manager.add_half_sibling_with_shared_mother(details["person1"], details["person2"], pending.statement), None
+        return self.fact_manager.add_half_sibling_with_shared_father(details["person1"], details["person2"], pending.statement), None
+
+    def _sibling_mother(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """The user named the mother both siblings share."""
+        details = pending.details
+        return self.fact_manager.add_shared_mother_relationship(response, details["person1"], details["person2"]), None
+
+    def _sibling_mother_none(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """The siblings have different mothers, so they can only be half-siblings."""
+        details = pending.details
+        return f"I understand that {details['person1'].capitalize()} and {details['person2'].capitalize()} don't share a mother. This means they are not full siblings. Would you like to specify them as half-siblings instead?", None
+
+    def _grandparent_side(self, response: str, pending: PendingClarification) -> Tuple[str, Optional[PendingClarification]]:
+        """Work out the maternal or paternal side from the answer and the grandparent's gender."""
+        details = pending.details
+        grandparent_gender = details["grandparent_gender"]
+
+        # "Is she a maternal grandmother?" and "Is he a paternal grandfather?" are yes/no questions
+        if grandparent_gender == "female" and response in ("yes", "no"):
+            grandparent_type = "maternal" if response == "yes" else "paternal"
+        elif grandparent_gender == "male" and response in ("yes", "no"):
+            grandparent_type = "paternal" if response == "yes" else "maternal"
+        elif grandparent_gender not in ("female", "male") and response in ("maternal", "paternal"):
+            grandparent_type = response
         else:
-            if response == "maternal":
-                grandparent_type = "maternal"
-            elif response == "paternal":
-                grandparent_type = "paternal"
-            else:
-                return "Please answer with exactly 'maternal' or 'paternal'."
-        
-        # Use the FactManager method instead of duplicating logic
-        return self.fact_manager.add_grandparent_relationship(grandparent, grandchild, grandparent_gender, grandparent_type, original_statement)
-    
-    def _handle_sibling_parent_no_response(self, context: Dict[str, Any]) -> str:
-        """Handle 'no' response for sibling parent clarification."""
-        new_parent = context["new_parent"]
-        child = context["child"]
-        siblings = context["siblings"]
-        original_statement = context.get("original_statement", "")
-        
-        # Pass the full siblings string to handle ALL siblings
-        print(f"DEBUG: _handle_sibling_parent_no_response - calling add_parent_with_shared_parent with siblings={siblings}")
-        return self.fact_manager.add_parent_with_shared_parent(new_parent, child, siblings, original_statement) 
\ No newline at end of file
+            expected = "'yes' or 'no'" if grandparent_gender in ("female", "male") else "'maternal' or 'paternal'"
+            return f"Please answer with exactly {expected}.", pending
+
+        return self.fact_manager.add_grandparent_relationship(
+            details["grandparent"], details["grandchild"], grandparent_gender, grandparent_type, pending.statement
+        ), None
@@ -0,0 +1,64 @@
+from typing import Dict, Set, Iterable, Optional, Any
+from family_graph import get_family_graph, get_scoped_engine
+from utils import same_kb_content
+
+class EngineSnapshot:
+    """The scoped engine a question was asked from, and the facts it held at the time.
+
+    Answering the question reuses it, so a "yes" does not consult the knowledge base
+    again. If the file changed in between, the scope is reloaded from the new facts;
+    if another validation reused the shared engine, its facts are put back.
+    """
+
+    def __init__(self, kb_file: str, engine, scope: Iterable[str]):
+        self.kb_file = kb_file
+        self.engine = engine
+        self.scope: Set[str] = set(scope)
+        self.facts: Set[str] = set(engine.loaded)
+        self.fingerprint = get_family_graph(kb_file).fingerprint
+
+    def restore(self):
+        """Return an engine holding the facts the question was asked about."""
+        graph = get_family_graph(self.kb_file)
+        if not same_kb_content(self.fingerprint, graph.fingerprint):
+            return get_scoped_engine(self.kb_file, self.scope)
+        if self.engine.loaded != self.facts:
+            self.engine.load(self.facts)
+        return self.engine
+
+class PendingClarification:
+    """A question the chat is waiting on.
+
+    `kind` names the state in the clarification handler's transition table, `details`
+    holds the people the question is about (prolog atoms) and `snapshot` the engine
+    that produced it, if validation used one.
+    """
+
+    def __init__(self, kind: str, statement: str, snapshot: Optional[EngineSnapshot] = None, **details: Any):
+        self.kind = kind
+        self.statement = statement
+        self.snapshot = snapshot
+        self.details: Dict[str, Any] = details
+
+    def follow_up(self, kind: str, **details: Any) -> "PendingClarification":
+        """Return the next question of the same conversation, keeping the statement and snapshot."""
+        merged = dict(self.details)
+        merged.update(details)
+        return PendingClarification(kind, self.statement, self.snapshot, **merged)
+
+    def __repr__(self):
+        return f"PendingClarification({self.kind!r}, {self.details!r})"
+
+# Pending questions per knowledge base file, i.e. per chat session
+_pending: Dict[str, PendingClarification] = {}
+
+def get_pending(kb_file: str) -> Optional[PendingClarification]:
+    """Return the question a session is waiting on, if any."""
+    return _pending.get(kb_file)
+
+def set_pending(kb_file: str, pending: Optional[PendingClarification]):
+    """Make a question the one a session is waiting on (None clears it)."""
+    if pending is None:
+        _pending.pop(kb_file, None)
+    else:
+        _pending[kb_file] = pending
@@ -0,0 +1,580 @@
+import io
+import re
+from typing import Dict, List, Tuple, Set, Iterator, Iterable, Optional, Any
+from rule_writer import write_correct_rules
+from metrics import CONSULTS
+
+# Tokens of the Prolog subset used by the family rules and the validator's queries
+TOKEN_PATTERN = re.compile(r"\s*(\\\\=|\\=|\\\+|:-|[A-Za-z_][A-Za-z0-9_]*|'[^']*'|[(),.=])")
+
+class DatalogSyntaxError(Exception):
+    """Raised when a rule, fact or query falls outside the supported Prolog subset."""
+    pass
+
+# A term is ("var", name) or ("const", atom); a goal is one of
+#   ("rel", predicate, (term, ...)), ("neq", term, term), ("eq", term, term), ("not", [goal, ...])
+
+def _tokenize(text: str) -> List[str]:
+    """Split Prolog text into tokens."""
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise DatalogSyntaxError(f"Unexpected input at: {text[position:position + 20]}")
+        token = match.group(1)
+        # Queries written in Python source sometimes arrive with the backslash doubled
+        tokens.append("\\=" if token == "\\\\=" else token)
+        position = match.end()
+        while position < len(text) and text[position].isspace():
+            position += 1
+    return tokens
+
+class _Parser:
+    """Recursive-descent parser for clauses and conjunctive queries."""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, expected: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or (expected is not None and token != expected):
+            raise DatalogSyntaxError(f"Expected {expected or 'a token'}, found {token}")
+        self.position += 1
+        return token
+
+    def at_end(self) -> bool:
+        return self.position >= len(self.tokens) or self.tokens[self.position:] == ["."]
+
+    def term(self) -> Tuple[str, str]:
+        token = self.take()
+        if token.startswith("'"):
+            return ("const", token[1:-1])
+        if token[0].isupper() or token[0] == "_":
+            return ("var", token)
+        if re.match(r"^[a-z][A-Za-z0-9_]*$", token):
+            return ("const", token)
+        raise DatalogSyntaxError(f"Unexpected token {token}")
+
+    def conjunction(self) -> List[tuple]:
+        goals = [self.goal()]
+        while self.peek() == ",":
+            self.take(",")
+            goals.append(self.goal())
+        return goals
+
+    def goal(self) -> tuple:
+        token = self.peek()
+        if token == "(":
+            self.take("(")
+            goals = self.conjunction()
+            self.take(")")
+            if len(goals) != 1:
+                raise DatalogSyntaxError("Nested conjunctions are only supported inside not/1")
+            return goals[0]
+        if token == "\\+":
+            self.take()
+            return ("not", [self.goal()])
+        if token == "not" and self.tokens[self.position + 1:self.position + 2] == ["("]:
+            self.take("not")
+            self.take("(")
+            goals = self.conjunction()
+            self.take(")")
+            return ("not", goals)
+
+        left = self.term()
+        if self.peek() == "\\=":
+            self.take()
+            return ("neq", left, self.term())
+        if self.peek() == "=":
+            self.take()
+            return ("eq", left, self.term())
+        if left[0] != "const":
+            raise DatalogSyntaxError(f"Variable {left[1]} used as a goal")
+        args = []
+        if self.peek() == "(":
+            self.take("(")
+            args.append(self.term())
+            while self.peek() == ",":
+                self.take(",")
+                args.append(self.term())
+            self.take(")")
+        return ("rel", left[1], tuple(args))
+
+def parse_query(text: str) -> List[tuple]:
+    """Parse a conjunctive query such as 'parent_of(X, ann), X \\= bob'."""
+    parser = _Parser(text)
+    goals = parser.conjunction()
+    if not parser.at_end():
+        raise DatalogSyntaxError(f"Unexpected {parser.peek()} in query")
+    return goals
+
+def parse_clause(text: str) -> Tuple[tuple, List[tuple]]:
+    """Parse 'head :- body.' or 'fact.' into (head goal, body goals)."""
+    parser = _Parser(text)
+    head = parser.goal()
+    body = []
+    if parser.peek() == ":-":
+        parser.take(":-")
+        body = parser.conjunction()
+    if not parser.at_end():
+        raise DatalogSyntaxError(f"Unexpected {parser.peek()} in clause")
+    if head[0] != "rel":
+        raise DatalogSyntaxError("Clause head must be a predicate")
+    return head, body
+
+def read_clauses(text: str) -> Iterator[str]:
+    """Yield the clauses of a Prolog file one by one, skipping comments and directives."""
+    pending = ""
+    for line in text.split("\n"):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("%"):
+            continue
+        pending = f"{pending} {stripped}".strip()
+        if pending.endswith("."):
+            if not pending.startswith(":-"):
+                yield pending
+            pending = ""
+
+def _variables(goals: List[tuple]) -> List[str]:
+    """Return the variable names of some goals, in order of first appearance."""
+    names = []
+    for goal in goals:
+        if goal[0] == "rel":
+            terms = goal[2]
+        elif goal[0] in ("neq", "eq"):
+            terms = (goal[1], goal[2])
+        else:
+            terms = ()
+        for kind, name in terms:
+            if kind == "var" and name != "_" and name not in names:
+                names.append(name)
+    return names
+
+class Relation:
+    """A set of tuples with hash indexes built on demand for each pattern of bound positions."""
+
+    def __init__(self):
+        self.tuples: Set[tuple] = set()
+        self.arity = -1
+        self.indexes: Dict[Tuple[int, ...], Dict[tuple, Set[tuple]]] = {}
+
+    def add(self, row: tuple) -> bool:
+        """Insert a tuple; returns False if it was already present."""
+        if row in self.tuples:
+            return False
+        self.tuples.add(row)
+        self.arity = len(row)
+        for positions, index in self.indexes.items():
+            index.setdefault(tuple(row[p] for p in positions), set()).add(row)
+        return True
+
+    def remove(self, row: tuple) -> bool:
+        """Delete a tuple; returns False if it was not present."""
+        if row not in self.tuples:
+            return False
+        self.tuples.discard(row)
+        for positions, index in self.indexes.items():
+            key = tuple(row[p] for p in positions)
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.discard(row)
+                if not bucket:
+                    del index[key]
+        return True
+
+    def lookup(self, positions: Tuple[int, ...], key: tuple):
+        """Return the tuples whose values at `positions` equal `key`."""
+        if not positions:
+            return self.tuples
+        if len(positions) == self.arity:
+            return (key,) if key in self.tuples else ()
+        index = self.indexes.get(positions)
+        if index is None:
+            index = {}
+            for row in self.tuples:
+                index.setdefault(tuple(row[p] for p in positions), set()).add(row)
+            self.indexes[positions] = index
+        return index.get(key, ())
+
+def _resolve(term: Tuple[str, str], binding: Dict[str, str]) -> Optional[str]:
+    """Return the value of a term under a binding, or None for an unbound variable."""
+    if term[0] == "const":
+        return term[1]
+    return binding.get(term[1])
+
+class DatalogEngine:
+    """Semi-naive bottom-up evaluator for the family rules with a pyswip-like interface.
+
+    consult() loads the facts and rules of a knowledge base file, query() answers the
+    conjunctive queries the validator and query handler send to Prolog (including \\=
+    and not/1) and yields one dict of variable bindings per distinct answer. Derived
+    relations are materialized on first use and then kept current as facts change:
+    insertions are propagated with the delta rules and deletions use DRed (delete
+    everything derived through the removed facts, then rederive what still holds).
+    """
+
+    def __init__(self, rules: Optional[List[Tuple[tuple, List[tuple]]]] = None):
+        if rules is None:
+            buffer = io.StringIO()
+            write_correct_rules(buffer)
+            rules = [parse_clause(clause) for clause in read_clauses(buffer.getvalue())]
+        self._set_rules(rules)
+        self.base: Dict[str, Set[tuple]] = {}
+        self.relations: Dict[str, Relation] = {}
+        self.loaded: Set[str] = set()
+        self.dirty = True
+
+    def _set_rules(self, rules: List[Tuple[tuple, List[tuple]]]):
+        """Install rules and precompute the join order of each delta rule."""
+        self.rules = rules
+        # Delete/rederive is only sound without negation; otherwise changes recompute
+        self.monotonic = all(goal[0] != "not" for _, body in rules for goal in body)
+        self.delta_plans = {}
+        for rule_index, (_, body) in enumerate(rules):
+            for i, goal in enumerate(body):
+                if goal[0] == "rel":
+                    self.delta_plans[(rule_index, i)] = self._plan(body, i)
+
+    # ---- loading facts ----
+
+    def consult(self, file_path: str):
+        """Replace the facts and rules with those of a knowledge base file."""
+        with open(file_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        rules = []
+        base: Dict[str, Set[tuple]] = {}
+        loaded = set()
+        for clause in read_clauses(text):
+            head, body = parse_clause(clause)
+            if body:
+                rules.append((head, body))
+            else:
+                if any(kind == "var" for kind, _ in head[2]):
+                    raise DatalogSyntaxError(f"Facts must be ground: {clause}")
+                base.setdefault(head[1], set()).add(tuple(value for _, value in head[2]))
+                loaded.add(clause)
+        self._set_rules(rules)
+        self.base = base
+        self.loaded = loaded
+        self.dirty = True
+
+    def _row(self, fact: str) -> Tuple[str, tuple]:
+        """Parse a fact line into (predicate, tuple)."""
+        head, _ = parse_clause(fact)
+        return head[1], tuple(value for _, value in head[2])
+
+    def update(self, added: Iterable[str] = (), removed: Iterable[str] = ()):
+        """Apply a batch of added and removed fact lines to the base and derived relations."""
+        inserts: Dict[str, Set[tuple]] = {}
+        deletes: Dict[str, Set[tuple]] = {}
+        for fact in removed:
+            predicate, row = self._row(fact)
+            rows = self.base.get(predicate)
+            if rows is not None and row in rows:
+                rows.discard(row)
+                deletes.setdefault(predicate, set()).add(row)
+            self.loaded.discard(fact)
+        for fact in added:
+            predicate, row = self._row(fact)
+            rows = self.base.setdefault(predicate, set())
+            if row not in rows:
+                rows.add(row)
+                inserts.setdefault(predicate, set()).add(row)
+            self.loaded.add(fact)
+
+        if not inserts and not deletes:
+            return
+        if self.dirty or not self.monotonic:
+            self.dirty = True
+            return
+        if deletes:
+            self._delete(deletes)
+        if inserts:
+            self._insert(inserts)
+
+    def assert_fact(self, fact: str):
+        """Add a fact line like 'parent_of(ann, bob).'."""
+        self.update(added=[fact])
+
+    def retract_fact(self, fact: str):
+        """Remove a fact line."""
+        self.update(removed=[fact])
+
+    def load(self, facts: Set[str]):
+        """Hold exactly the given fact lines (same contract as ScopedProlog.load)."""
+        self.update(added=facts - self.loaded, removed=self.loaded - facts)
+
+    # FamilyGraph listener interface
+    fact_added = assert_fact
+    fact_removed = retract_fact
+
+    # ---- evaluation ----
+
+    def _plan(self, body: List[tuple], first: Optional[int], bound: Iterable[str] = ()) -> List[tuple]:
+        """Order body goals: the delta goal first, then relations, each check as soon as its variables are bound."""
+        relations = [i for i, goal in enumerate(body) if goal[0] == "rel"]
+        if first is not None:
+            relations.remove(first)
+            relations.insert(0, first)
+        outer = set(_variables([goal for goal in body if goal[0] == "rel"]))
+        checks = [goal for goal in body if goal[0] != "rel"]
+
+        def ready(check, bound):
+            if check[0] == "not":
+                # Variables only used inside not/1 stay existential
+                return set(_variables(check[1])) & outer <= bound
+            if check[0] == "eq":
+                return bool(set(_variables([check])) & bound) or not set(_variables([check]))
+            return set(_variables([check])) <= bound
+
+        plan = []
+        bound = set(bound)
+
+        def place_checks():
+            for check in [check for check in checks if ready(check, bound)]:
+                plan.append(("check", None, check))
+                checks.remove(check)
+                if check[0] == "eq":
+                    bound.update(_variables([check]))
+
+        place_checks()
+        for i in relations:
+            # The delta goal reads only the tuples that are new in this round
+            plan.append(("delta" if i == first else "scan", i, body[i]))
+            bound.update(_variables([body[i]]))
+            place_checks()
+        for check in checks:
+            plan.append(("check", None, check))
+        return plan
+
+    def _solve(self, plan: List[tuple], step: int, binding: Dict[str, str],
+               relations: Dict[str, Any], delta: Optional[Dict[str, Set[tuple]]]) -> Iterator[Dict[str, str]]:
+        """Enumerate the bindings satisfying the plan from `step` on."""
+        if step == len(plan):
+            yield binding
+            return
+        kind, index, goal = plan[step]
+
+        if kind == "check":
+            if self._check(goal, binding, relations):
+                # eq/2 with one unbound side binds it
+                if goal[0] == "eq":
+                    left, right = _resolve(goal[1], binding), _resolve(goal[2], binding)
+                    if left is None or right is None:
+                        extended = dict(binding)
+                        if left is None:
+                            extended[goal[1][1]] = right
+                        else:
+                            extended[goal[2][1]] = left
+                        yield from self._solve(plan, step + 1, extended, relations, delta)
+                        return
+                yield from self._solve(plan, step + 1, binding, relations, delta)
+            return
+
+        _, predicate, args = goal
+        positions = []
+        key = []
+        for position, term in enumerate(args):
+            value = _resolve(term, binding)
+            if value is not None:
+                positions.append(position)
+                key.append(value)
+
+        if kind == "delta":
+            candidates = [row for row in delta.get(predicate, ())
+                          if all(row[p] == v for p, v in zip(positions, key))]
+        else:
+            relation = relations.get(predicate)
+            if relation is None:
+                return
+            candidates = relation.lookup(tuple(positions), tuple(key))
+
+        for row in candidates:
+            if len(row) != len(args):
+                continue
+            extended = binding
+            consistent = True
+            for term, value in zip(args, row):
+                if term[0] == "var" and term[1] != "_":
+                    current = extended.get(term[1])
+                    if current is None:
+                        if extended is binding:
+                            extended = dict(binding)
+                        extended[term[1]] = value
+                    elif current != value:
+                        consistent = False
+                        break
+            if consistent:
+                yield from self._solve(plan, step + 1, extended, relations, delta)
+
+    def _check(self, goal: tuple, binding: Dict[str, str], relations: Dict[str, Any]) -> bool:
+        """Evaluate a \\=, = or not/1 goal under a binding."""
+        if goal[0] == "neq":
+            left, right = _resolve(goal[1], binding), _resolve(goal[2], binding)
+            # An unbound variable always unifies, so \= fails as in Prolog
+            return left is not None and right is not None and left != right
+        if goal[0] == "eq":
+            left, right = _resolve(goal[1], binding), _resolve(goal[2], binding)
+            return left is None or right is None or left == right
+        if goal[0] == "not":
+            plan = self._plan(goal[1], None)
+            return next(self._solve(plan, 0, dict(binding), relations, None), None) is None
+        return False
+
+    def _instantiate(self, head: tuple, binding: Dict[str, str]) -> Optional[tuple]:
+        row = tuple(_resolve(term, binding) for term in head[2])
+        return None if any(value is None for value in row) else row
+
+    def _consequences(self, delta: Dict[str, Set[tuple]]) -> Iterator[Tuple[str, tuple]]:
+        """Yield the head tuples of every rule derivation that uses at least one delta tuple."""
+        for rule_index, (head, body) in enumerate(self.rules):
+            for i, goal in enumerate(body):
+                # Only joins that use at least one changed tuple can produce changed results
+                if goal[0] != "rel" or not delta.get(goal[1]):
+                    continue
+                for binding in self._solve(self.delta_plans[(rule_index, i)], 0, {}, self.relations, delta):
+                    row = self._instantiate(head, binding)
+                    if row is not None:
+                        yield head[1], row
+
+    def _propagate(self, delta: Dict[str, Set[tuple]]):
+        """Run semi-naive rounds from tuples just added to the relations until nothing new appears."""
+        while delta:
+            new: Dict[str, Set[tuple]] = {}
+            for predicate, row in self._consequences(delta):
+                relation = self.relations.get(predicate)
+                if relation is None or row not in relation.tuples:
+                    new.setdefault(predicate, set()).add(row)
+            for predicate, rows in new.items():
+                relation = self.relations.setdefault(predicate, Relation())
+                for row in rows:
+                    relation.add(row)
+            delta = new
+
+    def evaluate(self):
+        """Materialize every derived relation from scratch."""
+        self.relations = {}
+        delta: Dict[str, Set[tuple]] = {}
+        for predicate, rows in self.base.items():
+            relation = self.relations.setdefault(predicate, Relation())
+            for row in rows:
+                relation.add(row)
+            delta[predicate] = set(rows)
+        self._propagate(delta)
+        self.dirty = False
+
+    def _insert(self, rows_by_predicate: Dict[str, Set[tuple]]):
+        """Add tuples to the materialized relations and derive their consequences."""
+        delta: Dict[str, Set[tuple]] = {}
+        for predicate, rows in rows_by_predicate.items():
+            relation = self.relations.setdefault(predicate, Relation())
+            added = {row for row in rows if relation.add(row)}
+            if added:
+                delta[predicate] = added
+        self._propagate(delta)
+
+    def _delete(self, rows_by_predicate: Dict[str, Set[tuple]]):
+        """Remove tuples with DRed: over-delete everything derived through them, then rederive survivors."""
+        # Over-delete, joining against the old relations so every affected derivation is seen
+        doomed: Dict[str, Set[tuple]] = {}
+        delta: Dict[str, Set[tuple]] = {}
+        for predicate, rows in rows_by_predicate.items():
+            relation = self.relations.get(predicate)
+            present = {row for row in rows if relation is not None and row in relation.tuples}
+            if present:
+                doomed[predicate] = set(present)
+                delta[predicate] = present
+        while delta:
+            new: Dict[str, Set[tuple]] = {}
+            for predicate, row in self._consequences(delta):
+                if row not in doomed.setdefault(predicate, set()):
+                    doomed[predicate].add(row)
+                    new.setdefault(predicate, set()).add(row)
+            delta = new
+
+        for predicate, rows in doomed.items():
+            relation = self.relations.get(predicate)
+            for row in rows:
+                relation.remove(row)
+
+        # Rederive: stored facts and tuples with a derivation that avoids the deleted ones
+        survivors: Dict[str, Set[tuple]] = {}
+        for predicate, rows in doomed.items():
+            for row in rows:
+                if row in self.base.get(predicate, ()) or self._derivable(predicate, row):
+                    survivors.setdefault(predicate, set()).add(row)
+        self._insert(survivors)
+
+    def _derivable(self, predicate: str, row: tuple) -> bool:
+        """Check whether some rule derives the tuple from the current relations in one step."""
+        for head, body in self.rules:
+            if head[1] != predicate or len(head[2]) != len(row):
+                continue
+            binding: Dict[str, str] = {}
+            unifies = True
+            for term, value in zip(head[2], row):
+                if term[0] == "const" or term[1] in binding:
+                    expected = term[1] if term[0] == "const" else binding[term[1]]
+                    if expected != value:
+                        unifies = False
+                        break
+                else:
+                    binding[term[1]] = value
+            if not unifies:
+                continue
+            plan = self._plan(body, None, binding)
+            if next(self._solve(plan, 0, binding, self.relations, None), None) is not None:
+                return True
+        return False
+
+    # ---- queries ----
+
+    def query(self, query: str) -> Iterator[Dict[str, str]]:
+        """Answer a conjunctive query, yielding one binding dict per distinct answer."""
+        query = query.strip()
+        if query.startswith(":-"):
+            return iter([])
+        if query.endswith("."):
+            query = query[:-1]
+        if self.dirty:
+            self.evaluate()
+
+        goals = parse_query(query)
+        names = [name for name in _variables(goals) if not name.startswith("_")]
+        plan = self._plan(goals, None)
+
+        answers = []
+        seen = set()
+        for binding in self._solve(plan, 0, {}, self.relations, None):
+            answer = tuple(binding.get(name) for name in names)
+            if answer not in seen:
+                seen.add(answer)
+                answers.append(dict(zip(names, answer)))
+        return iter(answers)
+
+# Materialized views per knowledge base file, kept current by the family graph
+_views: Dict[str, DatalogEngine] = {}
+
+def get_materialized_views(kb_file: str) -> DatalogEngine:
+    """Return a Datalog engine holding the facts of a knowledge base file, maintained incrementally.
+
+    The engine listens to the file's family graph, so each edit to the file reaches it
+    as added and removed facts instead of a full re-evaluation.
+    """
+    from family_graph import get_family_graph
+
+    graph = get_family_graph(kb_file)
+    engine = _views.get(kb_file)
+    if engine is None:
+        engine = DatalogEngine()
+        engine.load(set(graph.facts))
+        graph.add_listener(engine)
+        _views[kb_file] = engine
+        CONSULTS.inc(backend="datalog")
+    return engine
@@ -0,0 +1,67 @@
+"""Compare the Datalog backend with SWI-Prolog on a knowledge base file.
+
+Usage: python datalog_conformance.py [kb_file ...]
+
+Every rule head predicate is queried with all arguments unbound, together with the
+conjunctive checks the relationship validator sends, and the answer sets of both
+engines must be identical. Exits with status 1 when any answer differs.
+"""
+import sys
+from typing import List, Set, Tuple
+from datalog import DatalogEngine, parse_clause, read_clauses
+
+# Conjunctions shaped like the validator's and query handler's queries
+VALIDATOR_QUERIES = [
+    "parent_of(X, Y), parent_of(Y, Z), X \\= Z",
+    "sibling_of(X, Y), parent_of(X, Y)",
+    "parent_of(P, X), parent_of(P, Y), X \\= Y, not(sibling_of(X, Y))",
+    "parent_of(X, Y), \\+ male(X), \\+ female(X)",
+    "ancestor_of(X, Y), ancestor_of(Y, X)",
+    "male(X), female(X)",
+]
+
+def rule_queries(kb_file: str) -> List[str]:
+    """Build one fully unbound query per predicate defined by a rule in the file."""
+    with open(kb_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    heads = {}
+    for clause in read_clauses(text):
+        head, body = parse_clause(clause)
+        if body:
+            heads[head[1]] = len(head[2])
+    variables = "XYZW"
+    return [f"{predicate}({', '.join(variables[:arity])})" for predicate, arity in sorted(heads.items())]
+
+def answer_set(results) -> Set[Tuple[Tuple[str, str], ...]]:
+    """Normalize query results so both engines' answers can be compared."""
+    return {tuple(sorted((str(k), str(v)) for k, v in result.items())) for result in results}
+
+def check_file(kb_file: str) -> int:
+    """Run every conformance query on one file and return the number of mismatches."""
+    from pyswip import Prolog
+
+    prolog = Prolog()
+    prolog.consult(kb_file)
+    datalog = DatalogEngine()
+    datalog.consult(kb_file)
+
+    mismatches = 0
+    for query in rule_queries(kb_file) + VALIDATOR_QUERIES:
+        expected = answer_set(prolog.query(query))
+        actual = answer_set(datalog.query(query))
+        if expected != actual:
+            mismatches += 1
+            print(f"MISMATCH {kb_file}: {query}")
+            for answer in sorted(expected - actual)[:10]:
+                print(f"  only in Prolog:  {dict(answer)}")
+            for answer in sorted(actual - expected)[:10]:
+                print(f"  only in Datalog: {dict(answer)}")
+        else:
+            print(f"ok {query} ({len(expected)} answers)")
+    return mismatches
+
+if __name__ == "__main__":
+    files = sys.argv[1:] or ["relationships.pl"]
+    failures = sum(check_file(kb_file) for kb_file in files)
+    print(f"{failures} mismatching queries")
+    sys.exit(1 if failures else 0)
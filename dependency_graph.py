@@ -0,0 +1,61 @@
+import io
+from typing import Dict, Set, List, Tuple, Optional
+from rule_writer import write_correct_rules
+from datalog import parse_clause, read_clauses
+
+def _body_predicates(body: List[tuple]) -> Set[str]:
+    """Return the predicates read by the goals of a rule body, including inside not/1."""
+    predicates = set()
+    for goal in body:
+        if goal[0] == "rel":
+            predicates.add(goal[1])
+        elif goal[0] == "not":
+            predicates |= _body_predicates(goal[1])
+    return predicates
+
+class DependencyGraph:
+    """Which derived predicates can change when the facts of another predicate change.
+
+    An edge body -> head is added for every rule; affected(p) is everything reachable
+    from p, so adding male(X) affects father_of, brother_of, uncle_of and so on, but
+    not sibling_of or cousin_of.
+    """
+
+    def __init__(self, rules: List[Tuple[tuple, List[tuple]]]):
+        self.dependents: Dict[str, Set[str]] = {}
+        self.derived: Set[str] = set()
+        for head, body in rules:
+            self.derived.add(head[1])
+            for predicate in _body_predicates(body):
+                self.dependents.setdefault(predicate, set()).add(head[1])
+        self._affected: Dict[str, Set[str]] = {}
+
+    def affected(self, predicate: str) -> Set[str]:
+        """Return the predicate itself and every predicate derived from it, directly or not."""
+        cached = self._affected.get(predicate)
+        if cached is not None:
+            return cached
+        result = {predicate}
+        stack = [predicate]
+        while stack:
+            for dependent in self.dependents.get(stack.pop(), ()):
+                if dependent not in result:
+                    result.add(dependent)
+                    stack.append(dependent)
+        self._affected[predicate] = result
+        return result
+
+    def base_predicates(self) -> Set[str]:
+        """Return the predicates that only appear in rule bodies."""
+        return set(self.dependents) - self.derived
+
+_family_dependencies: Dict[str, Optional[DependencyGraph]] = {"graph": None}
+
+def get_dependency_graph() -> DependencyGraph:
+    """Return the dependency graph of the family rules written by rule_writer."""
+    if _family_dependencies["graph"] is None:
+        buffer = io.StringIO()
+        write_correct_rules(buffer)
+        rules = [parse_clause(clause) for clause in read_clauses(buffer.getvalue())]
+        _family_dependencies["graph"] = DependencyGraph([(head, body) for head, body in rules if body])
+    return _family_dependencies["graph"]
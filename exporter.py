@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+from typing import Iterator, List, Tuple, Dict
+from family_graph import get_family_graph, parse_fact
+from utils import is_sibling_group
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "gedcom": "text/plain",
+}
+
+# Records joined into one chunk of the streamed response
+CHUNK_RECORDS = 500
+
+def iter_base_facts(kb_file: str) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+    """Yield the stored facts of a knowledge base file, reading it line by line."""
+    with open(kb_file, "r", encoding="utf-8") as f:
+        for line in f:
+            parsed = parse_fact(line)
+            if parsed:
+                yield parsed
+
+def iter_derived_facts(kb_file: str, relations: List[str]) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+    """Yield every pair of the requested derived relations, computed with the kinship matrices."""
+    from kinship_matrix import iter_relation_pairs, matrices_available
+    if not matrices_available():
+        raise RuntimeError("NumPy is required to export derived relations.")
+    for relation in relations:
+        for pair in iter_relation_pairs(kb_file, relation):
+            yield relation, pair
+
+def _chunks(lines: Iterator[str]) -> Iterator[str]:
+    """Join output lines into chunks so the response is not flushed line by line."""
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= CHUNK_RECORDS:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+def _csv_lines(kb_file: str, relations: List[str]) -> Iterator[str]:
+    """Render facts as predicate,subject,object,derived rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(values):
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield row(["predicate", "subject", "object", "derived"])
+    for predicate, args in iter_base_facts(kb_file):
+        yield row([predicate, args[0], args[1] if len(args) > 1 else "", "false"])
+    for predicate, args in iter_derived_facts(kb_file, relations) if relations else ():
+        yield row([predicate, args[0], args[1], "true"])
+
+def _ndjson_lines(kb_file: str, relations: List[str]) -> Iterator[str]:
+    """Render facts as one JSON object per line."""
+    for predicate, args in iter_base_facts(kb_file):
+        yield json.dumps({"predicate": predicate, "args": list(args), "derived": False}) + "\n"
+    for predicate, args in iter_derived_facts(kb_file, relations) if relations else ():
+        yield json.dumps({"predicate": predicate, "args": list(args), "derived": True}) + "\n"
+
+def _gedcom_name(person: str) -> str:
+    """Display name for a GEDCOM NAME line; generated shared parents have no known name."""
+    if person.startswith("shared_mother_") or person.startswith("shared_father_"):
+        return "Unknown"
+    return " ".join(part.capitalize() for part in person.split("_"))
+
+def _gedcom_lines(kb_file: str) -> Iterator[str]:
+    """Render the family tree as GEDCOM 5.5.1 individuals and families.
+
+    Every distinct set of parents becomes one FAM record, and so does every sibling group
+    whose members share no parent; derived relations are implied by that structure, so
+    they are not written separately.
+    """
+    graph = get_family_graph(kb_file)
+    # Sibling group ids are not people; their members are linked through FAM records
+    people = sorted(person for person in graph.people() if not is_sibling_group(person))
+    person_ids = {person: f"@I{i + 1}@" for i, person in enumerate(people)}
+    family_ids: Dict[Tuple[str, ...], str] = {}
+
+    def parents_of(person):
+        return tuple(sorted(args[0] for _, args in graph.facts_about(person, "parent_of") if args[1] == person))
+
+    def children_of(person):
+        return sorted(args[1] for _, args in graph.facts_about(person, "parent_of") if args[0] == person)
+
+    def family_id(parents):
+        if parents not in family_ids:
+            family_ids[parents] = f"@F{len(family_ids) + len(group_families) + 1}@"
+        return family_ids[parents]
+
+    # Siblings without a parent in common are only linked by a family of their own
+    group_families: Dict[str, Tuple[str, List[str]]] = {}
+    for group in sorted(person for person in graph.people() if is_sibling_group(person)):
+        members = sorted(args[1] for _, args in graph.facts_about(group, "sibling_group") if args[0] == group)
+        common = set.intersection(*(set(parents_of(member)) for member in members)) if members else set()
+        if len(members) > 1 and not common:
+            group_families[group] = (f"@F{len(family_ids) + len(group_families) + 1}@", members)
+    sibling_families: Dict[str, List[str]] = {}
+    for fam_id, members in group_families.values():
+        for member in members:
+            sibling_families.setdefault(member, []).append(fam_id)
+
+    yield "0 HEAD\n1 SOUR FAMILY_CHATBOT\n1 GEDC\n2 VERS 5.5.1\n2 FORM LINEAGE-LINKED\n1 CHAR UTF-8\n"
+
+    for person in people:
+        record = [f"0 {person_ids[person]} INDI\n", f"1 NAME {_gedcom_name(person)}\n"]
+        if f"male({person})." in graph.facts:
+            record.append("1 SEX M\n")
+        elif f"female({person})." in graph.facts:
+            record.append("1 SEX F\n")
+        parents = parents_of(person)
+        if parents:
+            record.append(f"1 FAMC {family_id(parents)}\n")
+        for fam_id in sibling_families.get(person, []):
+            record.append(f"1 FAMC {fam_id}\n")
+        for parents_of_child in sorted(set(parents_of(child) for child in children_of(person))):
+            record.append(f"1 FAMS {family_id(parents_of_child)}\n")
+        yield "".join(record)
+
+    # Families are written once every id has been handed out by the individuals above
+    for fam_id, members in group_families.values():
+        yield "".join([f"0 {fam_id} FAM\n"] + [f"1 CHIL {person_ids[member]}\n" for member in members])
+    for parents, fam_id in family_ids.items():
+        record = [f"0 {fam_id} FAM\n"]
+        for parent in parents:
+            tag = "WIFE" if f"female({parent})." in graph.facts else "HUSB"
+            record.append(f"1 {tag} {person_ids[parent]}\n")
+        for child in children_of(parents[0]):
+            if parents_of(child) == parents:
+                record.append(f"1 CHIL {person_ids[child]}\n")
+        yield "".join(record)
+
+    yield "0 TRLR\n"
+
+def export_stream(kb_file: str, export_format: str, relations: List[str]) -> Iterator[str]:
+    """Return a chunked stream of the knowledge base in the requested format."""
+    if export_format == "csv":
+        return _chunks(_csv_lines(kb_file, relations))
+    if export_format == "ndjson":
+        return _chunks(_ndjson_lines(kb_file, relations))
+    if export_format == "gedcom":
+        return _chunks(_gedcom_lines(kb_file))
+    raise ValueError(f"Unsupported export format: {export_format}")
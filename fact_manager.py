@@ -1,23 +1,74 @@
 import re
 import time
-from typing import List, Tuple
-from pyswip import Prolog
-from utils import to_prolog_name, validate_prolog_file, safe_prolog_query
+from typing import List, Tuple, Dict, Any
+from utils import to_prolog_name, validate_prolog_file, safe_prolog_query, get_prolog_engine, is_shared_parent
 from rule_writer import write_correct_rules
+from family_graph import get_family_graph, parse_fact
+from placeholders import PlaceholderManager
+from clarification_state import PendingClarification, get_pending, set_pending
+from provenance import get_provenance_log
+from statement_ir import ValidationOutcome, parse_facts
+from tracing import span, traced
+from logs import get_logger
 
 # Global variable for current knowledge base file
 current_kb_file = "relationships.pl"
 
-# Global variable for clarification context
-clarification_context = None
+log = get_logger("fact_manager")
+
+# Validator follow-up action -> FactManager method that asks the question or makes the change
+VALIDATION_ACTIONS: Dict[str, str] = {
+    "ask_clarification": "_handle_parent_clarification",
+    "ask_aunt_uncle_clarification": "_handle_aunt_uncle_clarification",
+    "ask_aunt_uncle_sophisticated": "_handle_aunt_uncle_sophisticated",
+    "add_direct_aunt_uncle": "_handle_direct_aunt_uncle",
+    "ask_sibling_clarification": "_handle_sibling_clarification",
+    "ask_sibling_parent_clarification": "_handle_sibling_parent_clarification",
+    "ask_full_sibling_clarification": "_handle_full_sibling_clarification",
+    "add_parent_to_full_siblings": "_handle_add_parent_to_full_siblings",
+    "handle_direct_grandparent": "_handle_direct_grandparent",
+    "ask_child_clarification": "_handle_child_clarification",
+    "delete_shared_parent_add_father": "_handle_delete_shared_parent_add_father",
+    "delete_shared_parent_add_mother": "_handle_delete_shared_parent_add_mother",
+}
+
+# Gendered words of parent statements -> (argument of parent_of they name, gender they imply)
+GENDERED_PARENT_WORDS: Dict[str, Tuple[int, str]] = {
+    "father": (0, "male"),
+    "mother": (0, "female"),
+    "son": (1, "male"),
+    "daughter": (1, "female"),
+}
+
+def split_statements(text: str) -> List[str]:
+    """Split a paragraph or file of statements into one sentence per entry."""
+    statements = []
+    for line in text.splitlines():
+        # Several sentences can share a line: "A is the father of B. B is male."
+        for sentence in re.split(r'(?<=[.?!])\s+(?=[A-Z])', line.strip()):
+            if sentence.strip():
+                statements.append(sentence.strip())
+    return statements
 
 class FactManager:
     def __init__(self):
-        pass
+        # Engine state of the question being asked or answered; None means use the resident engine
+        self.snapshot = None
+        self.engine = None
+    
+    def _engine(self):
+        """Return the engine a clarification answer is processed with, or the resident engine."""
+        if self.engine is not None:
+            return self.engine
+        return get_prolog_engine(current_kb_file)
+    
+    def _ask(self, kind: str, statement: str, **details) -> PendingClarification:
+        """Make the session wait for the answer to a follow-up question."""
+        pending = PendingClarification(kind, statement, self.snapshot, **details)
+        set_pending(current_kb_file, pending)
+        return pending
     
     def add_fact(self, statement: str, statement_patterns: List[Tuple], validator) -> str:
-        global clarification_context
-        
         # Parse the statement into a fact
         fact, name_error = self._parse_statement_to_fact(statement, statement_patterns)
         if name_error:
@@ -26,42 +77,197 @@ class FactManager:
             return f"Unrecognized or invalid statement: {statement}"
         
         # Validate the relationship
-        is_valid, error_message = validator.validate_relationship(statement, fact)
-        if not is_valid:
-            if error_message.startswith("ask_clarification:"):
-                return self._handle_parent_clarification(error_message, statement)
-
-            elif error_message.startswith("ask_aunt_uncle_clarification:"):
-                return self._handle_aunt_uncle_clarification(error_message, statement)
-            elif error_message.startswith("ask_aunt_uncle_sophisticated:"):
-                return self._handle_aunt_uncle_sophisticated(error_message, statement)
-            elif error_message.startswith("add_direct_aunt_uncle:"):
-                return self._handle_direct_aunt_uncle(error_message, statement)
-            elif error_message.startswith("ask_sibling_clarification:"):
-                return self._handle_sibling_clarification(error_message, statement)
-
-            elif error_message.startswith("ask_sibling_parent_clarification:"):
-                return self._handle_sibling_parent_clarification(error_message, statement)
-            elif error_message.startswith("ask_full_sibling_clarification:"):
-                return self._handle_full_sibling_clarification(error_message, statement)
-            elif error_message.startswith("add_parent_to_full_siblings:"):
-                return self._handle_add_parent_to_full_siblings(error_message, statement)
-            elif error_message.startswith("handle_direct_grandparent:"):
-                return self._handle_direct_grandparent(error_message, statement)
-            elif error_message.startswith("ask_grandparent_clarification:"):
-                return self._handle_grandparent_clarification(error_message, statement)
-            elif error_message.startswith("ask_child_clarification:"):
-                return self._handle_child_clarification(error_message, statement)
-            elif error_message.startswith("delete_shared_parent_add_father:"):
-                return self._handle_delete_shared_parent_add_father(error_message, statement)
-            elif error_message.startswith("delete_shared_parent_add_mother:"):
-                return self._handle_delete_shared_parent_add_mother(error_message, statement)
-            else:
-                return error_message
+        outcome = validator.validate(statement, parse_facts(fact))
+        if not outcome.valid:
+            # A follow-up question is answered from the engine that raised it
+            self.snapshot = validator.snapshot()
+            return self._handle_validation_message(outcome, statement)
         
         # Add the fact to the knowledge base
         return self._write_fact_to_file(fact, statement)
     
+    def _handle_validation_message(self, outcome: ValidationOutcome, statement: str) -> str:
+        """Act on a validation outcome: ask its follow-up question, make its automatic change or return the error."""
+        handler = VALIDATION_ACTIONS.get(outcome.action)
+        if handler is None:
+            return outcome.message
+        return getattr(self, handler)(outcome, statement)
+    
+    def add_facts_batch(self, text: str, statement_patterns: List[Tuple], validator, policy: str = "") -> List[Dict[str, Any]]:
+        """Validate many statements against one knowledge base state and write the accepted facts together.
+        
+        Accepted facts are held in the in-memory family graph while the rest of the batch is
+        validated, so later statements see earlier ones without touching the file. They are
+        written when the batch ends, and also before each statement needing a follow-up, so
+        the answer builds on them.
+        
+        When the caller records provenance, every statement that changed the knowledge base
+        gets a record of its own, stored once its facts are written.
+        
+        Follow-up questions are answered by the clarification policy (see
+        clarification.CLARIFICATION_POLICIES); a question the policy has no answer for is
+        deferred: the statement is reported with status "deferred" and the question text.
+        """
+        from clarification import ClarificationHandler, CLARIFICATION_POLICIES, DEFAULT_CLARIFICATION_POLICY
+        
+        policy = policy or DEFAULT_CLARIFICATION_POLICY
+        if policy not in CLARIFICATION_POLICIES:
+            raise ValueError(f"Unknown clarification policy: {policy}")
+        clarifications = ClarificationHandler()
+        
+        results = []
+        accepted_facts = []
+        unwritten = []
+        graph = get_family_graph(current_kb_file)
+        overlay = []
+        provenance = get_provenance_log(current_kb_file)
+        recording = provenance.recording
+        # (statement, added, removed) of accepted statements whose facts are not written yet
+        changes = []
+        # The chat's own pending question survives the batch
+        interrupted = get_pending(current_kb_file)
+        
+        def drop_overlay():
+            """Take unwritten facts out of the graph; they were never in the knowledge base."""
+            if recording:
+                provenance.begin()
+            for line in overlay:
+                graph.remove_fact(line)
+            if recording:
+                provenance.discard()
+            overlay.clear()
+        
+        def flush() -> str:
+            """Write the facts accepted so far, so a clarification answer builds on them."""
+            if not accepted_facts:
+                drop_overlay()
+                return ""
+            write_result = self._write_organized_facts_to_file(list(accepted_facts))
+            if write_result.startswith("Error"):
+                drop_overlay()
+                for result in unwritten:
+                    result["status"] = "error"
+                    result["message"] = write_result
+            else:
+                # The overlay facts are now on disk; whatever the write changed beyond them
+                # (merged placeholder parents) goes to the caller's own record
+                get_family_graph(current_kb_file)
+                overlay.clear()
+                for statement, added, removed in changes:
+                    provenance.store(statement, added, removed, kind="ingest")
+            changes.clear()
+            accepted_facts.clear()
+            unwritten.clear()
+            return write_result
+        
+        try:
+            for number, statement in enumerate(split_statements(text), start=1):
+                result = {"line": number, "statement": statement, "status": "", "message": ""}
+                results.append(result)
+                
+                if statement.endswith('?'):
+                    result["status"] = "skipped"
+                    result["message"] = "Questions are not ingested."
+                    continue
+                
+                fact, name_error = self._parse_statement_to_fact(statement, statement_patterns)
+                if name_error:
+                    result["status"] = "rejected"
+                    result["message"] = name_error
+                    continue
+                if not fact:
+                    result["status"] = "unrecognized"
+                    result["message"] = f"Unrecognized or invalid statement: {statement}"
+                    continue
+                
+                fact_lines = [line.strip() for line in fact.split('\n') if line.strip()]
+                if all(line in graph.facts for line in fact_lines):
+                    result["status"] = "known"
+                    result["message"] = "I already knew that."
+                    continue
+                
+                outcome = validator.validate(statement, parse_facts(fact))
+                if not outcome.valid:
+                    if outcome.action:
+                        self._resolve_batch_clarification(result, outcome, validator, policy, clarifications, flush,
+                                                          provenance if recording else None)
+                    else:
+                        result["status"] = "rejected"
+                        result["message"] = outcome.message
+                    continue
+                
+                result["status"] = "added"
+                result["message"] = "OK! I learned something new."
+                unwritten.append(result)
+                if recording:
+                    provenance.begin()
+                for line in fact_lines:
+                    accepted_facts.append(line)
+                    if parse_fact(line) and graph.add_fact(line):
+                        overlay.append(line)
+                if recording:
+                    changes.append((statement,) + provenance.stop())
+            
+            flush()
+        finally:
+            drop_overlay()
+            set_pending(current_kb_file, interrupted)
+        
+        return results
+    
+    def _resolve_batch_clarification(self, result: Dict[str, Any], outcome: ValidationOutcome, validator, policy: str,
+                                     clarifications, flush, provenance=None) -> None:
+        """Settle a batch statement that needs a follow-up, answering from the policy where it can.
+        
+        With a provenance log, the facts the answer writes are recorded under the statement.
+        """
+        write_result = flush()
+        if write_result.startswith("Error"):
+            result["status"] = "error"
+            result["message"] = write_result
+            return
+        
+        self.snapshot = validator.snapshot()
+        set_pending(current_kb_file, None)
+        if provenance is not None:
+            provenance.begin()
+        try:
+            reply = self._handle_validation_message(outcome, result["statement"])
+            reply, question = clarifications.resolve(reply, policy)
+        finally:
+            if provenance is not None:
+                provenance.end(result["statement"], kind="ingest")
+        
+        if question is not None:
+            result["status"] = "deferred"
+            result["message"] = reply
+            result["question"] = question.kind
+        elif reply.startswith("That's impossible") or reply.startswith("Error"):
+            result["status"] = "rejected"
+            result["message"] = reply
+        elif reply == "I already knew that.":
+            result["status"] = "known"
+            result["message"] = reply
+        else:
+            result["status"] = "added"
+            result["message"] = reply
+    
+    def format_batch_results(self, results: List[Dict[str, Any]]) -> str:
+        """Summarize batch outcomes as a chat reply, one line per statement."""
+        if not results:
+            return "No statements found in the batch."
+        
+        counts = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        summary = ", ".join(f"{count} {status}" for status, count in counts.items())
+        
+        lines = [f"Processed {len(results)} statements: {summary}."]
+        for result in results:
+            lines.append(f"{result['line']}. {result['statement']} -> {result['message']}")
+        return '\n'.join(lines)
+    
+    @traced("parse")
     def _parse_statement_to_fact(self, statement: str, statement_patterns: List[Tuple]) -> Tuple[str, str]:
         for _, pattern, func in statement_patterns:
             match = re.fullmatch(pattern, statement.strip())
@@ -76,8 +282,8 @@ class FactManager:
                 elif "parent" in pattern and "and" in pattern:
                     # For "X and Y are parents of Z" patterns, groups 1, 2, and 3 are person names
                     person_name_groups = [1, 2, 3]
-                elif "is (male|female)" in pattern:
-                    # For gender patterns like "X is male/female", only group 1 is a person name
+                elif "(male|female)" in pattern:
+                    # For gender patterns like "X is (not) male/female", only group 1 is a person name
                     person_name_groups = [1]
                 elif len(match.groups()) >= 3:
                     # For most other patterns, groups 1 and 3 are person names (group 2 is relationship type)
@@ -98,41 +304,21 @@ class FactManager:
                 return func(match), ""
         return "", ""
     
-    def _handle_parent_clarification(self, error_message: str, statement: str) -> str:
+    def _handle_parent_clarification(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle parent clarification requests."""
-        global clarification_context
+        new_parent, child, siblings = outcome.args
         
-        parts = error_message.split(":")
-        new_parent = parts[1]
-        child = parts[2]
-        siblings = parts[3]
-        
-        clarification_context = {
-            "new_parent": new_parent,
-            "child": child,
-            "siblings": siblings,
-            "original_statement": statement
-        }
+        self._ask("parent_of_siblings", statement, new_parent=new_parent, child=child, siblings=siblings)
         
         return f"Clarification needed: Is {new_parent.capitalize()} also the parent of {siblings}? Answer with: yes or no."
     
 
     
-    def _handle_aunt_uncle_clarification(self, error_message: str, statement: str) -> str:
+    def _handle_aunt_uncle_clarification(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle aunt/uncle clarification requests."""
-        global clarification_context
-        
-        parts = error_message.split(":")
-        aunt_uncle = parts[1]
-        niece_nephew = parts[2]
-        parent = parts[3]
+        aunt_uncle, niece_nephew, parent = outcome.args
         
-        clarification_context = {
-            "new_parent": aunt_uncle,
-            "original_statement": statement,
-            "child": niece_nephew,
-            "siblings": f"{parent}"
-        }
+        self._ask("aunt_uncle_side", statement, aunt_uncle=aunt_uncle, niece_nephew=niece_nephew, parent=parent)
         
         # Check if this is aunt or uncle based on the original statement
         if "aunt" in statement.lower():
@@ -140,22 +326,11 @@ class FactManager:
         else:
             return f"Clarification needed: Is {aunt_uncle.capitalize()} the brother of {parent.capitalize()}'s father or mother? Answer with: father or mother."
     
-    def _handle_aunt_uncle_sophisticated(self, error_message: str, statement: str) -> str:
+    def _handle_aunt_uncle_sophisticated(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle sophisticated aunt/uncle clarification requests."""
-        global clarification_context
-        
-        parts = error_message.split(":")
-        aunt_uncle = parts[1]
-        niece_nephew = parts[2]
-        parent = parts[3]
+        aunt_uncle, niece_nephew, parent = outcome.args
         
-        clarification_context = {
-            "aunt_uncle": aunt_uncle,
-            "niece_nephew": niece_nephew,
-            "parent": parent,
-            "original_statement": statement,
-            "clarification_type": "aunt_uncle_sophisticated"
-        }
+        self._ask("aunt_uncle_maternal", statement, aunt_uncle=aunt_uncle, niece_nephew=niece_nephew, parent=parent)
         
         # Check if this is aunt or uncle based on the original statement
         if "aunt" in statement.lower():
@@ -163,11 +338,9 @@ class FactManager:
         else:
             return f"Clarification needed: Is {aunt_uncle.capitalize()} a maternal uncle of {niece_nephew.capitalize()}? Answer with exactly 'yes' or 'no'."
     
-    def _handle_direct_aunt_uncle(self, error_message: str, statement: str) -> str:
+    def _handle_direct_aunt_uncle(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle direct aunt/uncle addition when niece/nephew has no parent."""
-        parts = error_message.split(":")
-        aunt_uncle = parts[1]
-        niece_nephew = parts[2]
+        aunt_uncle, niece_nephew = outcome.args
         
         try:
             # Read current contents
@@ -193,49 +366,28 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding direct aunt/uncle relationship: {e}")
+            log.error("error adding direct aunt/uncle relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
-    def _handle_sibling_clarification(self, error_message: str, statement: str) -> str:
+    def _handle_sibling_clarification(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle sibling clarification requests."""
-        global clarification_context
+        person1, person2 = outcome.args
         
-        parts = error_message.split(":")
-        person1 = parts[1]
-        person2 = parts[2]
-        
-        clarification_context = {
-            "person1": person1,
-            "person2": person2,
-            "siblings": "sibling_clarification",
-            "original_statement": statement
-        }
+        self._ask("sibling_mother", statement, person1=person1, person2=person2)
         
         return f"Clarification needed: To establish that {person1.capitalize()} and {person2.capitalize()} are siblings, I need to know their shared parent(s). Who is the mother of both {person1.capitalize()} and {person2.capitalize()}? (If they have different mothers, say 'none')"
     
-    def _handle_full_sibling_clarification(self, error_message: str, statement: str) -> str:
+    def _handle_full_sibling_clarification(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle full sibling clarification requests."""
-        global clarification_context
-        
-        parts = error_message.split(":")
-        person1 = parts[1]
-        person2 = parts[2]
+        person1, person2 = outcome.args
         
-        clarification_context = {
-            "person1": person1,
-            "person2": person2,
-            "clarification_type": "full_sibling",
-            "original_statement": statement
-        }
+        self._ask("full_sibling", statement, person1=person1, person2=person2)
         
         return f"Are {person1.capitalize()} and {person2.capitalize()} full siblings? Answer with exactly 'yes' or 'no' (without the apostrophes)."
     
-    def _handle_add_parent_to_full_siblings(self, error_message: str, statement: str) -> str:
+    def _handle_add_parent_to_full_siblings(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle adding a parent to all full siblings."""
-        parts = error_message.split(":")
-        parent = parts[1]
-        child = parts[2]
-        siblings_str = parts[3]
+        parent, child, siblings_str = outcome.args
         
         # Parse the siblings list
         sibling_names = [s.strip() for s in siblings_str.split(',')]
@@ -252,11 +404,9 @@ class FactManager:
                 new_facts.append(parent_fact)
         
         # Add gender fact for the parent if not already present
-        from pyswip import Prolog
         from utils import safe_prolog_query
         
-        prolog = Prolog()
-        prolog.consult(current_kb_file)
+        prolog = get_prolog_engine(current_kb_file)
         
         # Determine parent gender from the statement
         if "mother" in statement.lower():
@@ -273,22 +423,17 @@ class FactManager:
         else:
             return "I already knew that."
     
-    def _handle_direct_grandparent(self, error_message: str, statement: str) -> str:
+    def _handle_direct_grandparent(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle direct grandparent statements with maternal/paternal clarification."""
-        parts = error_message.split(":")
-        grandparent = parts[1]
-        grandchild = parts[2]
-        grandparent_gender = parts[3]  # "male", "female", or "unknown"
+        grandparent, grandchild, grandparent_gender = outcome.args  # "male", "female", or "unknown"
         
-        from pyswip import Prolog
         from utils import safe_prolog_query
         
         # Read current contents
         with open(current_kb_file, "r", encoding="utf-8") as f:
             old_contents = f.read()
         
-        prolog = Prolog()
-        prolog.consult(current_kb_file)
+        prolog = get_prolog_engine(current_kb_file)
         
         # Find the parent(s) of the grandchild
         parent_results = safe_prolog_query(prolog, f"parent_of(X, {grandchild})")
@@ -334,14 +479,9 @@ class FactManager:
             if existing_grandparent:
                 return f"That's impossible! {grandparent.capitalize()} is already a grandparent of {grandchild.capitalize()}."
         
-        # Store the grandparent context for clarification
-        global clarification_context
-        clarification_context = {
-            "grandparent": grandparent,
-            "grandchild": grandchild,
-            "grandparent_gender": grandparent_gender,
-            "original_statement": statement
-        }
+        # Wait for the maternal/paternal answer
+        self._ask("grandparent_side", statement, grandparent=grandparent, grandchild=grandchild,
+                  grandparent_gender=grandparent_gender)
         
         # Ask for clarification about maternal vs paternal
         if grandparent_gender == "female":
@@ -353,15 +493,13 @@ class FactManager:
     
     def add_grandparent_relationship(self, grandparent: str, grandchild: str, grandparent_gender: str, grandparent_type: str, original_statement: str = "") -> str:
         """Add grandparent relationship based on clarification response."""
-        from pyswip import Prolog
         from utils import safe_prolog_query
         
         # Read current contents
         with open(current_kb_file, "r", encoding="utf-8") as f:
             old_contents = f.read()
         
-        prolog = Prolog()
-        prolog.consult(current_kb_file)
+        prolog = self._engine()
         
         # Find the parent(s) of the grandchild
         parent_results = safe_prolog_query(prolog, f"parent_of(X, {grandchild})")
@@ -528,50 +666,27 @@ class FactManager:
     
 
     
-    def _handle_child_clarification(self, error_message: str, statement: str) -> str:
+    def _handle_child_clarification(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle child clarification requests."""
-        global clarification_context
+        parent, child, existing_children = outcome.args
         
-        parts = error_message.split(":")
-        parent = parts[1]
-        child = parts[2]
-        existing_children = parts[3]
-        
-        clarification_context = {
-            "new_parent": parent,
-            "child": child,
-            "siblings": existing_children,
-            "original_statement": statement
-        }
+        self._ask("parent_of_siblings", statement, new_parent=parent, child=child, siblings=existing_children)
         
         return f"Clarification needed: Is {parent.capitalize()} also the parent of {existing_children}? Answer with: yes or no."
     
-    def _handle_sibling_parent_clarification(self, error_message: str, statement: str) -> str:
+    def _handle_sibling_parent_clarification(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle sibling parent clarification requests."""
-        global clarification_context
-        
-        print(f"DEBUG: _handle_sibling_parent_clarification")
-        print(f"DEBUG: error_message={error_message}")
-        
-        parts = error_message.split(":")
-        new_parent = parts[1]
-        child = parts[2]
-        siblings = parts[3]
-        siblings_needing_parent = parts[4] if len(parts) > 4 else siblings
+        parts = outcome.args
+        new_parent = parts[0]
+        child = parts[1]
+        siblings = parts[2]
+        siblings_needing_parent = parts[3] if len(parts) > 3 else siblings
         
-        print(f"DEBUG: parts={parts}")
-        print(f"DEBUG: new_parent={new_parent}, child={child}, siblings={siblings}")
-        print(f"DEBUG: siblings_needing_parent={siblings_needing_parent}")
+        log.debug("asking whether siblings share the parent", new_parent=new_parent, child=child, siblings=siblings,
+                  siblings_needing_parent=siblings_needing_parent)
         
-        clarification_context = {
-            "new_parent": new_parent,
-            "child": child,
-            "siblings": siblings,
-            "siblings_needing_parent": siblings_needing_parent,
-            "original_statement": statement
-        }
-        
-        print(f"DEBUG: clarification_context={clarification_context}")
+        pending = self._ask("parent_of_siblings", statement, new_parent=new_parent, child=child, siblings=siblings,
+                            siblings_needing_parent=siblings_needing_parent)
         
         # Parse the siblings that need this parent type
         siblings_needing_parent_list = [s.strip() for s in siblings_needing_parent.split(',')]
@@ -594,22 +709,19 @@ class FactManager:
         else:
             return f"Clarification needed: Is {new_parent.capitalize()} also the parent of the other sibling? Please answer with exactly 'yes' or 'no' (without the apostrophes)."
     
-    def _handle_delete_shared_parent_add_father(self, error_message: str, statement: str) -> str:
+    def _handle_delete_shared_parent_add_father(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle deletion of shared_parent and addition of father for all siblings."""
-        parts = error_message.split(":")
-        new_parent = parts[1]
-        child = parts[2]
+        new_parent, child = outcome.args
         
         return self._delete_shared_parent_and_add_parent(new_parent, child, "male")
     
-    def _handle_delete_shared_parent_add_mother(self, error_message: str, statement: str) -> str:
+    def _handle_delete_shared_parent_add_mother(self, outcome: ValidationOutcome, statement: str) -> str:
         """Handle deletion of shared_parent and addition of mother for all siblings."""
-        parts = error_message.split(":")
-        new_parent = parts[1]
-        child = parts[2]
+        new_parent, child = outcome.args
         
         return self._delete_shared_parent_and_add_parent(new_parent, child, "female")
     
+    @traced("shared_parent_cleanup")
     def _delete_shared_parent_and_add_parent(self, new_parent: str, child: str, gender: str) -> str:
         """Delete specific shared parent (with unique names) and add new parent for all siblings."""
         try:
@@ -618,10 +730,8 @@ class FactManager:
                 old_contents = f.read()
             
             # Find the specific shared parent for this child
-            from pyswip import Prolog
             from utils import to_prolog_name, safe_prolog_query
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = get_prolog_engine(current_kb_file)
             
             # Find the shared parent that this child has
             shared_parent_name = None
@@ -647,13 +757,13 @@ class FactManager:
                         shared_parent_children.append(result["X"])
                         
             except Exception as e:
-                print(f"Error querying shared parent children: {e}")
+                log.error("error querying shared parent children", error=e)
             
             if not shared_parent_name:
-                print(f"DEBUG: No shared parent found for {child} with gender {gender}")
+                log.debug("no shared parent found", child=child, gender=gender)
                 return f"Error: No shared parent found for {child}"
             
-            print(f"DEBUG: Replacing {shared_parent_name} with {new_parent}")
+            log.debug("replacing shared parent", shared_parent=shared_parent_name, new_parent=new_parent)
             
             # Create new facts to add
             new_facts = []
@@ -686,7 +796,7 @@ class FactManager:
             return self._write_organized_facts_to_file(new_facts)
             
         except Exception as e:
-            print(f"Error deleting shared parent: {e}")
+            log.error("error deleting shared parent", error=e)
             return f"Error deleting shared parent: {str(e)}"
     
     def _format_list_with_and(self, items: list) -> str:
@@ -702,32 +812,35 @@ class FactManager:
     
 
     
-    def _write_organized_facts_to_file(self, new_facts: list, statement: str = "") -> str:
-        """Write facts to file with proper organization."""
+    @traced("write")
+    def _write_organized_facts_to_file(self, new_facts: list, statement: str = "", remove: List[str] = ()) -> str:
+        """Write facts to file with proper organization, leaving out the fact lines in `remove`."""
         try:
             # Read current contents
             with open(current_kb_file, "r", encoding="utf-8") as f:
                 old_contents = f.read()
+            remove_set = set(line.strip() for line in remove)
+            all_lines = old_contents.split('\n')
+            lines = [line for line in all_lines if line.strip() not in remove_set]
             
             # Only allow valid Prolog facts (predicate(args).), skip invalid lines
             valid_fact_pattern = re.compile(r"^[a-z_]+\([a-z0-9_, ']+\)\.$")
+            # Compare whole lines so e.g. male(x). is not mistaken for part of female(x).
+            existing_lines = set(line.strip() for line in lines)
             valid_new_facts = []
             for fact_line in new_facts:
-                if fact_line.strip() and valid_fact_pattern.match(fact_line.strip()):
-                    # Special handling for gender facts - always add if not already present
-                    if fact_line.strip().startswith('female(') or fact_line.strip().startswith('male('):
-                        if fact_line.strip() not in old_contents:
-                            valid_new_facts.append(fact_line)
-                    # For non-gender facts, only add if not already present
-                    elif fact_line.strip() not in old_contents:
+                fact_line = fact_line.strip()
+                if fact_line and valid_fact_pattern.match(fact_line):
+                    # Only add facts that are not already present
+                    if fact_line not in existing_lines:
                         valid_new_facts.append(fact_line)
+                        existing_lines.add(fact_line)
                 else:
-                    if fact_line.strip():
-                        print(f"Skipping invalid fact line: {fact_line}")
+                    if fact_line:
+                        log.warning("skipping invalid fact line", line=fact_line)
             
-            if valid_new_facts:
+            if valid_new_facts or len(lines) < len(all_lines):
                 # Organize the file properly: facts at top, then discontiguous declarations, then rules
-                lines = old_contents.split('\n')
                 fact_lines = []
                 rule_lines = []
                 discontiguous_lines = []
@@ -769,6 +882,13 @@ class FactManager:
                 fact_lines = list(set(fact_lines))  # Remove duplicates from existing facts
                 fact_lines.extend(valid_new_facts)
                 
+                # Merge placeholder parents that now stand for the same (or a real) person
+                placeholder_manager = PlaceholderManager()
+                with span("placeholder_consolidation"):
+                    fact_lines = placeholder_manager.consolidate(fact_lines)
+                for placeholder, canonical in placeholder_manager.renamed.items():
+                    log.debug("merged placeholder", placeholder=placeholder, canonical=canonical)
+                
                 # Deduplicate discontiguous declarations
                 discontiguous_lines = list(set(discontiguous_lines))
                 discontiguous_lines.sort()  # Sort for consistent ordering
@@ -779,6 +899,7 @@ class FactManager:
                     ':- discontiguous male/1.',
                     ':- discontiguous female/1.',
                     ':- discontiguous sibling_of/2.',
+                    ':- discontiguous sibling_group/2.',
                     ':- discontiguous half_sibling_of/2.',
                     ':- discontiguous brother_of/2.',
                     ':- discontiguous sister_of/2.',
@@ -830,16 +951,162 @@ class FactManager:
                 # Add a small delay to ensure file is fully written
                 time.sleep(0.1)
                 
-                # Contingency check: Clean up any shared parent conflicts
-                self._cleanup_shared_parent_conflicts()
-                
                 return "OK! I learned something new."
             else:
                 return "I already knew that."
         except Exception as e:
-            print(f"Error writing organized facts to file: {e}")
+            log.error("error writing organized facts to file", error=e)
             return f"Error adding facts: {str(e)}"
     
+    def store_facts(self, facts: List[str]) -> str:
+        """Write already validated fact lines to the knowledge base in one organized rewrite."""
+        return self._write_organized_facts_to_file(facts)
+    
+    def retract_statement(self, statement: str, retraction_patterns: List[Tuple], statement_patterns: List[Tuple]) -> str:
+        """Remove what a negative statement or a "Forget that ..." command denies, then repair placeholders."""
+        # "Forget that A is the father of B." retracts exactly what the statement would add
+        forget = re.match(r'^Forget that (.+)$', statement.strip())
+        if forget:
+            facts, name_error = self._parse_statement_to_fact(forget.group(1).strip(), statement_patterns)
+        else:
+            facts, name_error = self._parse_statement_to_fact(statement, retraction_patterns)
+        if name_error:
+            return name_error
+        if not facts:
+            return f"Unrecognized or invalid statement: {statement}"
+        
+        graph = get_family_graph(current_kb_file)
+        targets = [line.strip() for line in facts.split('\n') if parse_fact(line.strip())]
+        # Forgetting a parent statement keeps the gender, which other facts may rely on
+        if forget and any(parse_fact(line)[0] == "parent_of" for line in targets):
+            targets = [line for line in targets if parse_fact(line)[0] not in ("male", "female")]
+        # "A is not the father of B" denies nothing about a mother A
+        if self._names_other_gender(statement, targets, graph):
+            return "I didn't know that anyway."
+        stored = [line for line in targets if line in graph.facts]
+        # Siblings stated as a group are separated by taking the subject out of the group
+        stored += sorted(self._sibling_group_repairs(targets) - set(stored))
+        
+        if not stored:
+            # The relation may still follow from other facts, e.g. siblings through a shared parent
+            prolog = get_prolog_engine(current_kb_file)
+            derived = [line for line in targets if safe_prolog_query(prolog, line.rstrip('.'))]
+            if derived:
+                return "I can't forget that directly because it follows from other facts. Please correct the parent relationships instead."
+            return "I didn't know that anyway."
+        
+        people = set()
+        for line in stored:
+            people.update(parse_fact(line)[1])
+        denied = [line for line in targets if parse_fact(line)[0] in ("sibling_of", "half_sibling_of")]
+        remove = set(stored) | self._placeholder_repairs(stored + denied, people)
+        
+        result = self.retract_facts(sorted(remove), [])
+        if result.startswith("Error"):
+            return result
+        
+        prolog = get_prolog_engine(current_kb_file)
+        if any(safe_prolog_query(prolog, line.rstrip('.')) for line in targets):
+            return "OK! I've removed that, but it still follows from other facts, such as a shared parent."
+        return "OK! I've forgotten that."
+    
+    def _names_other_gender(self, statement: str, targets: List[str], graph) -> bool:
+        """Check whether a denied parent link names a father, mother, son or daughter whose stored gender is the other one."""
+        word = re.search(r'\b(father|mother|son|daughter)\b', statement.lower())
+        if not word:
+            return False
+        position, gender = GENDERED_PARENT_WORDS[word.group(1)]
+        other = "female" if gender == "male" else "male"
+        for line in targets:
+            predicate, args = parse_fact(line)
+            if predicate == "parent_of" and f"{other}({args[position]})." in graph.facts:
+                return True
+        return False
+    
+    def _sibling_group_repairs(self, targets: List[str]) -> set:
+        """Find the sibling_group facts to remove so that denied sibling pairs stop being siblings.
+        
+        The subject of each denied pair leaves every group it shares with the other person,
+        and a group left with a single member is removed altogether.
+        """
+        graph = get_family_graph(current_kb_file)
+        groups = {}
+        pairs = set()
+        for line in targets:
+            predicate, args = parse_fact(line)
+            # Denials list both directions; the first one names the subject
+            if predicate not in ("sibling_of", "half_sibling_of") or len(args) != 2 or frozenset(args) in pairs:
+                continue
+            pairs.add(frozenset(args))
+            subject, other = args
+            shared = ({group_args[0] for _, group_args in graph.facts_about(subject, "sibling_group")}
+                      & {group_args[0] for _, group_args in graph.facts_about(other, "sibling_group")})
+            for group in shared:
+                groups.setdefault(group, set()).add(subject)
+        
+        repairs = set()
+        for group, leaving in groups.items():
+            members = [args[1] for _, args in graph.facts_about(group, "sibling_group") if args[0] == group]
+            remaining = [member for member in members if member not in leaving]
+            for member in (members if len(remaining) < 2 else leaving):
+                repairs.add(f"sibling_group({group}, {member}).")
+        return repairs
+    
+    def _placeholder_repairs(self, removed: List[str], people: set) -> set:
+        """Find the shared-parent placeholder facts a retraction leaves without a purpose.
+        
+        Only placeholders attached to the people in the removed facts are looked at. A
+        placeholder linking two people who are no longer siblings is dropped, and so is
+        one left with a single child, since placeholders only exist to tie siblings together.
+        """
+        graph = get_family_graph(current_kb_file)
+        removed_set = set(removed)
+        denied_pairs = []
+        for line in removed:
+            predicate, args = parse_fact(line)
+            if predicate in ("sibling_of", "half_sibling_of") and len(args) == 2 and args not in denied_pairs:
+                denied_pairs.append(args)
+        
+        placeholders = set()
+        for person in people:
+            for predicate, args in graph.facts_about(person, "parent_of"):
+                if is_shared_parent(args[0]):
+                    placeholders.add(args[0])
+        
+        repairs = set()
+        for placeholder in placeholders:
+            children = [args[1] for _, args in graph.facts_about(placeholder, "parent_of")
+                        if args[0] == placeholder and f"parent_of({placeholder}, {args[1]})." not in removed_set]
+            # Siblings denied by the user must not keep a common placeholder parent
+            for subject, other in denied_pairs:
+                if subject in children and other in children:
+                    repairs.add(f"parent_of({placeholder}, {subject}).")
+                    children.remove(subject)
+            if len(children) < 2:
+                for predicate, args in graph.facts_about(placeholder):
+                    repairs.add(f"{predicate}({', '.join(args)}).")
+        return repairs
+    
+    def retract_facts(self, remove: List[str], restore: List[str]) -> str:
+        """Delete fact lines from the knowledge base and put back previously removed ones, in one write."""
+        try:
+            remove_set = set(line.strip() for line in remove)
+            if restore:
+                # Removals are applied to the contents before the organized rewrite
+                result = self._write_organized_facts_to_file(restore, remove=sorted(remove_set))
+                if result.startswith("Error"):
+                    return result
+            else:
+                with open(current_kb_file, "r", encoding="utf-8") as f:
+                    old_contents = f.read()
+                lines = [line for line in old_contents.split('\n') if line.strip() not in remove_set]
+                with open(current_kb_file, "w", encoding="utf-8") as f:
+                    f.write('\n'.join(lines))
+            return f"Removed {len(remove_set)} and restored {len(restore)} facts."
+        except Exception as e:
+            log.error("error retracting facts", error=e)
+            return f"Error retracting facts: {str(e)}"
+
     def _write_fact_to_file(self, fact: str, statement: str) -> str:
         """Write a single fact to file with proper organization."""
         fact_lines = fact.split('\n')
@@ -851,78 +1118,7 @@ class FactManager:
             # This can be expanded to add more intelligent relationship updates
             pass
         except Exception as e:
-            print(f"Error updating relationships: {e}")
-    
-    def _cleanup_shared_parent_conflicts(self):
-        """Clean up any shared parent conflicts by detecting real parents and replacing placeholders."""
-        try:
-            from pyswip import Prolog
-            from utils import safe_prolog_query
-            
-            # Read current contents
-            with open(current_kb_file, "r", encoding="utf-8") as f:
-                old_contents = f.read()
-            
-            # Check if there are any shared parent facts (with unique names)
-            has_shared_parents = any("shared_mother_" in line or "shared_father_" in line for line in old_contents.split('\n'))
-            if not has_shared_parents:
-                return  # No shared parents to clean up
-            
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
-            
-            # Find all real parents (non-shared parents)
-            real_parents = []
-            try:
-                # Get all parent relationships
-                parent_results = safe_prolog_query(prolog, "parent_of(X, Y)")
-                for result in parent_results:
-                    parent = result["X"]
-                    child = result["Y"]
-                    # Check if this is not a shared parent
-                    if not (parent.startswith("shared_mother_") or parent.startswith("shared_father_")):
-                        real_parents.append((parent, child))
-            except Exception as e:
-                print(f"Error querying real parents: {e}")
-                return
-            
-            # Check for conflicts where a real parent and shared parent exist for the same child
-            conflicts_to_resolve = []
-            
-            for real_parent, child in real_parents:
-                # Check if this child also has a shared parent of the same gender
-                try:
-                    # Determine real parent's gender
-                    real_parent_male = safe_prolog_query(prolog, f"male({real_parent})")
-                    real_parent_female = safe_prolog_query(prolog, f"female({real_parent})")
-                    
-                    if real_parent_male:
-                        # Check if child has any shared_father
-                        child_parents = safe_prolog_query(prolog, f"parent_of(X, {child})")
-                        for parent_result in child_parents:
-                            parent_name = parent_result["X"]
-                            if parent_name.startswith("shared_father_"):
-                                conflicts_to_resolve.append((parent_name, real_parent, child))
-                                break
-                    elif real_parent_female:
-                        # Check if child has any shared_mother
-                        child_parents = safe_prolog_query(prolog, f"parent_of(X, {child})")
-                        for parent_result in child_parents:
-                            parent_name = parent_result["X"]
-                            if parent_name.startswith("shared_mother_"):
-                                conflicts_to_resolve.append((parent_name, real_parent, child))
-                                break
-                except Exception as e:
-                    print(f"Error checking shared parent conflicts: {e}")
-            
-            # Resolve conflicts
-            for shared_parent, real_parent, child in conflicts_to_resolve:
-                print(f"DEBUG: Resolving conflict - replacing {shared_parent} with {real_parent} for {child}")
-                gender = "male" if shared_parent.startswith("shared_father_") else "female"
-                self._delete_shared_parent_and_add_parent(real_parent, child, gender)
-                
-        except Exception as e:
-            print(f"Error in cleanup_shared_parent_conflicts: {e}")
+            log.error("error updating relationships", error=e)
     
     def _write_rules_without_declarations(self, f):
         """Write Prolog rules without discontiguous declarations to avoid duplicates."""
@@ -940,6 +1136,7 @@ class FactManager:
         f.write("% Sibling Relationships\n")
         f.write("% ========================================\n")
         f.write("sibling_of(X, Y) :- parent_of(Z, X), parent_of(Z, Y), X \\= Y, Z \\= X, Z \\= Y.\n")
+        f.write("sibling_of(X, Y) :- sibling_group(G, X), sibling_group(G, Y), X \\= Y.\n")
         f.write("brother_of(X, Y) :- sibling_of(X, Y), male(X).\n")
         f.write("sister_of(X, Y) :- sibling_of(X, Y), female(X).\n")
         f.write("\n")
@@ -1016,6 +1213,7 @@ class FactManager:
         f.write("incestual_sibling_parent(X, Y) :- sibling_of(X, Y), parent_of(X, Y).\n")
         f.write("incestual_sibling_parent(X, Y) :- sibling_of(X, Y), parent_of(Y, X).\n")
     
+    @traced("shared_parent_cleanup")
     def update_shared_parent_relationships(self, new_parent: str, child: str) -> str:
         """Update all shared_parent relationships to use the actual parent name."""
         try:
@@ -1037,7 +1235,7 @@ class FactManager:
             return f"I updated the shared parent to {new_parent.capitalize()} for all siblings."
             
         except Exception as e:
-            print(f"Error updating shared parent relationships: {e}")
+            log.error("error updating shared parent relationships", error=e)
             return f"Error updating relationships: {str(e)}"
     
     def add_parent_for_all_siblings(self, new_parent: str, child: str, siblings: str, original_statement: str = "") -> str:
@@ -1049,8 +1247,7 @@ class FactManager:
             
             # Parse sibling names
             sibling_names = [s.strip() for s in siblings.split(',')]
-            print(f"DEBUG: add_parent_for_all_siblings called with new_parent={new_parent}, child={child}, siblings={siblings}")
-            print(f"DEBUG: sibling_names={sibling_names}")
+            log.debug("adding parent for all siblings", new_parent=new_parent, child=child, siblings=sibling_names)
             
             # Determine parent gender and type from original statement
             if "mother" in original_statement.lower():
@@ -1064,9 +1261,7 @@ class FactManager:
                 parent_type = "parent"  # fallback
             
             # Validate that we're not adding a second parent of the same gender
-            from pyswip import Prolog
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = self._engine()
             
             # Check each sibling for existing parents of the same gender
             for sibling in sibling_names:
@@ -1096,24 +1291,18 @@ class FactManager:
             new_facts = []
             for sibling in sibling_names:
                 fact = f"parent_of({to_prolog_name(new_parent)}, {to_prolog_name(sibling)})."
-                print(f"DEBUG: checking fact={fact}")
-                print(f"DEBUG: fact in old_contents = {fact in old_contents}")
                 # Only add if not already present
                 if fact not in old_contents:
                     new_facts.append(fact)
-                    print(f"DEBUG: added fact={fact}")
                 else:
-                    print(f"DEBUG: skipped fact={fact} (already exists)")
-            
-            print(f"DEBUG: new_facts={new_facts}")
-            
+                    log.debug("fact already exists", fact=fact)
+
             # Add gender fact for the parent
             parent_gender_fact = f"{parent_gender}({to_prolog_name(new_parent)})."
             if parent_gender_fact not in old_contents:
                 new_facts.append(parent_gender_fact)
-                print(f"DEBUG: Adding parent gender fact: {parent_gender_fact}")
             else:
-                print(f"DEBUG: Parent gender fact already exists: {parent_gender_fact}")
+                log.debug("fact already exists", fact=parent_gender_fact)
             
             # Write all new facts at once to avoid duplicate checking issues
             if new_facts:
@@ -1169,6 +1358,7 @@ class FactManager:
                     ':- discontiguous male/1.',
                     ':- discontiguous female/1.',
                     ':- discontiguous sibling_of/2.',
+                    ':- discontiguous sibling_group/2.',
                     ':- discontiguous half_sibling_of/2.',
                     ':- discontiguous brother_of/2.',
                     ':- discontiguous sister_of/2.',
@@ -1220,17 +1410,17 @@ class FactManager:
                 # Add a small delay to ensure file is fully written
                 time.sleep(0.1)
             else:
-                print(f"DEBUG: No new facts to add")
+                log.debug("no new facts to add", child=child)
             
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding parent for all siblings: {e}")
+            log.error("error adding parent for all siblings", error=e)
             return f"Error adding relationships: {str(e)}"
     
     def add_parent_with_shared_parent(self, new_parent: str, child: str, siblings_str: str, original_statement: str) -> str:
         """Add parent relationship for child and shared_parent for ALL siblings, plus half_sibling facts."""
-        print(f"DEBUG: add_parent_with_shared_parent called with new_parent={new_parent}, child={child}, siblings_str={siblings_str}")
+        log.debug("adding parent with shared parent", new_parent=new_parent, child=child, siblings=siblings_str)
         try:
             # Parse all siblings
             sibling_names = [s.strip() for s in siblings_str.split(',')]
@@ -1242,9 +1432,7 @@ class FactManager:
                 old_contents = f.read()
             
             # Check if siblings already share a parent before adding shared_parent facts
-            from pyswip import Prolog
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = self._engine()
             
             # Find all siblings
             all_siblings = set()
@@ -1272,7 +1460,7 @@ class FactManager:
                 # If all siblings have the same parent(s), they already share a parent
                 if len(set(all_parents)) == 1 and len(all_parents) >= len(all_siblings):
                     siblings_already_share_parent = True
-                    print(f"DEBUG: Siblings already share parent(s): {set(all_parents)}")
+                    log.debug("siblings already share parents", parents=lambda: sorted(set(all_parents)))
                 
                 # Also check if all siblings have at least one parent of the opposite gender
                 # This handles cases where they share a mother but need a father, or vice versa
@@ -1298,7 +1486,7 @@ class FactManager:
                     
                     if all_have_opposite_gender_parent:
                         siblings_already_share_parent = True
-                        print(f"DEBUG: Siblings already share a {opposite_gender} parent")
+                        log.debug("siblings already share a parent", gender=opposite_gender)
             
             # Determine parent type and shared_parent gender
             if "mother" in original_statement.lower():
@@ -1318,9 +1506,8 @@ class FactManager:
             parent_fact = f"parent_of({to_prolog_name(new_parent)}, {to_prolog_name(child)})."
             if parent_fact not in old_contents:
                 new_facts.append(parent_fact)
-                print(f"DEBUG: Adding parent fact: {parent_fact}")
             else:
-                print(f"DEBUG: Parent fact already exists: {parent_fact}")
+                log.debug("fact already exists", fact=parent_fact)
             
             # Add gender fact for the specific parent
             if "mother" in original_statement.lower():
@@ -1333,9 +1520,8 @@ class FactManager:
             parent_gender_fact = f"{parent_gender}({to_prolog_name(new_parent)})."
             if parent_gender_fact not in old_contents:
                 new_facts.append(parent_gender_fact)
-                print(f"DEBUG: Adding parent gender fact: {parent_gender_fact}")
             else:
-                print(f"DEBUG: Parent gender fact already exists: {parent_gender_fact}")
+                log.debug("fact already exists", fact=parent_gender_fact)
             
             # Only add shared_parent facts if siblings don't already share a parent
             if not siblings_already_share_parent:
@@ -1346,25 +1532,23 @@ class FactManager:
                     shared_parent_sibling_fact = f"parent_of(shared_parent, {to_prolog_name(sibling_name)})."
                     if shared_parent_sibling_fact not in old_contents:
                         new_facts.append(shared_parent_sibling_fact)
-                        print(f"DEBUG: Adding shared parent fact for {sibling_name}: {shared_parent_sibling_fact}")
                     else:
-                        print(f"DEBUG: Shared parent fact already exists for {sibling_name}: {shared_parent_sibling_fact}")
+                        log.debug("fact already exists", fact=shared_parent_sibling_fact)
                 
                 # Add gender fact for shared_parent
                 shared_parent_gender_fact = f"{shared_parent_gender}(shared_parent)."
                 if shared_parent_gender_fact not in old_contents:
                     new_facts.append(shared_parent_gender_fact)
-                    print(f"DEBUG: Adding shared parent gender fact: {shared_parent_gender_fact}")
                 else:
-                    print(f"DEBUG: Shared parent gender fact already exists: {shared_parent_gender_fact}")
+                    log.debug("fact already exists", fact=shared_parent_gender_fact)
             else:
-                print(f"DEBUG: Skipping shared_parent facts - siblings already share a parent")
+                log.debug("skipping shared parent facts, siblings already share a parent", child=child)
             
             # Note: We don't add half_sibling_of facts here because the Prolog rules
             # will automatically determine half-sibling relationships based on parent facts.
             # This allows for mixed sibling sets where some are full siblings and others are half-siblings.
             
-            print(f"DEBUG: All new facts to add: {new_facts}")
+            log.debug("adding facts", facts=new_facts)
             
             # Write all new facts at once
             if new_facts:
@@ -1420,6 +1604,7 @@ class FactManager:
                     ':- discontiguous male/1.',
                     ':- discontiguous female/1.',
                     ':- discontiguous sibling_of/2.',
+                    ':- discontiguous sibling_group/2.',
                     ':- discontiguous half_sibling_of/2.',
                     ':- discontiguous brother_of/2.',
                     ':- discontiguous sister_of/2.',
@@ -1475,7 +1660,7 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding parent with shared parent: {e}")
+            log.error("error adding parent with shared parent", error=e)
             return f"Error adding relationships: {str(e)}"
     
     def add_parent_for_child_only(self, new_parent: str, child: str) -> str:
@@ -1492,7 +1677,7 @@ class FactManager:
             return self._write_organized_facts_to_file([new_fact])
             
         except Exception as e:
-            print(f"Error adding parent for child only: {e}")
+            log.error("error adding parent for child only", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_half_sibling_relationship(self, person1: str, person2: str) -> str:
@@ -1512,7 +1697,7 @@ class FactManager:
             return self._write_organized_facts_to_file(new_facts)
             
         except Exception as e:
-            print(f"Error adding half-sibling relationship: {e}")
+            log.error("error adding half-sibling relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_half_brother_relationship(self, person1: str, person2: str) -> str:
@@ -1534,7 +1719,7 @@ class FactManager:
             return self._write_organized_facts_to_file(new_facts)
                 
         except Exception as e:
-            print(f"Error adding half-brother relationship: {e}")
+            log.error("error adding half-brother relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_half_sister_relationship(self, person1: str, person2: str) -> str:
@@ -1556,7 +1741,7 @@ class FactManager:
             return self._write_organized_facts_to_file(new_facts)
             
         except Exception as e:
-            print(f"Error adding half-sister relationship: {e}")
+            log.error("error adding half-sister relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
 
@@ -1602,7 +1787,7 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding aunt/uncle father relationship: {e}")
+            log.error("error adding aunt/uncle father relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_aunt_uncle_mother_relationship(self, aunt_uncle: str, parent: str, niece_nephew: str, original_statement: str = "") -> str:
@@ -1646,13 +1831,12 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding aunt/uncle mother relationship: {e}")
+            log.error("error adding aunt/uncle mother relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_aunt_uncle_sophisticated_relationship(self, aunt_uncle: str, niece_nephew: str, parent: str, is_maternal: bool, original_statement: str = "") -> str:
         """Add sophisticated aunt/uncle relationship with maternal/paternal logic."""
         try:
-            from pyswip import Prolog
             from utils import safe_prolog_query
             
             # Read current contents
@@ -1660,8 +1844,7 @@ class FactManager:
                 old_contents = f.read()
             
             # Check if the parent has parents
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = self._engine()
             
             parent_parents = safe_prolog_query(prolog, f"parent_of(X, {to_prolog_name(parent)})")
             parent_parent_names = [result["X"] for result in parent_parents]
@@ -1747,7 +1930,7 @@ class FactManager:
                 return "I already knew that."
             
         except Exception as e:
-            print(f"Error adding sophisticated aunt/uncle relationship: {e}")
+            log.error("error adding sophisticated aunt/uncle relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_aunt_uncle_half_sibling_relationship(self, aunt_uncle: str, niece_nephew: str, parent: str, shared_parent: str, original_statement: str = "") -> str:
@@ -1779,7 +1962,7 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding aunt/uncle half-sibling relationship: {e}")
+            log.error("error adding aunt/uncle half-sibling relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_aunt_uncle_half_sibling_with_shared_mother(self, aunt_uncle: str, niece_nephew: str, parent: str, is_maternal: bool, original_statement: str = "") -> str:
@@ -1815,7 +1998,7 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding aunt/uncle half-sibling with shared mother: {e}")
+            log.error("error adding aunt/uncle half-sibling with shared mother", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_aunt_uncle_half_sibling_with_shared_father(self, aunt_uncle: str, niece_nephew: str, parent: str, is_maternal: bool, original_statement: str = "") -> str:
@@ -1851,7 +2034,7 @@ class FactManager:
             return "OK! I learned something new."
             
         except Exception as e:
-            print(f"Error adding aunt/uncle half-sibling with shared father: {e}")
+            log.error("error adding aunt/uncle half-sibling with shared father", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_shared_mother_relationship(self, mother: str, person1: str, person2: str) -> str:
@@ -1881,13 +2064,12 @@ class FactManager:
                 return "I already knew that."
                 
         except Exception as e:
-            print(f"Error adding shared mother relationship: {e}")
+            log.error("error adding shared mother relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_full_sibling_relationship(self, person1: str, person2: str, original_statement: str = "") -> str:
         """Add full sibling relationship with shared parents."""
         try:
-            from pyswip import Prolog
             from utils import safe_prolog_query
             
             # Read current contents
@@ -1898,8 +2080,7 @@ class FactManager:
             sibling_fact = f"sibling_of({to_prolog_name(person1)}, {to_prolog_name(person2)})."
             
             # Check for existing parents of both persons
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = self._engine()
             
             # Get existing parents for both persons
             person1_parents = safe_prolog_query(prolog, f"parent_of(X, {to_prolog_name(person1)})")
@@ -1973,7 +2154,7 @@ class FactManager:
                 return "I already knew that."
                 
         except Exception as e:
-            print(f"Error adding full sibling relationship: {e}")
+            log.error("error adding full sibling relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_half_sibling_relationship_only(self, person1: str, person2: str) -> str:
@@ -2002,13 +2183,12 @@ class FactManager:
                 return "I already knew that."
                 
         except Exception as e:
-            print(f"Error adding half-sibling relationship: {e}")
+            log.error("error adding half-sibling relationship", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_half_sibling_with_shared_mother(self, person1: str, person2: str, original_statement: str = "") -> str:
         """Add half-sibling relationship where they share a mother."""
         try:
-            from pyswip import Prolog
             from utils import safe_prolog_query
             
             # Read current contents
@@ -2034,8 +2214,7 @@ class FactManager:
                         new_facts.append(gender_fact)
             
             # Check for existing mothers of both persons
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = self._engine()
             
             person1_mothers = safe_prolog_query(prolog, f"mother_of(X, {to_prolog_name(person1)})")
             person2_mothers = safe_prolog_query(prolog, f"mother_of(X, {to_prolog_name(person2)})")
@@ -2094,13 +2273,12 @@ class FactManager:
                 return "I already knew that."
                 
         except Exception as e:
-            print(f"Error adding half-sibling with shared mother: {e}")
+            log.error("error adding half-sibling with shared mother", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_half_sibling_with_shared_father(self, person1: str, person2: str, original_statement: str = "") -> str:
         """Add half-sibling relationship where they share a father."""
         try:
-            from pyswip import Prolog
             from utils import safe_prolog_query
             
             # Read current contents
@@ -2126,8 +2304,7 @@ class FactManager:
                         new_facts.append(gender_fact)
             
             # Check for existing fathers of both persons
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = self._engine()
             
             person1_fathers = safe_prolog_query(prolog, f"father_of(X, {to_prolog_name(person1)})")
             person2_fathers = safe_prolog_query(prolog, f"father_of(X, {to_prolog_name(person2)})")
@@ -2186,7 +2363,7 @@ class FactManager:
                 return "I already knew that."
                 
         except Exception as e:
-            print(f"Error adding half-sibling with shared father: {e}")
+            log.error("error adding half-sibling with shared father", error=e)
             return f"Error adding relationship: {str(e)}"
     
     def add_sibling_with_existing_siblings(self, new_person: str, existing_person: str, is_full_sibling: bool) -> str:
@@ -2215,8 +2392,7 @@ class FactManager:
                 
                 # Find all existing siblings and add sibling relationships
                 try:
-                    prolog = Prolog()
-                    prolog.consult(current_kb_file)
+                    prolog = get_prolog_engine(current_kb_file)
                     
                     # Find all siblings of existing person
                     siblings = safe_prolog_query(prolog, f"sibling_of({existing_person}, X)")
@@ -2227,7 +2403,7 @@ class FactManager:
                                 if sib_fact not in old_contents:
                                     new_facts.append(sib_fact)
                 except Exception as e:
-                    print(f"Error finding existing siblings: {e}")
+                    log.error("error finding existing siblings", error=e)
             else:
                 # Add half-sibling relationship
                 half_sibling_fact = f"half_sibling_of({to_prolog_name(new_person)}, {to_prolog_name(existing_person)})."
@@ -2245,5 +2421,5 @@ class FactManager:
                 return "I already knew that."
                 
         except Exception as e:
-            print(f"Error adding sibling with existing siblings: {e}")
+            log.error("error adding sibling with existing siblings", error=e)
             return f"Error adding relationship: {str(e)}" 
\ No newline at end of file
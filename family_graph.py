@@ -0,0 +1,235 @@
+import io
+import re
+from collections import deque
+from typing import Dict, Set, List, Tuple, Iterable, Optional, Any
+from utils import kb_fingerprint, same_kb_content, INFERENCE_BACKEND
+from rule_writer import write_correct_rules
+from name_table import NameTable
+from tracing import traced
+
+# A base fact as stored in a knowledge base file, e.g. parent_of(ann, bob).
+FACT_LINE_PATTERN = re.compile(r"^([a-z_]+)\(([a-z0-9_, ']+)\)\.$")
+
+# How far a validation constraint can reach from the people in a new fact.
+# Second cousins (person -> parent -> grandparent -> sibling) are the widest check.
+NEIGHBORHOOD_HOPS = 4
+
+# Prolog module holding the facts of the current validation neighborhood
+SCOPE_MODULE = "kb_scope"
+
+def parse_fact(line: str) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    """Split a fact line like 'parent_of(ann, bob).' into ('parent_of', ('ann', 'bob'))."""
+    match = FACT_LINE_PATTERN.match(line.strip())
+    if not match:
+        return None
+    args = tuple(arg.strip() for arg in match.group(2).split(','))
+    return match.group(1), args
+
+class FamilyGraph:
+    """In-memory index of the base facts of a knowledge base, keyed by person id.
+
+    People are interned in `names` when their first fact arrives; the adjacency below
+    holds ids, and names only come back out of the query methods.
+    """
+
+    def __init__(self):
+        self.names = NameTable()
+        self.facts: Set[str] = set()
+        # Fact line -> (predicate, person ids), so facts are parsed once
+        self.parsed: Dict[str, Tuple[str, Tuple[int, ...]]] = {}
+        self.by_person: Dict[int, Set[str]] = {}
+        self.fingerprint: Optional[Dict[str, Any]] = None
+        # Derived indexes notified of every fact change (fact_added / fact_removed)
+        self.listeners: List[Any] = []
+
+    def add_listener(self, listener):
+        """Register a derived index and replay the current facts into it."""
+        self.listeners.append(listener)
+        for fact in self.facts:
+            listener.fact_added(fact)
+
+    def add_fact(self, fact: str) -> bool:
+        """Index a fact line. Returns False if it was already known or is not a fact."""
+        fact = fact.strip()
+        if fact in self.facts:
+            return False
+        parsed = parse_fact(fact)
+        if not parsed:
+            return False
+        person_ids = tuple(self.names.intern(person) for person in parsed[1])
+        self.facts.add(fact)
+        self.parsed[fact] = (parsed[0], person_ids)
+        for person_id in person_ids:
+            self.by_person.setdefault(person_id, set()).add(fact)
+        for listener in self.listeners:
+            listener.fact_added(fact)
+        return True
+
+    def remove_fact(self, fact: str) -> bool:
+        """Drop a fact line from the index. Returns False if it was not indexed."""
+        fact = fact.strip()
+        if fact not in self.facts:
+            return False
+        self.facts.discard(fact)
+        for person_id in self.parsed.pop(fact)[1]:
+            person_facts = self.by_person.get(person_id)
+            if person_facts is not None:
+                person_facts.discard(fact)
+                if not person_facts:
+                    del self.by_person[person_id]
+        for listener in self.listeners:
+            listener.fact_removed(fact)
+        return True
+
+    def has_facts(self) -> bool:
+        """Check whether the knowledge base holds any facts at all."""
+        return bool(self.facts)
+
+    def people(self) -> List[str]:
+        """Return everyone with at least one fact."""
+        return [self.names.atom(person_id) for person_id in self.by_person]
+
+    def facts_of(self, person: str) -> Set[str]:
+        """Return the fact lines mentioning a person."""
+        person_id = self.names.id_of(person)
+        if person_id is None:
+            return set()
+        return self.by_person.get(person_id, set())
+
+    def facts_about(self, person: str, predicate: Optional[str] = None) -> List[Tuple[str, Tuple[str, ...]]]:
+        """Return the parsed facts mentioning a person, optionally filtered by predicate."""
+        results = []
+        for fact in self.facts_of(person):
+            fact_predicate, person_ids = self.parsed[fact]
+            if predicate is None or fact_predicate == predicate:
+                results.append((fact_predicate, tuple(self.names.atom(person_id) for person_id in person_ids)))
+        return results
+
+    def neighbor_ids(self, person_id: int) -> Set[int]:
+        """Return the ids of everyone sharing a binary fact with a person."""
+        result = set()
+        for fact in self.by_person.get(person_id, ()):
+            result.update(self.parsed[fact][1])
+        result.discard(person_id)
+        return result
+
+    def neighborhood_ids(self, person_ids: Iterable[int], hops: int = NEIGHBORHOOD_HOPS) -> Set[int]:
+        """Return the ids of everyone within `hops` fact edges of the given ids (including them)."""
+        visited = set(person_ids)
+        frontier = deque((person_id, 0) for person_id in visited)
+        while frontier:
+            person_id, depth = frontier.popleft()
+            if depth >= hops:
+                continue
+            for other in self.neighbor_ids(person_id):
+                if other not in visited:
+                    visited.add(other)
+                    frontier.append((other, depth + 1))
+        return visited
+
+    def facts_within_ids(self, person_ids: Set[int]) -> Set[str]:
+        """Return the facts whose arguments all belong to the given set of ids."""
+        result = set()
+        for person_id in person_ids:
+            for fact in self.by_person.get(person_id, ()):
+                if fact not in result and all(other in person_ids for other in self.parsed[fact][1]):
+                    result.add(fact)
+        return result
+
+    def refresh(self, kb_file: str) -> bool:
+        """Bring the index in line with the file on disk. Returns True if anything changed."""
+        fingerprint = kb_fingerprint(kb_file, self.fingerprint)
+        if same_kb_content(self.fingerprint, fingerprint):
+            self.fingerprint = fingerprint
+            return False
+
+        with open(kb_file, "r", encoding="utf-8") as f:
+            on_disk = {line.strip() for line in f if parse_fact(line)}
+
+        for fact in self.facts - on_disk:
+            self.remove_fact(fact)
+        for fact in on_disk - self.facts:
+            self.add_fact(fact)
+        self.fingerprint = fingerprint
+        return True
+
+# Family graphs per knowledge base file
+_graphs: Dict[str, FamilyGraph] = {}
+
+def get_family_graph(kb_file: str) -> FamilyGraph:
+    """Return the family graph for a knowledge base file, refreshed from disk if it changed."""
+    graph = _graphs.get(kb_file)
+    if graph is None:
+        graph = FamilyGraph()
+        _graphs[kb_file] = graph
+    graph.refresh(kb_file)
+    return graph
+
+class ScopedProlog:
+    """Prolog view that answers queries from a subset of the KB loaded into a scratch module.
+
+    The family rules are asserted once; afterwards only the facts that differ between
+    two neighborhoods are retracted or asserted, so each load costs O(changed facts).
+    """
+
+    def __init__(self, prolog):
+        self.prolog = prolog
+        self.loaded: Set[str] = set()
+        self._load_rules()
+
+    def _load_rules(self):
+        """Declare the family predicates in the scope module and assert the rules."""
+        buffer = io.StringIO()
+        write_correct_rules(buffer)
+
+        # Only the system module is visible, so nothing leaks in from the consulted KB
+        list(self.prolog.query(f"set_module({SCOPE_MODULE}:base(system))"))
+        for line in buffer.getvalue().split('\n'):
+            line = line.strip()
+            if line.startswith(':- discontiguous'):
+                indicator = line[len(':- discontiguous'):].strip().rstrip('.')
+                list(self.prolog.query(f"dynamic({SCOPE_MODULE}:{indicator})"))
+            elif ':-' in line and not line.startswith(':-'):
+                clause = line.rstrip('.')
+                list(self.prolog.query(f"assertz({SCOPE_MODULE}:({clause}))"))
+
+    def load(self, facts: Set[str]):
+        """Make the scope module hold exactly the given facts."""
+        removed = self.loaded - facts
+        added = facts - self.loaded
+        self._run_batch("retract", removed)
+        self._run_batch("assertz", added)
+        self.loaded = set(facts)
+
+    def _run_batch(self, action: str, facts: Iterable[str], batch_size: int = 200):
+        """Assert or retract facts in the scope module, many per Prolog call."""
+        goals = [f"{action}({SCOPE_MODULE}:{fact.rstrip('.')})" for fact in facts]
+        for start in range(0, len(goals), batch_size):
+            list(self.prolog.query(", ".join(goals[start:start + batch_size])))
+
+    def query(self, query: str):
+        """Run a query against the scoped facts."""
+        if query.strip().startswith(':-'):
+            return self.prolog.query(query)
+        return self.prolog.query(f"{SCOPE_MODULE}:({query})")
+
+# Single scoped view shared by all validations
+_scoped_engine: Dict[str, Any] = {"engine": None}
+
+@traced("scope_load")
+def get_scoped_engine(kb_file: str, names: Iterable[str], hops: int = NEIGHBORHOOD_HOPS):
+    """Return a Prolog view holding only the facts within `hops` of the given people."""
+    graph = get_family_graph(kb_file)
+    facts = graph.facts_within_ids(graph.neighborhood_ids(graph.names.ids_of(names), hops))
+
+    if _scoped_engine["engine"] is None:
+        if INFERENCE_BACKEND == "datalog":
+            # The Datalog engine keeps its own relations, so it needs no scratch module
+            from datalog import DatalogEngine
+            _scoped_engine["engine"] = DatalogEngine()
+        else:
+            from pyswip import Prolog
+            _scoped_engine["engine"] = ScopedProlog(Prolog())
+    engine = _scoped_engine["engine"]
+    engine.load(facts)
+    return engine
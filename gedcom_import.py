@@ -0,0 +1,210 @@
+import re
+from typing import Iterable, Iterator, Dict, List, Tuple, Optional, Callable, Any
+from utils import to_prolog_name
+from family_graph import get_family_graph, parse_fact
+from statement_ir import Fact
+from generation_index import get_generation_index
+from reachability import get_reachability_index
+from logs import get_logger
+
+# Facts written to the knowledge base per organized rewrite
+DEFAULT_BATCH_SIZE = 500
+
+# How many problems to list in an import report
+MAX_REPORTED_ISSUES = 50
+
+VALIDATION_MODES = ("full", "deferred", "off")
+
+log = get_logger("gedcom_import")
+
+GEDCOM_LINE_PATTERN = re.compile(r"^\s*(\d+)\s+(?:(@[^@]+@)\s+)?(\S+)(?:\s(.*))?$")
+
+def read_records(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[str], List[Tuple[int, str, str]]]]:
+    """Group GEDCOM lines into level-0 records of (tag, xref, [(level, tag, value), ...])."""
+    record = None
+    for raw_line in lines:
+        match = GEDCOM_LINE_PATTERN.match(raw_line.lstrip("\ufeff").rstrip("\r\n"))
+        if not match:
+            continue
+        level = int(match.group(1))
+        xref = match.group(2)
+        tag = match.group(3)
+        value = (match.group(4) or "").strip()
+
+        if level == 0:
+            if record is not None:
+                yield record
+            # "0 @I1@ INDI" carries the xref before the tag
+            record = (tag, xref, [])
+        elif record is not None:
+            record[2].append((level, tag, value))
+    if record is not None:
+        yield record
+
+def _given_name(name_value: str) -> str:
+    """Take the first given name of a GEDCOM NAME value like 'John William /Smith/'."""
+    given = name_value.split('/')[0].strip()
+    if not given:
+        given = name_value.replace('/', ' ').strip()
+    first = given.split()[0] if given.split() else ""
+    return re.sub(r'[^A-Za-z]', '', first)
+
+class GedcomFactStream:
+    """Turn GEDCOM records into knowledge base facts one record at a time.
+
+    Individuals are mapped to Prolog atoms from their first given name; a name already
+    taken by another individual gets the record id appended. Families whose members
+    have not been seen yet are held back until the end of the file.
+    """
+
+    def __init__(self):
+        self.atoms: Dict[str, str] = {}
+        self.taken: Dict[str, str] = {}
+        self.pending_families: List[Dict[str, Any]] = []
+        self.individuals = 0
+        self.families = 0
+
+    def _atom_for(self, xref: str, name_value: str) -> str:
+        """Assign a unique Prolog atom to an individual."""
+        record_id = re.sub(r'[^a-z0-9]', '', xref.lower())
+        name = to_prolog_name(_given_name(name_value)) if _given_name(name_value) else record_id
+        if name in self.taken and self.taken[name] != xref:
+            name = f"{name}_{record_id}"
+        self.taken[name] = xref
+        self.atoms[xref] = name
+        return name
+
+    def _family_facts(self, family: Dict[str, Any]) -> List[str]:
+        """Return parent_of facts for a family whose members are all known."""
+        facts = []
+        for parent_xref in family["parents"]:
+            for child_xref in family["children"]:
+                facts.append(f"parent_of({self.atoms[parent_xref]}, {self.atoms[child_xref]}).")
+        return facts
+
+    def _resolved(self, family: Dict[str, Any]) -> bool:
+        """Check whether every member of a family has been read."""
+        return all(xref in self.atoms for xref in family["parents"] + family["children"])
+
+    def facts(self, lines: Iterable[str]) -> Iterator[str]:
+        """Yield fact lines for every individual and family in the GEDCOM lines."""
+        for tag, xref, fields in read_records(lines):
+            if tag == "INDI" and xref:
+                name_value = next((value for level, field, value in fields if level == 1 and field == "NAME"), "")
+                sex = next((value.upper() for level, field, value in fields if level == 1 and field == "SEX"), "")
+                atom = self._atom_for(xref, name_value)
+                self.individuals += 1
+                if sex.startswith("M"):
+                    yield f"male({atom})."
+                elif sex.startswith("F"):
+                    yield f"female({atom})."
+            elif tag == "FAM":
+                family = {
+                    "parents": [value for level, field, value in fields if level == 1 and field in ("HUSB", "WIFE")],
+                    "children": [value for level, field, value in fields if level == 1 and field == "CHIL"],
+                }
+                self.families += 1
+                if self._resolved(family):
+                    for fact in self._family_facts(family):
+                        yield fact
+                else:
+                    self.pending_families.append(family)
+
+        # Families listed before their members
+        for family in self.pending_families:
+            family["parents"] = [xref for xref in family["parents"] if xref in self.atoms]
+            family["children"] = [xref for xref in family["children"] if xref in self.atoms]
+            for fact in self._family_facts(family):
+                yield fact
+        self.pending_families = []
+
+def batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Group an iterable into lists of at most `size` items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _statement_for(fact: str, genders: Dict[str, str]) -> str:
+    """Phrase a parent_of fact the way a chat statement would say it, for the validator."""
+    parent, child = parse_fact(fact)[1]
+    role = "mother" if genders.get(parent) == "female" else "father"
+    return f"{parent.capitalize()} is the {role} of {child.capitalize()}."
+
+def import_gedcom(lines: Iterable[str], kb_file: str, fact_manager, validator, validation: str = "deferred",
+                  batch_size: int = DEFAULT_BATCH_SIZE, progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """Stream a GEDCOM file into a knowledge base in batches.
+
+    validation="full" checks every parent_of fact with the relationship validator before
+    it is written (follow-up questions are not asked, the family record already answers
+    them); "deferred" writes everything and then reports generation conflicts and cycles;
+    "off" writes without any checks, for trusted imports.
+    """
+    if validation not in VALIDATION_MODES:
+        raise ValueError(f"Unknown validation mode: {validation}")
+
+    stream = GedcomFactStream()
+    report = {"individuals": 0, "families": 0, "facts_written": 0, "rejected_count": 0, "rejected": [], "conflicts": []}
+    genders: Dict[str, str] = {}
+
+    for batch in batched(stream.facts(lines), batch_size):
+        accepted = []
+        graph = get_family_graph(kb_file)
+        overlay = []
+        try:
+            for fact in batch:
+                predicate, args = parse_fact(fact)
+                if predicate in ("male", "female"):
+                    genders[args[0]] = predicate
+                elif validation == "full" and predicate == "parent_of":
+                    outcome = validator.validate(_statement_for(fact, genders), [Fact(predicate, args)])
+                    if not outcome.valid and not outcome.action:
+                        report["rejected_count"] += 1
+                        if len(report["rejected"]) < MAX_REPORTED_ISSUES:
+                            report["rejected"].append({"fact": fact, "message": outcome.message})
+                        continue
+                accepted.append(fact)
+                # Later facts in the batch are validated against this one
+                if validation == "full" and graph.add_fact(fact):
+                    overlay.append(fact)
+        finally:
+            for fact in overlay:
+                graph.remove_fact(fact)
+
+        if accepted:
+            result = fact_manager.store_facts(accepted)
+            if result.startswith("Error"):
+                raise RuntimeError(result)
+            report["facts_written"] += len(accepted)
+
+        report["individuals"] = stream.individuals
+        report["families"] = stream.families
+        log.info("gedcom import batch", individuals=stream.individuals, families=stream.families,
+                 facts_written=report["facts_written"])
+        if progress:
+            progress(dict(report))
+
+    report["individuals"] = stream.individuals
+    report["families"] = stream.families
+
+    if validation == "deferred":
+        report["conflicts"] = find_conflicts(kb_file)
+    return report
+
+def find_conflicts(kb_file: str) -> List[str]:
+    """List generation conflicts, ancestry cycles and double genders in a knowledge base."""
+    graph = get_family_graph(kb_file)
+    conflicts = []
+    for fact in get_reachability_index(kb_file).cycles:
+        conflicts.append(f"Circular ancestry: {fact}")
+    for fact in get_generation_index(kb_file).conflicts:
+        conflicts.append(f"Inconsistent generations: {fact}")
+    for person_id, facts in graph.by_person.items():
+        person = graph.names.atom(person_id)
+        if f"male({person})." in facts and f"female({person})." in facts:
+            conflicts.append(f"Both male and female: {person}")
+    return conflicts[:MAX_REPORTED_ISSUES]
@@ -0,0 +1,140 @@
+from typing import Dict, List, Optional, Set, Tuple
+from family_graph import FamilyGraph, get_family_graph, parse_fact
+from name_table import NameTable
+
+# Generation difference implied by each stored relationship: gen(second) - gen(first)
+GENERATION_OFFSETS = {
+    "parent_of": 1,
+    "sibling_of": 0,
+    "half_sibling_of": 0,
+    # A sibling group sits on its members' generation, so members end up level with each other
+    "sibling_group": 0,
+    "grandparent_of": 2,
+    "grandmother_of": 2,
+    "grandfather_of": 2,
+    "aunt_of": 1,
+    "uncle_of": 1,
+    "cousin_of": 0,
+    # niece_of(niece, aunt_or_uncle) and grandchild_of(grandchild, grandparent) point upwards
+    "niece_of": -1,
+    "nephew_of": -1,
+    "grandchild_of": -2,
+    "grandson_of": -2,
+    "granddaughter_of": -2,
+}
+
+class GenerationIndex:
+    """Relative generation of every person, per connected family component.
+
+    A weighted union-find: each person points towards the root of their component and
+    stores their generation relative to it, so the generation gap between any two
+    connected people is an integer subtraction. A fact that contradicts the gaps
+    already known (e.g. someone becoming their own ancestor) is recorded as a conflict.
+    People are the integer ids of the session's name table.
+    """
+
+    def __init__(self, names: NameTable):
+        self.names = names
+        self.parent: Dict[int, int] = {}
+        self.offset: Dict[int, int] = {}
+        self.conflicts: List[str] = []
+        self.inconsistent_roots: Set[int] = set()
+        self.dirty = False
+
+    def _find(self, person: int) -> Tuple[int, int]:
+        """Return (root, generation of person relative to root), compressing the path."""
+        if person not in self.parent:
+            self.parent[person] = person
+            self.offset[person] = 0
+            return person, 0
+
+        path = []
+        node = person
+        while self.parent[node] != node:
+            path.append(node)
+            node = self.parent[node]
+        root = node
+
+        # Walk back down so every node on the path points straight at the root
+        total = 0
+        for node in reversed(path):
+            total += self.offset[node]
+            self.offset[node] = total
+            self.parent[node] = root
+        return root, self.offset[person]
+
+    def relate(self, first: str, second: str, gap: int, fact: str = "") -> bool:
+        """Record gen(second) - gen(first) == gap. Returns False if it contradicts known gaps."""
+        root1, gen1 = self._find(self.names.intern(first))
+        root2, gen2 = self._find(self.names.intern(second))
+        if root1 == root2:
+            if gen2 - gen1 != gap:
+                self.conflicts.append(fact or f"{first}->{second}:{gap}")
+                self.inconsistent_roots.add(root1)
+                return False
+            return True
+
+        # Attach the second component under the first root
+        self.parent[root2] = root1
+        self.offset[root2] = gen1 + gap - gen2
+        if root2 in self.inconsistent_roots:
+            self.inconsistent_roots.discard(root2)
+            self.inconsistent_roots.add(root1)
+        return True
+
+    def generation_gap(self, first: str, second: str) -> Optional[int]:
+        """Return gen(second) - gen(first), or None if unrelated or the component is inconsistent."""
+        first_id = self.names.id_of(first)
+        second_id = self.names.id_of(second)
+        if first_id not in self.parent or second_id not in self.parent:
+            return None
+        root1, gen1 = self._find(first_id)
+        root2, gen2 = self._find(second_id)
+        if root1 != root2 or root1 in self.inconsistent_roots:
+            return None
+        return gen2 - gen1
+
+    def connected(self, first: str, second: str) -> bool:
+        """Check whether two people are linked by any chain of stored facts."""
+        first_id = self.names.id_of(first)
+        second_id = self.names.id_of(second)
+        if first_id not in self.parent or second_id not in self.parent:
+            return False
+        return self._find(first_id)[0] == self._find(second_id)[0]
+
+    def fact_added(self, fact: str):
+        """Apply a new fact from the family graph."""
+        parsed = parse_fact(fact)
+        if parsed and parsed[0] in GENERATION_OFFSETS and len(parsed[1]) == 2:
+            self.relate(parsed[1][0], parsed[1][1], GENERATION_OFFSETS[parsed[0]], fact)
+
+    def fact_removed(self, fact: str):
+        """Union-find cannot split components, so removals trigger a rebuild on next use."""
+        parsed = parse_fact(fact)
+        if parsed and parsed[0] in GENERATION_OFFSETS:
+            self.dirty = True
+
+    def rebuild(self, graph: FamilyGraph):
+        """Recompute every component from the facts in the graph."""
+        self.parent.clear()
+        self.offset.clear()
+        self.conflicts = []
+        self.inconsistent_roots.clear()
+        self.dirty = False
+        for fact in sorted(graph.facts):
+            self.fact_added(fact)
+
+# Generation indexes per knowledge base file
+_indexes: Dict[str, GenerationIndex] = {}
+
+def get_generation_index(kb_file: str) -> GenerationIndex:
+    """Return the generation index for a knowledge base file, in step with its family graph."""
+    graph = get_family_graph(kb_file)
+    index = _indexes.get(kb_file)
+    if index is None:
+        index = GenerationIndex(graph.names)
+        graph.add_listener(index)
+        _indexes[kb_file] = index
+    if index.dirty:
+        index.rebuild(graph)
+    return index
@@ -0,0 +1,231 @@
+from typing import Dict, List, Tuple, Any, Iterator
+from family_graph import FamilyGraph, get_family_graph
+
+# NumPy is only needed for bulk kinship queries; the chat works without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# SciPy sparse matrices keep large trees in memory; without it dense arrays are used
+try:
+    import scipy.sparse as sp
+except ImportError:
+    sp = None
+
+# Largest tree built with dense arrays, which take people² int32 entries per relation
+# (16 MB each at this size); bigger trees without SciPy are listed by Prolog instead
+DENSE_MAX_PEOPLE = 2000
+
+# Relations that can be listed as pairs, in the argument order of the Prolog predicates
+SUPPORTED_RELATIONS = [
+    "parent_of", "child_of", "father_of", "mother_of", "son_of", "daughter_of",
+    "sibling_of", "brother_of", "sister_of",
+    "half_sibling_of", "half_brother_of", "half_sister_of",
+    "grandparent_of", "grandmother_of", "grandfather_of",
+    "grandchild_of", "grandson_of", "granddaughter_of",
+    "uncle_of", "aunt_of", "niece_of", "nephew_of", "cousin_of",
+]
+
+def matrices_available() -> bool:
+    """Check whether the optional NumPy dependency is installed."""
+    return np is not None
+
+def matrices_fit(graph: FamilyGraph) -> bool:
+    """Check whether a family tree's matrices can be built without taking too much memory."""
+    return sp is not None or len(graph.names.atoms) <= DENSE_MAX_PEOPLE
+
+class KinshipMatrices:
+    """Every supported relation of a family tree as a 0/1 adjacency matrix.
+
+    parent_of is built from the stored facts (P[i, j] = 1 when i is a parent of j) and
+    the family rules become matrix products and masks, e.g. siblings are P.T @ P without
+    the diagonal (plus co-members of a sibling group, G.T @ G) and cousins are
+    P.T @ S @ P. Stored facts of derived predicates (such as a directly stated
+    sibling_of) are added on top, just like Prolog would find them.
+    Half-siblings assume at most two parents per person.
+    """
+
+    def __init__(self, graph: FamilyGraph):
+        # Row/column i is the person with id i in the session's name table
+        self.names: List[str] = list(graph.names.atoms)
+        self.size = len(self.names)
+
+        stored: Dict[str, List[Tuple[int, int]]] = {}
+        male = np.zeros(self.size, dtype=np.int32)
+        female = np.zeros(self.size, dtype=np.int32)
+        for predicate, person_ids in graph.parsed.values():
+            if len(person_ids) == 1:
+                if predicate == "male":
+                    male[person_ids[0]] = 1
+                elif predicate == "female":
+                    female[person_ids[0]] = 1
+            elif len(person_ids) == 2:
+                stored.setdefault(predicate, []).append(person_ids)
+        self.male = male
+        self.female = female
+        self.stored = stored
+        self.relations: Dict[str, Any] = {}
+        self._derive()
+
+    def _from_pairs(self, pairs: List[Tuple[int, int]]):
+        """Build a 0/1 matrix from (row, column) pairs."""
+        if sp is not None:
+            rows = np.array([r for r, _ in pairs], dtype=np.int64)
+            cols = np.array([c for _, c in pairs], dtype=np.int64)
+            data = np.ones(len(pairs), dtype=np.int32)
+            return self._binary(sp.csr_matrix((data, (rows, cols)), shape=(self.size, self.size)))
+        matrix = np.zeros((self.size, self.size), dtype=np.int32)
+        for r, c in pairs:
+            matrix[r, c] = 1
+        return matrix
+
+    def _stored(self, predicate: str):
+        """Return the stored facts of a predicate as a matrix."""
+        return self._from_pairs(self.stored.get(predicate, []))
+
+    def _binary(self, matrix):
+        """Clamp counts to 0/1."""
+        if sp is not None:
+            return (matrix > 0).astype(np.int32).tocsr()
+        return (matrix > 0).astype(np.int32)
+
+    def _union(self, *matrices):
+        """Element-wise OR of several matrices."""
+        total = matrices[0]
+        for matrix in matrices[1:]:
+            total = total + matrix
+        return self._binary(total)
+
+    def _rows(self, matrix, mask):
+        """Keep only the rows whose mask entry is set."""
+        if sp is not None:
+            return self._binary(sp.diags(mask, dtype=np.int32) @ matrix)
+        return matrix * mask[:, None]
+
+    def _without_diagonal(self, matrix):
+        """Drop X-X pairs (the X \\= Y guards of the rules)."""
+        if sp is not None:
+            return self._binary(matrix - sp.diags(matrix.diagonal(), dtype=np.int32))
+        matrix = matrix.copy()
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+    def _equals(self, matrix, value: int):
+        """Return a 0/1 matrix marking entries equal to a nonzero value."""
+        if sp is not None:
+            return (matrix == value).astype(np.int32).tocsr()
+        return (matrix == value).astype(np.int32)
+
+    def _derive(self):
+        """Compute every supported relation from the parent matrix."""
+        r = self.relations
+        P = self._stored("parent_of")
+        r["parent_of"] = P
+        r["child_of"] = self._union(P.T, self._stored("child_of"))
+        r["father_of"] = self._union(self._rows(P, self.male), self._stored("father_of"))
+        r["mother_of"] = self._union(self._rows(P, self.female), self._stored("mother_of"))
+        r["son_of"] = self._union(self._rows(r["child_of"], self.male), self._stored("son_of"))
+        r["daughter_of"] = self._union(self._rows(r["child_of"], self.female), self._stored("daughter_of"))
+
+        # Shared parent counts: 1 with two parents each means half, otherwise full
+        shared = P.T @ P
+        G = self._stored("sibling_group")
+        r["sibling_of"] = self._union(
+            self._without_diagonal(self._binary(self._union(shared, G.T @ G))), self._stored("sibling_of"))
+        r["brother_of"] = self._union(self._rows(r["sibling_of"], self.male), self._stored("brother_of"))
+        r["sister_of"] = self._union(self._rows(r["sibling_of"], self.female), self._stored("sister_of"))
+
+        two_parents = (np.asarray(P.sum(axis=0)).ravel() == 2).astype(np.int32)
+        half = self._rows(self._rows(self._equals(shared, 1), two_parents).T, two_parents).T
+        r["half_sibling_of"] = self._union(self._without_diagonal(half), self._stored("half_sibling_of"))
+        r["half_brother_of"] = self._union(self._rows(r["half_sibling_of"], self.male), self._stored("half_brother_of"))
+        r["half_sister_of"] = self._union(self._rows(r["half_sibling_of"], self.female), self._stored("half_sister_of"))
+
+        r["grandparent_of"] = self._union(self._without_diagonal(self._binary(P @ P)), self._stored("grandparent_of"))
+        r["uncle_of"] = self._union(
+            self._without_diagonal(self._binary(self._union(r["brother_of"], r["half_brother_of"]) @ P)),
+            self._stored("uncle_of"))
+        r["aunt_of"] = self._union(
+            self._without_diagonal(self._binary(self._union(r["sister_of"], r["half_sister_of"]) @ P)),
+            self._stored("aunt_of"))
+
+        # The rules also infer grandparents from an uncle/aunt of someone's parent
+        r["grandfather_of"] = self._union(
+            self._rows(r["grandparent_of"], self.male),
+            self._rows(self._without_diagonal(self._binary(r["uncle_of"] @ P)), self.male),
+            self._stored("grandfather_of"))
+        r["grandmother_of"] = self._union(
+            self._rows(r["grandparent_of"], self.female),
+            self._rows(self._without_diagonal(self._binary(r["aunt_of"] @ P)), self.female),
+            self._stored("grandmother_of"))
+        r["grandchild_of"] = self._union(r["grandparent_of"].T, self._stored("grandchild_of"))
+        r["grandson_of"] = self._union(self._rows(r["grandchild_of"], self.male), self._stored("grandson_of"))
+        r["granddaughter_of"] = self._union(self._rows(r["grandchild_of"], self.female), self._stored("granddaughter_of"))
+
+        aunts_and_uncles = self._union(r["uncle_of"], r["aunt_of"]).T
+        r["niece_of"] = self._union(self._rows(aunts_and_uncles, self.female), self._stored("niece_of"))
+        r["nephew_of"] = self._union(self._rows(aunts_and_uncles, self.male), self._stored("nephew_of"))
+
+        r["cousin_of"] = self._union(
+            self._without_diagonal(self._binary(P.T @ r["sibling_of"] @ P)),
+            self._stored("cousin_of"))
+
+    def iter_pairs(self, relation: str) -> Iterator[Tuple[str, str]]:
+        """Yield the pairs of a relation row by row, without collecting them first."""
+        matrix = self.relations[relation]
+        if sp is not None:
+            for i in range(self.size):
+                start, end = matrix.indptr[i], matrix.indptr[i + 1]
+                for j in matrix.indices[start:end].tolist():
+                    yield self.names[i], self.names[j]
+        else:
+            for i in range(self.size):
+                for j in np.nonzero(matrix[i])[0].tolist():
+                    yield self.names[i], self.names[j]
+
+    def pairs(self, relation: str) -> List[Tuple[str, str]]:
+        """Return every (X, Y) for which relation(X, Y) holds."""
+        matrix = self.relations[relation]
+        if sp is not None:
+            rows, cols = matrix.nonzero()
+        else:
+            rows, cols = np.nonzero(matrix)
+        return sorted((self.names[i], self.names[j]) for i, j in zip(rows.tolist(), cols.tolist()))
+
+# Matrices per knowledge base file, with the content digest they were built from
+_matrices: Dict[str, Tuple[str, KinshipMatrices]] = {}
+
+def get_kinship_matrices(kb_file: str) -> KinshipMatrices:
+    """Return the kinship matrices for a knowledge base file, rebuilt only when its content changed."""
+    graph = get_family_graph(kb_file)
+    digest = graph.fingerprint["digest"]
+    cached = _matrices.get(kb_file)
+    if cached and cached[0] == digest:
+        return cached[1]
+    matrices = KinshipMatrices(graph)
+    _matrices[kb_file] = (digest, matrices)
+    return matrices
+
+def _prolog_pairs(kb_file: str, relation: str) -> List[Tuple[str, str]]:
+    """Return all pairs of a relation by querying the knowledge base one relation at a time."""
+    from utils import get_prolog_engine, safe_prolog_query
+    results = safe_prolog_query(get_prolog_engine(kb_file), f"{relation}(X, Y)")
+    return sorted({(str(result["X"]), str(result["Y"])) for result in results})
+
+def iter_relation_pairs(kb_file: str, relation: str) -> Iterator[Tuple[str, str]]:
+    """Yield the pairs of a relation, from the matrices when the tree fits in memory."""
+    if matrices_fit(get_family_graph(kb_file)):
+        yield from get_kinship_matrices(kb_file).iter_pairs(relation)
+    else:
+        yield from _prolog_pairs(kb_file, relation)
+
+def relation_pairs(kb_file: str, relation: str) -> List[Tuple[str, str]]:
+    """Return all pairs of a relation in a knowledge base, computed in bulk."""
+    if not matrices_available():
+        raise RuntimeError("NumPy is required for bulk kinship queries.")
+    if relation not in SUPPORTED_RELATIONS:
+        raise ValueError(f"Unsupported relation: {relation}")
+    if not matrices_fit(get_family_graph(kb_file)):
+        return _prolog_pairs(kb_file, relation)
+    return get_kinship_matrices(kb_file).pairs(relation)
@@ -0,0 +1,115 @@
+import json
+import os
+import random
+import sys
+from datetime import datetime
+from typing import Any, Dict
+
+from tracing import current_trace
+
+# Levels, lowest first; a line is written when its level reaches the configured one
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+
+# Process-wide settings, read from the environment and changed by configure()
+_settings: Dict[str, Any] = {
+    "level": LEVELS.get(os.environ.get("FAMILY_LOG_LEVEL", "info").strip().lower(), INFO),
+    # "text" (one readable line) or "json" (one object per line)
+    "format": os.environ.get("FAMILY_LOG_FORMAT", "text").strip().lower(),
+    # Share of debug and info lines kept; warnings and errors are always written
+    "sample": float(os.environ.get("FAMILY_LOG_SAMPLE", "1.0")),
+    # None writes to whatever sys.stderr is at the time
+    "stream": None,
+}
+
+def configure(level: str = None, log_format: str = None, sample: float = None, stream=None):
+    """Change the level, format, sample rate or output stream of every logger."""
+    if level is not None:
+        _settings["level"] = LEVELS[level.strip().lower()]
+    if log_format is not None:
+        _settings["format"] = log_format.strip().lower()
+    if sample is not None:
+        _settings["sample"] = sample
+    if stream is not None:
+        _settings["stream"] = stream
+
+def _value(value: Any) -> Any:
+    """Evaluate a lazy field: callables are called only for lines that are written."""
+    return value() if callable(value) else value
+
+class Logger:
+    """Leveled logger of one module, writing an event name plus key=value fields.
+
+    Nothing is formatted for a line below the level, so expensive fields are passed
+    as callables: log.debug("found facts", facts=lambda: sorted(prolog.loaded)).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def enabled(self, level: int) -> bool:
+        return level >= _settings["level"]
+
+    def debug(self, event: str, **fields: Any):
+        if DEBUG >= _settings["level"]:
+            self._log(DEBUG, "debug", event, fields)
+
+    def info(self, event: str, **fields: Any):
+        if INFO >= _settings["level"]:
+            self._log(INFO, "info", event, fields)
+
+    def warning(self, event: str, **fields: Any):
+        if WARNING >= _settings["level"]:
+            self._log(WARNING, "warning", event, fields)
+
+    def error(self, event: str, **fields: Any):
+        if ERROR >= _settings["level"]:
+            self._log(ERROR, "error", event, fields)
+
+    def _log(self, level: int, level_name: str, event: str, fields: Dict[str, Any]):
+        sample = _settings["sample"]
+        if level < WARNING and sample < 1.0 and random.random() >= sample:
+            return
+        turn = current_trace()
+        record = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "level": level_name,
+            "logger": self.name,
+            "request_id": turn.request_id if turn is not None else None,
+            "event": event,
+        }
+        for key, value in fields.items():
+            record[key] = _value(value)
+        write(record)
+
+def format_text(record: Dict[str, Any]) -> str:
+    """Lay out a record as: time LEVEL logger [request id] event key=value ..."""
+    line = f"{record['time']} {record['level'].upper():7} {record['logger']}"
+    if record["request_id"]:
+        line += f" [{record['request_id']}]"
+    line += f" {record['event']}"
+    for key, value in record.items():
+        if key in ("time", "level", "logger", "request_id", "event"):
+            continue
+        text = str(value)
+        line += f" {key}={json.dumps(text) if (' ' in text or not text) else text}"
+    return line
+
+def write(record: Dict[str, Any]):
+    """Write one record in the configured format."""
+    if _settings["format"] == "json":
+        line = json.dumps(record, default=str)
+    else:
+        line = format_text(record)
+    stream = _settings["stream"] or sys.stderr
+    stream.write(line + "\n")
+
+_loggers: Dict[str, Logger] = {}
+
+def get_logger(name: str) -> Logger:
+    """Return the logger of a module, creating it on first use."""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = Logger(name)
+        _loggers[name] = logger
+    return logger
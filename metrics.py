@@ -0,0 +1,160 @@
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Latency buckets in seconds; a turn that rewrites the knowledge base takes at least ~0.1s
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# A scrape-time sample: (metric name, labels, value)
+Sample = Tuple[str, Dict[str, str], float]
+
+def _label_text(labels: Dict[str, str]) -> str:
+    """Render labels as {a="1",b="2"}, escaped the way the Prometheus text format expects."""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, value in list(self.values.items()):
+            lines.append(f"{self.name}{_label_text(dict(key))} {_number(value)}")
+        return lines
+
+class Gauge(Counter):
+    """A value that goes up and down, per label set."""
+
+    metric_type = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    """Observations counted into cumulative buckets, with their sum and count, per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Label set -> (per-bucket counts, sum, count)
+        self.values: Dict[Tuple[Tuple[str, str], ...], List] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(sorted(labels.items()))
+        entry = self.values.get(key)
+        if entry is None:
+            entry = [[0] * len(self.buckets), 0.0, 0]
+            self.values[key] = entry
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                entry[0][i] += 1
+                break
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in list(self.values.items()):
+            labels = dict(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_label_text(dict(labels, le=_number(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_label_text(labels)} {count}")
+        return lines
+
+REQUEST_LATENCY = Histogram("family_http_request_duration_seconds", "HTTP request latency by route.")
+REQUESTS = Counter("family_http_requests_total", "HTTP requests by route and status.")
+REQUESTS_IN_FLIGHT = Gauge("family_http_requests_in_flight", "HTTP requests being handled.")
+CONSULTS = Counter("family_kb_consults_total", "Knowledge base files (re)loaded into an inference engine.")
+
+_metrics = [REQUEST_LATENCY, REQUESTS, REQUESTS_IN_FLIGHT, CONSULTS]
+
+# Metrics read from the application's state when /metrics is scraped: name -> (type, help)
+RUNTIME_METRICS: Dict[str, Tuple[str, str]] = {
+    "family_sessions_loaded": ("gauge", "Knowledge bases with in-memory indexes."),
+    "family_kb_facts": ("gauge", "Facts in each loaded knowledge base."),
+    "family_inference_engines": ("gauge", "Inference engines alive, by kind."),
+    "family_query_cache_hits_total": ("counter", "Query cache hits per knowledge base."),
+    "family_query_cache_misses_total": ("counter", "Query cache misses per knowledge base."),
+    "family_query_cache_hit_ratio": ("gauge", "Share of query cache lookups answered from the cache."),
+    "family_query_cache_entries": ("gauge", "Queries held in the cache per knowledge base."),
+}
+
+# Scrape-time collectors added by the app; each returns samples of metrics it registered
+_collectors: List[Callable[[], List[Sample]]] = []
+
+def register_collector(metrics: Dict[str, Tuple[str, str]], collector: Callable[[], List[Sample]]):
+    """Add metrics (name -> (type, help)) whose samples `collector` returns at scrape time."""
+    RUNTIME_METRICS.update(metrics)
+    _collectors.append(collector)
+
+def runtime_samples() -> List[Sample]:
+    """Read the in-memory state of the knowledge base modules: sessions, engines, facts and caches."""
+    import utils
+    import family_graph
+    import query_cache
+
+    # Chat requests add sessions from the worker threads while this runs, so iterate copies
+    graphs = list(family_graph._graphs.items())
+    samples: List[Sample] = [("family_sessions_loaded", {}, len(graphs))]
+    for kb_file, graph in graphs:
+        samples.append(("family_kb_facts", {"kb": kb_file}, len(graph.facts)))
+
+    samples.append(("family_inference_engines", {"kind": "resident"}, 1 if utils._resident_engine["prolog"] is not None else 0))
+    samples.append(("family_inference_engines", {"kind": "scoped"}, 1 if family_graph._scoped_engine["engine"] is not None else 0))
+    if utils.INFERENCE_BACKEND == "datalog":
+        import datalog
+        samples.append(("family_inference_engines", {"kind": "materialized"}, len(datalog._views)))
+
+    for kb_file, cache in list(query_cache._caches.items()):
+        lookups = cache.hits + cache.misses
+        samples.append(("family_query_cache_hits_total", {"kb": kb_file}, cache.hits))
+        samples.append(("family_query_cache_misses_total", {"kb": kb_file}, cache.misses))
+        samples.append(("family_query_cache_hit_ratio", {"kb": kb_file}, cache.hits / lookups if lookups else 0.0))
+        samples.append(("family_query_cache_entries", {"kb": kb_file}, len(cache.entries)))
+    return samples
+
+def render_metrics() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+
+    samples = runtime_samples()
+    for collector in _collectors:
+        samples.extend(collector())
+    by_name: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_name.setdefault(sample[0], []).append(sample)
+    for name, (metric_type, help_text) in RUNTIME_METRICS.items():
+        if name not in by_name:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for _, labels, value in by_name[name]:
+            lines.append(f"{name}{_label_text(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
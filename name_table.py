@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional, Iterable, Set
+
+class NameTable:
+    """Compact integer ids for the people of one knowledge base.
+
+    Every prolog atom seen by the family graph is interned once and keeps its id for
+    the rest of the session, even after its last fact is removed, so the indexes built
+    on top (adjacency sets, union-find, bitsets, matrix rows) can hold plain ints and
+    ids never have to be renumbered. Atoms are only produced when a result leaves the
+    indexes; the parser, validator and query handler work with atoms, since that is what
+    the Prolog engines take.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.atoms: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.atoms)
+
+    def __contains__(self, atom: str) -> bool:
+        return atom in self.ids
+
+    def intern(self, atom: str) -> int:
+        """Return the id of a prolog atom, assigning the next free one if needed."""
+        person_id = self.ids.get(atom)
+        if person_id is None:
+            person_id = len(self.atoms)
+            self.ids[atom] = person_id
+            self.atoms.append(atom)
+        return person_id
+
+    def id_of(self, atom: str) -> Optional[int]:
+        """Return the id of a prolog atom, or None if it was never interned."""
+        return self.ids.get(atom)
+
+    def ids_of(self, atoms: Iterable[str]) -> Set[int]:
+        """Return the ids of the atoms that were interned, skipping the others."""
+        return {self.ids[atom] for atom in atoms if atom in self.ids}
+
+    def atom(self, person_id: int) -> str:
+        """Return the prolog atom of an id."""
+        return self.atoms[person_id]
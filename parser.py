@@ -1,7 +1,6 @@
 import re
 import os
 import time
-from pyswip import Prolog
 from typing import Tuple, List, Optional, Dict, Any
 
 # Import modular components
@@ -9,7 +8,9 @@ from validation import RelationshipValidator
 from clarification import ClarificationHandler
 from fact_manager import FactManager
 from query_handler import QueryHandler
-from utils import to_prolog_name, validate_name
+from utils import to_prolog_name, validate_name, sibling_group_id
+from provenance import HISTORY_COMMAND_PATTERN, handle_history_command
+from statement_ir import Question
 
 # Global variables
 current_kb_file = "relationships.pl"
@@ -86,6 +87,36 @@ class FamilyRelationshipParser:
              lambda m: f"{m.group(2)}({to_prolog_name(m.group(1))})."),
         ]
         
+        # Negative statements; each yields the stored facts it denies
+        self.retraction_patterns = [
+            ("not_parent", r"^([A-Z][a-z]+) is not the (father|mother) of ([A-Z][a-z]+)\.$",
+             lambda m: f"parent_of({to_prolog_name(m.group(1))}, {to_prolog_name(m.group(3))})."),
+            
+            ("not_child", r"^([A-Z][a-z]+) is not a (child|son|daughter) of ([A-Z][a-z]+)\.$",
+             lambda m: f"parent_of({to_prolog_name(m.group(3))}, {to_prolog_name(m.group(1))})."),
+            
+            ("not_siblings", r"^([A-Z][a-z]+) and ([A-Z][a-z]+) are not (siblings|brothers|sisters)\.$",
+             lambda m: self._handle_not_siblings(m.group(1), m.group(2))),
+            
+            ("not_individual_sibling", r"^([A-Z][a-z]+) is not a (sister|brother) of ([A-Z][a-z]+)\.$",
+             lambda m: self._handle_not_siblings(m.group(1), m.group(3))),
+            
+            ("not_grandparent", r"^([A-Z][a-z]+) is not (?:the|a) (grandmother|grandfather) of ([A-Z][a-z]+)\.$",
+             lambda m: f"{m.group(2)}_of({to_prolog_name(m.group(1))}, {to_prolog_name(m.group(3))})."),
+            
+            ("not_aunt_uncle", r"^([A-Z][a-z]+) is not (?:the|an) (aunt|uncle) of ([A-Z][a-z]+)\.$",
+             lambda m: f"{m.group(2)}_of({to_prolog_name(m.group(1))}, {to_prolog_name(m.group(3))})."),
+            
+            ("not_niece_nephew", r"^([A-Z][a-z]+) is not a (niece|nephew) of ([A-Z][a-z]+)\.$",
+             lambda m: f"{m.group(2)}_of({to_prolog_name(m.group(1))}, {to_prolog_name(m.group(3))})."),
+            
+            ("not_cousin", r"^([A-Z][a-z]+) is not a cousin of ([A-Z][a-z]+)\.$",
+             lambda m: f"cousin_of({to_prolog_name(m.group(1))}, {to_prolog_name(m.group(2))}).\ncousin_of({to_prolog_name(m.group(2))}, {to_prolog_name(m.group(1))})."),
+            
+            ("not_gender", r"^([A-Z][a-z]+) is not (male|female)\.$",
+             lambda m: f"{m.group(2)}({to_prolog_name(m.group(1))})."),
+        ]
+        
         # Question patterns for queries
         self.question_patterns = [
             ("sibling", r"^Are ([A-Z][a-z]+) and ([A-Z][a-z]+) (siblings?|brothers?|sisters?)\?$",
@@ -142,6 +173,12 @@ class FamilyRelationshipParser:
             ("who_children", r"^Who are the children of ([A-Z][a-z]+)\?$",
              lambda m: f"child_of(X, {to_prolog_name(m.group(1))})"),
             
+            ("who_ancestors", r"^Who are the ancestors of ([A-Z][a-z]+)\?$",
+             lambda m: f"ancestor_of(X, {to_prolog_name(m.group(1))})"),
+            
+            ("who_descendants", r"^Who are the descendants of ([A-Z][a-z]+)\?$",
+             lambda m: f"ancestor_of({to_prolog_name(m.group(1))}, X)"),
+            
             ("niece_nephew", r"^Is ([A-Z][a-z]+) a (niece|nephew) of ([A-Z][a-z]+)\?$",
              lambda m: f"{'niece' if m.group(2) == 'niece' else 'nephew'}_of({to_prolog_name(m.group(1))}, {to_prolog_name(m.group(3))})"),
             
@@ -186,15 +223,19 @@ class FamilyRelationshipParser:
             if part.startswith('and '):
                 part = part[4:]  # Remove "and " prefix
             names.append(part)
-        facts = []
-        
-        # Only add sibling relationships, not shared_parent facts yet
-        # Shared_parent will be added later when it's established they don't share the first parent
-        for i in range(len(names)):
-            for j in range(i + 1, len(names)):
-                facts.append(f"sibling_of({to_prolog_name(names[i])}, {to_prolog_name(names[j])}).")
         
-        return '\n'.join(facts)
+        # One group membership per person; sibling_of/2 is derived from the shared group
+        return self._sibling_group_facts(names)
+    
+    def _sibling_group_facts(self, names: List[str]) -> str:
+        """Return sibling_group facts putting everyone named into one group."""
+        group = sibling_group_id(names)
+        return '\n'.join(f"sibling_group({group}, {to_prolog_name(name)})." for name in names)
+    
+    def _handle_not_siblings(self, person1: str, person2: str) -> str:
+        """List every stored sibling fact between two people, in both directions."""
+        p1, p2 = to_prolog_name(person1), to_prolog_name(person2)
+        return '\n'.join(f"{predicate}({a}, {b})." for predicate in ("sibling_of", "half_sibling_of") for a, b in ((p1, p2), (p2, p1)))
     
     def _handle_multi_children(self, names_str: str, parent: str) -> str:
         """Handle multi-person children statements."""
@@ -205,10 +246,8 @@ class FamilyRelationshipParser:
         for name in names:
             facts.append(f"parent_of({to_prolog_name(parent)}, {to_prolog_name(name)}).")
         
-        # Add sibling relationships
-        for i in range(len(names)):
-            for j in range(i + 1, len(names)):
-                facts.append(f"sibling_of({to_prolog_name(names[i])}, {to_prolog_name(names[j])}).")
+        # Add the children as one sibling group
+        facts.append(self._sibling_group_facts(names))
         
         return '\n'.join(facts)
     
@@ -223,18 +262,36 @@ class FamilyRelationshipParser:
         else:
             return f"sibling_of({to_prolog_name(new_sibling)}, {to_prolog_name(existing_person)})."
     
-    def _handle_brother_sister_question(self, person1: str, relationship_type: str, person2: str) -> str:
+    def _handle_brother_sister_question(self, person1: str, relationship_type: str, person2: str) -> Question:
         """Handle brother/sister questions by checking gender and sibling relationships."""
         # This will be handled by the query handler to check gender and sibling relationships
-        return f"check_brother_sister_relationship:{to_prolog_name(person1)}:{relationship_type}:{to_prolog_name(person2)}"
+        return Question("brother_sister", (to_prolog_name(person1), relationship_type, to_prolog_name(person2)))
+    
+    def _is_retraction(self, user_input: str) -> bool:
+        """Check whether the input denies or withdraws a statement."""
+        text = user_input.strip()
+        if text.startswith("Forget that "):
+            return True
+        return any(re.fullmatch(pattern, text) for _, pattern, _ in self.retraction_patterns)
     
     def parse_input(self, user_input: str) -> str:
         """Main entry point for parsing user input."""
-        from fact_manager import clarification_context
+        # Move between versions of the session: "undo", "redo", "changes", "restore to change 3"
+        if HISTORY_COMMAND_PATTERN.match(user_input.strip()):
+            return handle_history_command(user_input, current_kb_file)
+        
+        # Handle answers to the session's pending follow-up question next
+        if self.clarification_handler.expects(user_input):
+            return self.clarification_handler.handle_response(user_input)
+        
+        # Corrections: "A is not the father of B." or "Forget that A is the father of B."
+        if self._is_retraction(user_input):
+            return self.fact_manager.retract_statement(user_input, self.retraction_patterns, self.statement_patterns)
         
-        # Handle clarification responses first
-        if clarification_context and user_input.lower().strip() in ["yes", "no", "mother", "father", "uncle", "aunt", "half-sibling", "half-brother", "half-sister"]:
-            return self.clarification_handler.handle_response(user_input, clarification_context)
+        # Handle batches of statements: "batch: A is the father of B. B is male."
+        if user_input.strip().lower().startswith("batch:"):
+            results = self.fact_manager.add_facts_batch(user_input.strip()[len("batch:"):], self.statement_patterns, self.validator)
+            return self.fact_manager.format_batch_results(results)
         
         # Check if it's a question
         if user_input.strip().endswith('?'):
@@ -248,6 +305,11 @@ def parse_input(user_input: str) -> str:
     parser = FamilyRelationshipParser()
     return parser.parse_input(user_input)
 
+def ingest_statements(text: str, policy: str = ""):
+    """Global function for batch ingestion; returns the per-statement outcomes."""
+    parser = FamilyRelationshipParser()
+    return parser.fact_manager.add_facts_batch(text, parser.statement_patterns, parser.validator, policy)
+
 def query_prolog(question: str) -> str:
     """Global function for backward compatibility."""
     query_handler = QueryHandler()
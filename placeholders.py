@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Set
+from family_graph import parse_fact
+from utils import is_shared_parent
+
+class PlaceholderManager:
+    """Merge shared_mother_*/shared_father_* placeholders that stand for the same person.
+
+    A child has one mother and one father, so every placeholder parent of a child is
+    the same person as that child's other parents of the same gender. Those are joined
+    with union-find; each class is then written as its real parent, if it has one, or
+    else as its alphabetically first placeholder. Classes that would join two different
+    real parents are left as they are.
+    """
+
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.real: Dict[str, Optional[str]] = {}
+        self.conflicted: Set[str] = set()
+        self.renamed: Dict[str, str] = {}
+
+    def _find(self, person: str) -> str:
+        """Return the representative of a person's class, compressing the path."""
+        if person not in self.parent:
+            self.parent[person] = person
+            self.real[person] = None if is_shared_parent(person) else person
+        root = person
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[person] != root:
+            self.parent[person], person = root, self.parent[person]
+        return root
+
+    def _union(self, first: str, second: str):
+        """Join two classes unless that would equate two different real parents."""
+        root1, root2 = self._find(first), self._find(second)
+        if root1 == root2:
+            return
+        real1, real2 = self.real[root1], self.real[root2]
+        if real1 and real2 and real1 != real2:
+            self.conflicted.update((root1, root2))
+            return
+        self.parent[root2] = root1
+        self.real[root1] = real1 or real2
+        if root2 in self.conflicted:
+            self.conflicted.add(root1)
+
+    def consolidate(self, fact_lines: List[str]) -> List[str]:
+        """Return the fact lines with equivalent placeholders rewritten to one atom each."""
+        genders: Dict[str, str] = {}
+        parents_of: Dict[str, List[str]] = {}
+        for line in fact_lines:
+            parsed = parse_fact(line)
+            if not parsed:
+                continue
+            predicate, args = parsed
+            if predicate in ("male", "female") and len(args) == 1:
+                genders[args[0]] = predicate
+            elif predicate == "parent_of" and len(args) == 2:
+                parents_of.setdefault(args[1], []).append(args[0])
+
+        placeholders: Set[str] = set()
+        for child, parents in parents_of.items():
+            for gender, prefix in (("male", "shared_father_"), ("female", "shared_mother_")):
+                shared = [p for p in parents if p.startswith(prefix)]
+                if not shared:
+                    continue
+                placeholders.update(shared)
+                same_gender = shared + [p for p in parents if not is_shared_parent(p) and genders.get(p) == gender]
+                for other in same_gender[1:]:
+                    self._union(same_gender[0], other)
+        if not placeholders:
+            return fact_lines
+
+        # Pick one name per class
+        members: Dict[str, List[str]] = {}
+        for placeholder in placeholders:
+            members.setdefault(self._find(placeholder), []).append(placeholder)
+        for root, group in members.items():
+            if root in self.conflicted:
+                continue
+            canonical = self.real[root] or min(group)
+            for placeholder in group:
+                if placeholder != canonical:
+                    self.renamed[placeholder] = canonical
+        if not self.renamed:
+            return fact_lines
+
+        result = []
+        seen = set()
+        for line in fact_lines:
+            parsed = parse_fact(line)
+            if parsed and any(arg in self.renamed for arg in parsed[1]):
+                predicate, args = parsed
+                # A real parent keeps its own gender fact
+                if predicate in ("male", "female") and not is_shared_parent(self.renamed[args[0]]):
+                    continue
+                line = f"{predicate}({', '.join(self.renamed.get(arg, arg) for arg in args)})."
+            if line not in seen:
+                seen.add(line)
+                result.append(line)
+        return result
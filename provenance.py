@@ -0,0 +1,322 @@
+import json
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Set, Tuple, Optional, Any
+from family_graph import FamilyGraph, get_family_graph
+from logs import get_logger
+
+# Provenance is kept next to the knowledge base, in the chat session folder
+PROVENANCE_FILE = "provenance.jsonl"
+
+log = get_logger("provenance")
+
+class ProvenanceLog:
+    """Which statement added and removed which facts, appended to provenance.jsonl.
+
+    Each statement that changed the knowledge base gets one record with a sequential id
+    and its net effect: the fact lines it added and removed, as seen by the family graph
+    while the statement was processed. Facts are identified by their line, so a
+    statement's effects can be looked up, audited or reversed from the index alone.
+
+    The records double as the session's version journal: `applied` lists the statements
+    in effect and `undone` is the redo stack. Undo and redo are journaled too (kinds
+    "undo" and "redo"), so replaying the file rebuilds both stacks.
+    """
+
+    def __init__(self, kb_file: str, graph: FamilyGraph):
+        self.kb_file = kb_file
+        self.graph = graph
+        self.path = os.path.join(os.path.dirname(kb_file), PROVENANCE_FILE)
+        self.records: Dict[int, Dict[str, Any]] = {}
+        self.added_by: Dict[str, List[int]] = {}
+        self.removed_by: Dict[str, List[int]] = {}
+        self.retracted: Set[int] = set()
+        self.applied: List[int] = []
+        self.undone: List[int] = []
+        self.last_id = 0
+        self.recording = False
+        self.pending_added: Set[str] = set()
+        self.pending_removed: Set[str] = set()
+        self._outer: List[Tuple[Set[str], Set[str]]] = []
+        self._read()
+
+    def _read(self):
+        """Load the records already stored for this session."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        self._index(json.loads(line))
+                    except json.JSONDecodeError:
+                        log.warning("skipping unreadable provenance record", line=line.strip())
+
+    def _index(self, record: Dict[str, Any]):
+        """Add a record to the in-memory lookups."""
+        self.records[record["id"]] = record
+        self.last_id = max(self.last_id, record["id"])
+        for fact in record["added"]:
+            self.added_by.setdefault(fact, []).append(record["id"])
+        for fact in record["removed"]:
+            self.removed_by.setdefault(fact, []).append(record["id"])
+
+        if record["kind"] == "undo":
+            for statement_id in record["reverts"]:
+                self.applied.remove(statement_id)
+                self.undone.append(statement_id)
+                self.retracted.discard(self.records[statement_id].get("retracts"))
+        elif record["kind"] == "redo":
+            statement_id = record["reapplies"]
+            self.undone.remove(statement_id)
+            self.applied.append(statement_id)
+            if self.records[statement_id].get("retracts"):
+                self.retracted.add(self.records[statement_id]["retracts"])
+        else:
+            # A new change ends the redo history, as in any editor
+            self.applied.append(record["id"])
+            self.undone = []
+            if record.get("retracts"):
+                self.retracted.add(record["retracts"])
+
+    def begin(self):
+        """Start collecting the fact changes of one statement.
+
+        Calls may nest (an undo typed into the chat runs inside the chat's own
+        recording); the inner record keeps its changes and the outer one resumes after it.
+        """
+        # Changes made before this point belong to nobody's statement (or to the outer one)
+        get_family_graph(self.kb_file)
+        if self.recording:
+            self._outer.append((self.pending_added, self.pending_removed))
+        self.pending_added = set()
+        self.pending_removed = set()
+        self.recording = True
+
+    def end(self, statement: str, kind: str = "chat", **links: Any) -> Optional[Dict[str, Any]]:
+        """Store the net fact changes since begin() under a new statement id.
+
+        `links` ties the record to earlier ones: retracts=id, reverts=[ids] or reapplies=id.
+        """
+        added, removed = self.stop()
+        return self.store(statement, added, removed, kind, **links)
+
+    def store(self, statement: str, added: Set[str], removed: Set[str], kind: str = "chat", **links: Any) -> Optional[Dict[str, Any]]:
+        """Store fact changes returned by stop() under a new statement id, e.g. once they are written."""
+        if not added and not removed and not links:
+            return None
+
+        self.last_id += 1
+        record = {
+            "id": self.last_id,
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "kind": kind,
+            "statement": statement,
+            "added": sorted(added),
+            "removed": sorted(removed),
+        }
+        record.update(links)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        self._index(record)
+        return record
+
+    def discard(self):
+        """Stop recording without storing a record, e.g. when the statement's write failed."""
+        self.stop()
+
+    def stop(self) -> Tuple[Set[str], Set[str]]:
+        """Close the innermost recording and return its (added, removed) facts without storing them."""
+        # Pick up whatever the statement wrote to the file
+        get_family_graph(self.kb_file)
+        added, removed = self.pending_added, self.pending_removed
+        if self._outer:
+            self.pending_added, self.pending_removed = self._outer.pop()
+        else:
+            self.recording = False
+            self.pending_added, self.pending_removed = set(), set()
+        return added, removed
+
+    # FamilyGraph listener interface; a fact added and removed within one statement cancels out
+    def fact_added(self, fact: str):
+        if not self.recording:
+            return
+        if fact in self.pending_removed:
+            self.pending_removed.discard(fact)
+        else:
+            self.pending_added.add(fact)
+
+    def fact_removed(self, fact: str):
+        if not self.recording:
+            return
+        if fact in self.pending_added:
+            self.pending_added.discard(fact)
+        else:
+            self.pending_removed.add(fact)
+
+    def statement(self, statement_id: int) -> Optional[Dict[str, Any]]:
+        """Return the record of a statement."""
+        return self.records.get(statement_id)
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Return every record in order, with counts instead of fact lists."""
+        return [
+            {
+                "id": record["id"],
+                "time": record["time"],
+                "kind": record["kind"],
+                "statement": record["statement"],
+                "added": len(record["added"]),
+                "removed": len(record["removed"]),
+                "retracted": record["id"] in self.retracted,
+                "in_effect": record["id"] in self.applied,
+            }
+            for record in sorted(self.records.values(), key=lambda r: r["id"])
+        ]
+
+    def producers(self, fact: str) -> Dict[str, List[int]]:
+        """Return the statements that added and removed a fact."""
+        fact = fact.strip()
+        return {"added_by": list(self.added_by.get(fact, [])), "removed_by": list(self.removed_by.get(fact, []))}
+
+    def retraction_for(self, statement_id: int) -> Tuple[List[str], List[str]]:
+        """Return (facts to remove, facts to restore) that reverse a statement's effects.
+
+        A fact is only removed if it is still in the knowledge base and no other statement
+        in effect also added it; removed facts come back unless something re-added them.
+        """
+        record = self.records.get(statement_id)
+        if record is None or statement_id in self.retracted or statement_id not in self.applied:
+            return [], []
+        remove = []
+        for fact in record["added"]:
+            others = [other for other in self.added_by.get(fact, [])
+                      if other != statement_id and other in self.applied and other not in self.retracted]
+            if fact in self.graph.facts and not others:
+                remove.append(fact)
+        restore = [fact for fact in record["removed"] if fact not in self.graph.facts]
+        return remove, restore
+
+# Provenance logs per knowledge base file
+_logs: Dict[str, ProvenanceLog] = {}
+
+def get_provenance_log(kb_file: str) -> ProvenanceLog:
+    """Return the provenance log of a session's knowledge base."""
+    graph = get_family_graph(kb_file)
+    provenance = _logs.get(kb_file)
+    if provenance is None:
+        provenance = ProvenanceLog(kb_file, graph)
+        graph.add_listener(provenance)
+        _logs[kb_file] = provenance
+    return provenance
+
+# Chat commands that list or move between the session's versions; versions are numbered
+# by change, the provenance record id, not by chat message
+HISTORY_COMMAND_PATTERN = re.compile(r"^(undo|redo|changes|restore to change (\d+))[.!]?$", re.IGNORECASE)
+
+def apply_change(kb_file: str, remove: List[str], restore: List[str], statement: str, kind: str, **links: Any) -> str:
+    """Write a version change to the knowledge base and journal it, linked to the records it acts on.
+
+    Nothing is journaled if the write fails, so the stacks only move when the knowledge base did.
+    """
+    from fact_manager import FactManager
+    provenance = get_provenance_log(kb_file)
+    provenance.begin()
+    try:
+        result = FactManager().retract_facts(remove, restore)
+    except Exception:
+        provenance.discard()
+        raise
+    if result.startswith("Error"):
+        provenance.discard()
+    else:
+        provenance.end(statement, kind=kind, **links)
+    return result
+
+def undo_statements(kb_file: str, statement_ids: List[int]) -> str:
+    """Reverse the newest statements in effect, newest first, with one knowledge base write."""
+    provenance = get_provenance_log(kb_file)
+    # Newer statements are reverted first, so older ones decide each fact's final state
+    present: Dict[str, bool] = {}
+    for statement_id in statement_ids:
+        record = provenance.records[statement_id]
+        for fact in record["added"]:
+            present[fact] = False
+        for fact in record["removed"]:
+            present[fact] = True
+    remove = [fact for fact, keep in present.items() if not keep and fact in provenance.graph.facts]
+    restore = [fact for fact, keep in present.items() if keep and fact not in provenance.graph.facts]
+    return apply_change(kb_file, remove, restore, f"Undo {', '.join(str(i) for i in statement_ids)}",
+                        "undo", reverts=list(statement_ids))
+
+def redo_statement(kb_file: str, statement_id: int) -> str:
+    """Apply an undone statement's changes again."""
+    provenance = get_provenance_log(kb_file)
+    record = provenance.records[statement_id]
+    remove = [fact for fact in record["removed"] if fact in provenance.graph.facts]
+    restore = [fact for fact in record["added"] if fact not in provenance.graph.facts]
+    return apply_change(kb_file, remove, restore, f"Redo {statement_id}", "redo", reapplies=statement_id)
+
+def describe_changes(provenance: ProvenanceLog) -> str:
+    """List the session's changes by number, as 'restore to change N' expects them."""
+    if not provenance.records:
+        return "Nothing has changed yet."
+    lines = ["Changes so far:"]
+    for record in provenance.history():
+        # Undo and redo records only move other changes, so they have no state of their own
+        state = ""
+        if record["retracted"]:
+            state = " (retracted)"
+        elif not record["in_effect"] and record["kind"] not in ("undo", "redo"):
+            state = " (undone)"
+        lines.append(f"{record['id']}. {record['statement']}{state}")
+    return '\n'.join(lines)
+
+def handle_history_command(command: str, kb_file: str) -> str:
+    """Run an undo, redo, changes or 'restore to change N' chat command and describe the result."""
+    match = HISTORY_COMMAND_PATTERN.match(command.strip())
+    if not match:
+        return f"Unrecognized command: {command}"
+    provenance = get_provenance_log(kb_file)
+    action = match.group(1).lower()
+
+    if action == "undo":
+        if not provenance.applied:
+            return "There is nothing to undo."
+        statement_id = provenance.applied[-1]
+        result = undo_statements(kb_file, [statement_id])
+        if result.startswith("Error"):
+            return result
+        return f"Undid change {statement_id}: {provenance.records[statement_id]['statement']}"
+
+    if action == "redo":
+        if not provenance.undone:
+            return "There is nothing to redo."
+        statement_id = provenance.undone[-1]
+        result = redo_statement(kb_file, statement_id)
+        if result.startswith("Error"):
+            return result
+        return f"Redid change {statement_id}: {provenance.records[statement_id]['statement']}"
+
+    if action == "changes":
+        return describe_changes(provenance)
+
+    target = int(match.group(2))
+    if target > provenance.last_id:
+        return f"There is no change {target} yet; the latest is change {provenance.last_id}."
+    undo_ids = [statement_id for statement_id in reversed(provenance.applied) if statement_id > target]
+    if undo_ids:
+        result = undo_statements(kb_file, undo_ids)
+        if result.startswith("Error"):
+            return result
+        return f"Restored the knowledge base to change {target} by undoing {len(undo_ids)} change(s)."
+    redone = 0
+    while provenance.undone and provenance.undone[-1] <= target:
+        result = redo_statement(kb_file, provenance.undone[-1])
+        if result.startswith("Error"):
+            return result
+        redone += 1
+    if redone:
+        return f"Restored the knowledge base to change {target} by redoing {redone} change(s)."
+    return f"The knowledge base is already at change {target}."
@@ -0,0 +1,109 @@
+from collections import OrderedDict
+from typing import Dict, List, Set, Tuple, Optional, Any
+from family_graph import FamilyGraph, get_family_graph, parse_fact
+from dependency_graph import get_dependency_graph
+from datalog import parse_query, DatalogSyntaxError
+
+# Answers kept per knowledge base file; the least recently used go first
+MAX_CACHED_QUERIES = 2048
+
+def query_footprint(query: str) -> Optional[Tuple[Set[str], Set[str]]]:
+    """Return the predicates a query reads and the people it names, or None if it cannot be analysed."""
+    try:
+        goals = parse_query(query.strip().rstrip('.'))
+    except DatalogSyntaxError:
+        return None
+    predicates = set()
+    people = set()
+    stack = list(goals)
+    while stack:
+        goal = stack.pop()
+        if goal[0] == "rel":
+            predicates.add(goal[1])
+            people.update(value for kind, value in goal[2] if kind == "const")
+        elif goal[0] == "not":
+            stack.extend(goal[1])
+        else:
+            people.update(value for kind, value in (goal[1], goal[2]) if kind == "const")
+    return predicates, people
+
+class QueryCache:
+    """Query results for one knowledge base, dropped only when a fact change can alter them.
+
+    A changed fact affects the predicates the dependency graph derives from its
+    predicate, and only for people close enough to its arguments for a rule to connect
+    them (the same neighborhood the validator uses). Entries naming nobody, like
+    sibling_of(X, Y), are dropped whenever one of their predicates is affected.
+    """
+
+    def __init__(self, graph: FamilyGraph):
+        self.graph = graph
+        # Query -> (results, predicates read, ids of the people named)
+        self.entries: "OrderedDict[str, Tuple[List[Dict[str, Any]], Set[str], Set[int]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+    def get(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached results of a query, if any."""
+        entry = self.entries.get(query)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(query)
+        self.hits += 1
+        return list(entry[0])
+
+    def put(self, query: str, results: List[Dict[str, Any]]):
+        """Remember the results of a query the cache can track; only pass results of queries that ran."""
+        footprint = query_footprint(query)
+        if footprint is None:
+            return
+        # Unknown people are not interned: any fact that could change the answer for them
+        # also touches a named person already in the tree, or the entry names nobody known
+        named = self.graph.names.ids_of(footprint[1])
+        self.entries[query] = (list(results), footprint[0], named)
+        self.entries.move_to_end(query)
+        while len(self.entries) > MAX_CACHED_QUERIES:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, fact: str):
+        """Drop the entries a changed fact can affect."""
+        parsed = parse_fact(fact)
+        if not parsed or not self.entries:
+            return
+        predicates = get_dependency_graph().affected(parsed[0])
+        candidates = [(query, named) for query, (_, used, named) in self.entries.items() if used & predicates]
+        if not candidates:
+            return
+        people = set()
+        if any(named for _, named in candidates):
+            people = self.graph.neighborhood_ids(self.graph.names.ids_of(parsed[1]))
+        for query, named in candidates:
+            if not named or named & people:
+                del self.entries[query]
+                self.invalidated += 1
+
+    def clear(self):
+        """Drop every entry."""
+        self.entries.clear()
+
+    # FamilyGraph listener interface
+    def fact_added(self, fact: str):
+        self.invalidate(fact)
+
+    def fact_removed(self, fact: str):
+        self.invalidate(fact)
+
+# Query caches per knowledge base file
+_caches: Dict[str, QueryCache] = {}
+
+def get_query_cache(kb_file: str) -> QueryCache:
+    """Return the query cache of a knowledge base file, with stale entries already dropped."""
+    graph = get_family_graph(kb_file)
+    cache = _caches.get(kb_file)
+    if cache is None:
+        cache = QueryCache(graph)
+        graph.add_listener(cache)
+        _caches[kb_file] = cache
+    return cache
@@ -1,11 +1,23 @@
 import re
-from typing import List, Tuple
-from pyswip import Prolog
-from utils import to_prolog_name, validate_prolog_file, safe_prolog_query
+from typing import List, Tuple, Union
+from utils import to_prolog_name, validate_prolog_file, safe_prolog_query, prolog_query, get_prolog_engine
+from reachability import get_reachability_index
+from query_cache import get_query_cache
+from statement_ir import Question
+from tracing import traced
+from logs import get_logger
 
 # Global variable for current knowledge base file
 current_kb_file = "relationships.pl"
 
+log = get_logger("query_handler")
+
+# Answer ancestor/descendant questions from the bitset index instead of Prolog
+use_reachability_index = True
+
+# Reuse query results until a fact change that can affect them
+use_query_cache = True
+
 class QueryHandler:
     def __init__(self):
         pass
@@ -20,7 +32,24 @@ class QueryHandler:
         # Execute the query
         return self._execute_query(query, question)
     
-    def _parse_question_to_query(self, question: str, question_patterns: List[Tuple]) -> str:
+    def _query(self, prolog, query: str):
+        """Run a query, answering repeated ones from the knowledge base's query cache."""
+        if not use_query_cache:
+            return safe_prolog_query(prolog, query)
+        cache = get_query_cache(current_kb_file)
+        results = cache.get(query)
+        if results is None:
+            try:
+                results = prolog_query(prolog, query)
+            except Exception as e:
+                # A failed query is answered as empty but not cached, so it is retried
+                log.error("prolog query failed", query=query, error=e)
+                return []
+            cache.put(query, results)
+        return results
+    
+    @traced("parse")
+    def _parse_question_to_query(self, question: str, question_patterns: List[Tuple]) -> Union[str, Question]:
         """Parse a question into a Prolog query."""
         for _, pattern, func in question_patterns:
             match = re.fullmatch(pattern, question.strip())
@@ -57,30 +86,34 @@ class QueryHandler:
         
         return ""
     
-    def _execute_query(self, query: str, original_question: str) -> str:
+    @traced("query")
+    def _execute_query(self, query: Union[str, Question], original_question: str) -> str:
         """Execute a Prolog query and return the result."""
         try:
             # Validate the Prolog file before querying
             if not validate_prolog_file(current_kb_file):
                 return f"That's impossible! The knowledge base file is invalid or corrupted."
             
-            prolog = Prolog()
-            prolog.consult(current_kb_file)
+            prolog = get_prolog_engine(current_kb_file)
+            
+            # Special handling for brother/sister relationship checks
+            if isinstance(query, Question) and query.kind == "brother_sister":
+                return self._handle_brother_sister_relationship_check(prolog, query, original_question)
             
             # Special handling for sibling queries to determine if they are full or half siblings
             if "sibling_of(" in query and "Are" in original_question and "siblings" in original_question:
                 return self._handle_sibling_query(prolog, query, original_question)
             
-            # Special handling for brother/sister relationship checks
-            if query.startswith("check_brother_sister_relationship:"):
-                return self._handle_brother_sister_relationship_check(prolog, query, original_question)
+            # Special handling for ancestor/descendant listings
+            if query.startswith("ancestor_of(") and "X" in query:
+                return self._handle_lineage_query(prolog, query, original_question)
             
             # Special handling for relative queries to enable inference
             if "relative(" in query:
                 return self._handle_relative_query(prolog, query, original_question)
             
             # Execute the query
-            results = safe_prolog_query(prolog, query)
+            results = self._query(prolog, query)
             
             if results:
                 # Handle different types of queries
@@ -141,7 +174,7 @@ class QueryHandler:
                     return f"That's impossible! {person_name.capitalize()} has no {relationship_type}."
                     
         except Exception as e:
-            print(f"Error executing query '{query}': {e}")
+            log.error("error executing query", query=query, error=e)
             return f"Error executing query: {str(e)}"
     
     def _extract_person_name_from_query(self, query: str) -> str:
@@ -172,21 +205,48 @@ class QueryHandler:
         person2 = match.group(2)
         
         # Check if they are siblings at all
-        sibling_results = safe_prolog_query(prolog, f"sibling_of({person1}, {person2})")
+        sibling_results = self._query(prolog, f"sibling_of({person1}, {person2})")
         if not sibling_results:
             return "No."
         
         # Check if they are half-siblings (check both directions)
-        half_sibling_results = safe_prolog_query(prolog, f"half_sibling_of({person1}, {person2})")
+        half_sibling_results = self._query(prolog, f"half_sibling_of({person1}, {person2})")
         if not half_sibling_results:
             # Check the reverse direction
-            half_sibling_results = safe_prolog_query(prolog, f"half_sibling_of({person2}, {person1})")
+            half_sibling_results = self._query(prolog, f"half_sibling_of({person2}, {person1})")
         
         if half_sibling_results:
             return f"Yes, {person1.capitalize()} and {person2.capitalize()} are siblings, but they are only half-siblings."
         else:
             return f"Yes, {person1.capitalize()} and {person2.capitalize()} are siblings, and they are full siblings."
     
+    def _handle_lineage_query(self, prolog, query: str, original_question: str) -> str:
+        """Handle "Who are the ancestors/descendants of X?" questions."""
+        match = re.search(r'ancestor_of\(([^,]+),\s*([^)]+)\)', query)
+        if not match:
+            return "That's impossible! Could not parse ancestor query."
+        
+        if match.group(1) == "X":
+            person = match.group(2)
+            label = "ancestors"
+        else:
+            person = match.group(1)
+            label = "descendants"
+        
+        if use_reachability_index:
+            index = get_reachability_index(current_kb_file)
+            if label == "ancestors":
+                people = index.ancestors_of(person)
+            else:
+                people = index.descendants_of(person)
+        else:
+            # The Prolog rule only follows three generations
+            people = set(str(r["X"]) for r in self._query(prolog, query) if "X" in r)
+        
+        if not people:
+            return f"That's impossible! {person.capitalize()} has no {label}."
+        return f"The {label} of {person.capitalize()} are {', '.join(sorted(people))}."
+    
     def _get_relationship_type_from_query(self, query: str) -> str:
         """Get the relationship type from a Prolog query."""
         if "sibling_of" in query:
@@ -230,33 +290,30 @@ class QueryHandler:
         else:
             return "relationship"
     
-    def _handle_brother_sister_relationship_check(self, prolog, query: str, original_question: str) -> str:
+    def _handle_brother_sister_relationship_check(self, prolog, question: Question, original_question: str) -> str:
         """Handle brother/sister relationship checks by verifying gender and sibling relationships."""
         try:
-            # Parse the query: check_brother_sister_relationship:person1:relationship_type:person2
-            parts = query.split(":")
-            person1 = parts[1]
-            relationship_type = parts[2]  # "brother" or "sister"
-            person2 = parts[3]
+            # relationship_type is "brother" or "sister"
+            person1, relationship_type, person2 = question.args
             
             # First, check if person1 has a gender assigned
-            gender_results = safe_prolog_query(prolog, f"male({person1})")
+            gender_results = self._query(prolog, f"male({person1})")
             is_male = bool(gender_results)
             
             if not is_male:
-                gender_results = safe_prolog_query(prolog, f"female({person1})")
+                gender_results = self._query(prolog, f"female({person1})")
                 is_female = bool(gender_results)
                 
                 if not is_female:
                     return f"That's impossible! {person1.capitalize()} does not have an assigned gender yet."
             
             # Check if they are siblings
-            sibling_results = safe_prolog_query(prolog, f"sibling_of({person1}, {person2})")
+            sibling_results = self._query(prolog, f"sibling_of({person1}, {person2})")
             if not sibling_results:
                 return "No."
             
             # Check if they are half-siblings
-            half_sibling_results = safe_prolog_query(prolog, f"half_sibling_of({person1}, {person2})")
+            half_sibling_results = self._query(prolog, f"half_sibling_of({person1}, {person2})")
             
             # Determine the correct response based on gender and relationship type
             if relationship_type == "brother":
@@ -279,7 +336,7 @@ class QueryHandler:
                 return "No."
                 
         except Exception as e:
-            print(f"Error checking brother/sister relationship: {e}")
+            log.error("error checking brother/sister relationship", error=e)
             return f"Error checking relationship: {str(e)}"
     
     def _handle_relative_query(self, prolog, query: str, original_question: str) -> str:
@@ -294,7 +351,7 @@ class QueryHandler:
             person2 = match.group(2)
             
             # Check if they are relatives through any relationship
-            relative_results = safe_prolog_query(prolog, f"relative({person1}, {person2})")
+            relative_results = self._query(prolog, f"relative({person1}, {person2})")
             if relative_results:
                 return "Yes."
             
@@ -306,7 +363,7 @@ class QueryHandler:
             return "No."
             
         except Exception as e:
-            print(f"Error handling relative query: {e}")
+            log.error("error handling relative query", error=e)
             return f"Error checking relationship: {str(e)}"
     
     def _try_inference(self, prolog, query: str, original_question: str) -> str:
@@ -331,7 +388,7 @@ class QueryHandler:
             return None
             
         except Exception as e:
-            print(f"Error trying inference: {e}")
+            log.error("error trying inference", error=e)
             return None
     
     def _try_sibling_inference(self, prolog, query: str, original_question: str) -> str:
@@ -346,13 +403,13 @@ class QueryHandler:
             person2 = match.group(2)
             
             # Check if they share any parent
-            shared_parent_results = safe_prolog_query(prolog, f"parent_of(X, {person1}), parent_of(X, {person2})")
+            shared_parent_results = self._query(prolog, f"parent_of(X, {person1}), parent_of(X, {person2})")
             if shared_parent_results:
                 # Check if they are half-siblings (check both directions)
-                half_sibling_results = safe_prolog_query(prolog, f"half_sibling_of({person1}, {person2})")
+                half_sibling_results = self._query(prolog, f"half_sibling_of({person1}, {person2})")
                 if not half_sibling_results:
                     # Check the reverse direction
-                    half_sibling_results = safe_prolog_query(prolog, f"half_sibling_of({person2}, {person1})")
+                    half_sibling_results = self._query(prolog, f"half_sibling_of({person2}, {person1})")
                 if half_sibling_results:
                     return f"Yes, {person1.capitalize()} and {person2.capitalize()} are siblings, but they are only half-siblings."
                 else:
@@ -361,7 +418,7 @@ class QueryHandler:
             return None
             
         except Exception as e:
-            print(f"Error trying sibling inference: {e}")
+            log.error("error trying sibling inference", error=e)
             return None
     
     def _try_parent_inference(self, prolog, query: str, original_question: str) -> str:
@@ -384,14 +441,14 @@ class QueryHandler:
             child = match.group(2)
             
             # Check if parent is actually a parent through any relationship
-            parent_results = safe_prolog_query(prolog, f"parent_of({parent}, {child})")
+            parent_results = self._query(prolog, f"parent_of({parent}, {child})")
             if parent_results:
                 return "Yes."
             
             return None
             
         except Exception as e:
-            print(f"Error trying parent inference: {e}")
+            log.error("error trying parent inference", error=e)
             return None
     
     def _try_aunt_uncle_inference(self, prolog, query: str, original_question: str) -> str:
@@ -412,18 +469,18 @@ class QueryHandler:
             niece_nephew = match.group(2)
             
             # Check if aunt/uncle is sibling of niece/nephew's parent
-            parent_results = safe_prolog_query(prolog, f"parent_of(X, {niece_nephew})")
+            parent_results = self._query(prolog, f"parent_of(X, {niece_nephew})")
             if parent_results:
                 for parent_result in parent_results:
                     parent = parent_result["X"]
-                    sibling_results = safe_prolog_query(prolog, f"sibling_of({aunt_uncle}, {parent})")
+                    sibling_results = self._query(prolog, f"sibling_of({aunt_uncle}, {parent})")
                     if sibling_results:
                         return "Yes."
             
             return None
             
         except Exception as e:
-            print(f"Error trying aunt/uncle inference: {e}")
+            log.error("error trying aunt/uncle inference", error=e)
             return None
     
     def _try_cousin_inference(self, prolog, query: str, original_question: str) -> str:
@@ -438,8 +495,8 @@ class QueryHandler:
             person2 = match.group(2)
             
             # Check if their parents are siblings
-            parent1_results = safe_prolog_query(prolog, f"parent_of(X, {person1})")
-            parent2_results = safe_prolog_query(prolog, f"parent_of(Y, {person2})")
+            parent1_results = self._query(prolog, f"parent_of(X, {person1})")
+            parent2_results = self._query(prolog, f"parent_of(Y, {person2})")
             
             if parent1_results and parent2_results:
                 for parent1_result in parent1_results:
@@ -447,14 +504,14 @@ class QueryHandler:
                     for parent2_result in parent2_results:
                         parent2 = parent2_result["Y"]
                         if parent1 != parent2:  # Not the same parent
-                            sibling_results = safe_prolog_query(prolog, f"sibling_of({parent1}, {parent2})")
+                            sibling_results = self._query(prolog, f"sibling_of({parent1}, {parent2})")
                             if sibling_results:
                                 return "Yes."
             
             return None
             
         except Exception as e:
-            print(f"Error trying cousin inference: {e}")
+            log.error("error trying cousin inference", error=e)
             return None
     
     def _try_relative_inference(self, prolog, person1: str, person2: str) -> str:
@@ -465,58 +522,58 @@ class QueryHandler:
                 return "Yes."
             
             # Check if they are siblings
-            sibling_results = safe_prolog_query(prolog, f"sibling_of({person1}, {person2})")
+            sibling_results = self._query(prolog, f"sibling_of({person1}, {person2})")
             if sibling_results:
                 return "Yes."
             
             # Check if they are parent-child
-            parent_results = safe_prolog_query(prolog, f"parent_of({person1}, {person2})")
+            parent_results = self._query(prolog, f"parent_of({person1}, {person2})")
             if parent_results:
                 return "Yes."
             
-            parent_results = safe_prolog_query(prolog, f"parent_of({person2}, {person1})")
+            parent_results = self._query(prolog, f"parent_of({person2}, {person1})")
             if parent_results:
                 return "Yes."
             
             # Check if they are aunt/uncle-niece/nephew
-            aunt_uncle_results = safe_prolog_query(prolog, f"aunt_of({person1}, {person2})")
+            aunt_uncle_results = self._query(prolog, f"aunt_of({person1}, {person2})")
             if aunt_uncle_results:
                 return "Yes."
             
-            aunt_uncle_results = safe_prolog_query(prolog, f"uncle_of({person1}, {person2})")
+            aunt_uncle_results = self._query(prolog, f"uncle_of({person1}, {person2})")
             if aunt_uncle_results:
                 return "Yes."
             
-            aunt_uncle_results = safe_prolog_query(prolog, f"aunt_of({person2}, {person1})")
+            aunt_uncle_results = self._query(prolog, f"aunt_of({person2}, {person1})")
             if aunt_uncle_results:
                 return "Yes."
             
-            aunt_uncle_results = safe_prolog_query(prolog, f"uncle_of({person2}, {person1})")
+            aunt_uncle_results = self._query(prolog, f"uncle_of({person2}, {person1})")
             if aunt_uncle_results:
                 return "Yes."
             
             # Check if they are cousins
-            cousin_results = safe_prolog_query(prolog, f"cousin_of({person1}, {person2})")
+            cousin_results = self._query(prolog, f"cousin_of({person1}, {person2})")
             if cousin_results:
                 return "Yes."
             
             # Check if they are grandparent-grandchild
-            grandparent_results = safe_prolog_query(prolog, f"grandparent_of({person1}, {person2})")
+            grandparent_results = self._query(prolog, f"grandparent_of({person1}, {person2})")
             if grandparent_results:
                 return "Yes."
             
-            grandparent_results = safe_prolog_query(prolog, f"grandparent_of({person2}, {person1})")
+            grandparent_results = self._query(prolog, f"grandparent_of({person2}, {person1})")
             if grandparent_results:
                 return "Yes."
             
             # Check if they share any parent (siblings)
-            shared_parent_results = safe_prolog_query(prolog, f"parent_of(X, {person1}), parent_of(X, {person2})")
+            shared_parent_results = self._query(prolog, f"parent_of(X, {person1}), parent_of(X, {person2})")
             if shared_parent_results:
                 return "Yes."
             
             # Check if their parents are siblings (cousins)
-            parent1_results = safe_prolog_query(prolog, f"parent_of(X, {person1})")
-            parent2_results = safe_prolog_query(prolog, f"parent_of(Y, {person2})")
+            parent1_results = self._query(prolog, f"parent_of(X, {person1})")
+            parent2_results = self._query(prolog, f"parent_of(Y, {person2})")
             
             if parent1_results and parent2_results:
                 for parent1_result in parent1_results:
@@ -524,12 +581,12 @@ class QueryHandler:
                     for parent2_result in parent2_results:
                         parent2 = parent2_result["Y"]
                         if parent1 != parent2:  # Not the same parent
-                            sibling_results = safe_prolog_query(prolog, f"sibling_of({parent1}, {parent2})")
+                            sibling_results = self._query(prolog, f"sibling_of({parent1}, {parent2})")
                             if sibling_results:
                                 return "Yes."
             
             return None
             
         except Exception as e:
-            print(f"Error trying relative inference: {e}")
+            log.error("error trying relative inference", error=e)
             return None 
\ No newline at end of file
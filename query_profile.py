@@ -0,0 +1,109 @@
+import re
+import sys
+from collections import deque
+from typing import Dict, List, Any, Deque
+
+# Profile every query that goes through safe_prolog_query
+use_query_profiler = True
+
+# Latencies kept per template for percentiles; older samples drop off
+MAX_SAMPLES = 1000
+
+# Atoms in argument position are people; variables (capitalized) and predicates stay
+ARGUMENT_ATOM = re.compile(r"(?<=[(,])(\s*)[a-z][a-z0-9_]*(?=\s*[,)])")
+
+def query_template(query: str) -> str:
+    """Normalize a query by replacing the people it names: parent_of(X, bob) -> parent_of(X, <name>)."""
+    return ARGUMENT_ATOM.sub(r"\1<name>", query.strip().rstrip('.'))
+
+def _percentile(ordered: List[float], p: float) -> float:
+    """Return the p-th percentile of sorted values, interpolating between the closest two."""
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+class TemplateStats:
+    """Calls, latency and result rows of one query template."""
+
+    def __init__(self, template: str):
+        self.template = template
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.max_rows = 0
+        self.samples: Deque[float] = deque(maxlen=MAX_SAMPLES)
+        # Function that called safe_prolog_query -> calls, to tell validator branches apart
+        self.callers: Dict[str, int] = {}
+
+    def summary(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        return {
+            "template": self.template,
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.seconds * 1000, 3),
+            "mean_ms": round(self.seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "p50_ms": round(_percentile(ordered, 50) * 1000, 3),
+            "p95_ms": round(_percentile(ordered, 95) * 1000, 3),
+            "p99_ms": round(_percentile(ordered, 99) * 1000, 3),
+            "rows": self.rows,
+            "mean_rows": round(self.rows / self.calls, 2) if self.calls else 0.0,
+            "max_rows": self.max_rows,
+            "callers": dict(sorted(self.callers.items(), key=lambda item: -item[1])),
+        }
+
+class QueryProfiler:
+    """Aggregates every profiled Prolog query by template, for the whole process."""
+
+    # Orders accepted by top(), mapped to the summary field they sort on
+    SORT_KEYS = {"total": "total_ms", "calls": "calls", "mean": "mean_ms", "p95": "p95_ms", "rows": "rows"}
+
+    def __init__(self):
+        self.templates: Dict[str, TemplateStats] = {}
+
+    def record(self, query: str, seconds: float, rows: int, caller: str = "", error: bool = False):
+        """Add one query call."""
+        template = query_template(query)
+        stats = self.templates.get(template)
+        if stats is None:
+            stats = TemplateStats(template)
+            self.templates[template] = stats
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.rows += rows
+        stats.max_rows = max(stats.max_rows, rows)
+        stats.samples.append(seconds)
+        if error:
+            stats.errors += 1
+        if caller:
+            stats.callers[caller] = stats.callers.get(caller, 0) + 1
+
+    def top(self, limit: int = 20, sort: str = "total") -> List[Dict[str, Any]]:
+        """Return the summaries of the most expensive templates, by the given order."""
+        key = self.SORT_KEYS[sort]
+        summaries = [stats.summary() for stats in self.templates.values()]
+        summaries.sort(key=lambda summary: summary[key], reverse=True)
+        return summaries[:limit]
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        self.templates.clear()
+
+_profiler = QueryProfiler()
+
+def get_query_profiler() -> QueryProfiler:
+    """Return the process-wide query profiler."""
+    return _profiler
+
+def caller_name(depth: int = 2) -> str:
+    """Return "module.function" of the frame `depth` levels above the caller of this function."""
+    try:
+        frame = sys._getframe(depth)
+    except ValueError:
+        return ""
+    module = frame.f_globals.get("__name__", "")
+    return f"{module}.{frame.f_code.co_name}"
@@ -0,0 +1,138 @@
+from typing import Dict, List, Optional, Tuple
+from family_graph import FamilyGraph, get_family_graph, parse_fact
+from name_table import NameTable
+
+class ReachabilityIndex:
+    """Ancestor and descendant sets for every person, stored as integer bitsets.
+
+    Bit `id` stands for the person with that id in the session's name table, so the
+    ancestors of someone are one Python int. Adding parent_of(P, C) ORs P and P's ancestors into
+    C and every descendant of C (and the mirror image for descendants), which keeps
+    lookups, intersections and cycle checks to a handful of integer operations.
+    """
+
+    def __init__(self, names: NameTable):
+        self.names = names
+        self.ancestors: List[int] = []
+        self.descendants: List[int] = []
+        self.cycles: List[str] = []
+        self.dirty = False
+
+    def _id(self, person: str) -> int:
+        """Return the id of a person, making room for it in the closures if needed."""
+        person_id = self.names.intern(person)
+        missing = person_id + 1 - len(self.ancestors)
+        if missing > 0:
+            self.ancestors.extend([0] * missing)
+            self.descendants.extend([0] * missing)
+        return person_id
+
+    def _known(self, person: str) -> Optional[int]:
+        """Return the id of a person the closures cover, or None."""
+        person_id = self.names.id_of(person)
+        if person_id is None or person_id >= len(self.ancestors):
+            return None
+        return person_id
+
+    def _members(self, bits: int) -> List[str]:
+        """Turn a bitset back into the names it contains."""
+        return [self.names.atom(person_id) for person_id in self._ids_in(bits)]
+
+    def would_create_cycle(self, parent: str, child: str) -> bool:
+        """Check whether parent_of(parent, child) would make someone their own ancestor."""
+        if parent == child:
+            return True
+        parent_id = self._known(parent)
+        child_id = self._known(child)
+        if parent_id is None or child_id is None:
+            return False
+        return bool(self.ancestors[parent_id] >> child_id & 1)
+
+    def add_parent(self, parent: str, child: str, fact: str = ""):
+        """Record parent_of(parent, child) and propagate it through both closures."""
+        if self.would_create_cycle(parent, child):
+            self.cycles.append(fact or f"parent_of({parent}, {child}).")
+        parent_id = self._id(parent)
+        child_id = self._id(child)
+
+        upward = self.ancestors[parent_id] | (1 << parent_id)
+        downward = self.descendants[child_id] | (1 << child_id)
+        for person_id in self._ids_in(downward):
+            self.ancestors[person_id] |= upward
+        for person_id in self._ids_in(upward):
+            self.descendants[person_id] |= downward
+
+    def _ids_in(self, bits: int) -> List[int]:
+        """Return the ids set in a bitset."""
+        ids = []
+        while bits:
+            low = bits & -bits
+            ids.append(low.bit_length() - 1)
+            bits ^= low
+        return ids
+
+    def ancestors_of(self, person: str) -> List[str]:
+        """Return everyone the person descends from."""
+        person_id = self._known(person)
+        if person_id is None:
+            return []
+        return self._members(self.ancestors[person_id])
+
+    def descendants_of(self, person: str) -> List[str]:
+        """Return everyone descending from the person."""
+        person_id = self._known(person)
+        if person_id is None:
+            return []
+        return self._members(self.descendants[person_id])
+
+    def ancestor_among(self, people: List[str]) -> Optional[Tuple[str, str]]:
+        """Return some (ancestor, descendant) pair within a set of people, or None.
+
+        One bitset of the whole set is built first, so this is one AND per person.
+        """
+        known = [(person, self._known(person)) for person in people]
+        known = [(person, person_id) for person, person_id in known if person_id is not None]
+        group = 0
+        for _, person_id in known:
+            group |= 1 << person_id
+        for person, person_id in known:
+            ancestors = self.ancestors[person_id] & group
+            if ancestors:
+                return self._members(ancestors)[0], person
+        return None
+
+    def fact_added(self, fact: str):
+        """Apply a new fact from the family graph."""
+        parsed = parse_fact(fact)
+        if parsed and parsed[0] == "parent_of" and len(parsed[1]) == 2:
+            self.add_parent(parsed[1][0], parsed[1][1], fact)
+
+    def fact_removed(self, fact: str):
+        """Closures cannot be shrunk edge by edge, so removals trigger a rebuild on next use."""
+        parsed = parse_fact(fact)
+        if parsed and parsed[0] == "parent_of":
+            self.dirty = True
+
+    def rebuild(self, graph: FamilyGraph):
+        """Recompute both closures from the facts in the graph; ids stay as they are."""
+        self.ancestors = []
+        self.descendants = []
+        self.cycles = []
+        self.dirty = False
+        for fact in sorted(graph.facts):
+            self.fact_added(fact)
+
+# Reachability indexes per knowledge base file
+_indexes: Dict[str, ReachabilityIndex] = {}
+
+def get_reachability_index(kb_file: str) -> ReachabilityIndex:
+    """Return the reachability index for a knowledge base file, in step with its family graph."""
+    graph = get_family_graph(kb_file)
+    index = _indexes.get(kb_file)
+    if index is None:
+        index = ReachabilityIndex(graph.names)
+        graph.add_listener(index)
+        _indexes[kb_file] = index
+    if index.dirty:
+        index.rebuild(graph)
+    return index
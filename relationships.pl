@@ -3,6 +3,7 @@
 :- discontiguous male/1.
 :- discontiguous female/1.
 :- discontiguous sibling_of/2.
+:- discontiguous sibling_group/2.
 :- discontiguous half_sibling_of/2.
 :- discontiguous brother_of/2.
 :- discontiguous sister_of/2.
@@ -42,6 +43,7 @@ daughter_of(Y, X) :- child_of(Y, X), female(Y).
 % Sibling Relationships
 % ========================================
 sibling_of(X, Y) :- parent_of(Z, X), parent_of(Z, Y), X \= Y, Z \= X, Z \= Y.
+sibling_of(X, Y) :- sibling_group(G, X), sibling_group(G, Y), X \= Y.
 brother_of(X, Y) :- sibling_of(X, Y), male(X).
 sister_of(X, Y) :- sibling_of(X, Y), female(X).
 
@@ -6,6 +6,7 @@ def write_correct_rules(f):
     f.write(":- discontiguous male/1.\n")
     f.write(":- discontiguous female/1.\n")
     f.write(":- discontiguous sibling_of/2.\n")
+    f.write(":- discontiguous sibling_group/2.\n")
     f.write(":- discontiguous half_sibling_of/2.\n")
     f.write(":- discontiguous brother_of/2.\n")
     f.write(":- discontiguous sister_of/2.\n")
@@ -46,6 +47,7 @@ def write_correct_rules(f):
     f.write("% Sibling Relationships\n")
     f.write("% ========================================\n")
     f.write("sibling_of(X, Y) :- parent_of(Z, X), parent_of(Z, Y), X \\= Y, Z \\= X, Z \\= Y.\n")
+    f.write("sibling_of(X, Y) :- sibling_group(G, X), sibling_group(G, Y), X \\= Y.\n")
     f.write("brother_of(X, Y) :- sibling_of(X, Y), male(X).\n")
     f.write("sister_of(X, Y) :- sibling_of(X, Y), female(X).\n")
     f.write("\n")
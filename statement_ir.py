@@ -0,0 +1,96 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple, Union
+from family_graph import parse_fact
+
+@dataclass(frozen=True, slots=True)
+class Fact:
+    """One knowledge base fact: Fact("parent_of", ("ann", "bob")) is parent_of(ann, bob)."""
+    predicate: str
+    args: Tuple[str, ...]
+
+    @classmethod
+    def parse(cls, line: str) -> Optional["Fact"]:
+        """Read a fact line such as "parent_of(ann, bob)."; None if it is not a plain fact."""
+        parsed = parse_fact(line.strip())
+        if not parsed:
+            return None
+        return cls(parsed[0], parsed[1])
+
+    @property
+    def line(self) -> str:
+        """The fact as it is written in the knowledge base."""
+        return f"{self.predicate}({', '.join(self.args)})."
+
+    def __str__(self) -> str:
+        return self.line
+
+def parse_facts(text: str) -> List[Fact]:
+    """Read the newline-separated facts a statement handler produced."""
+    facts = []
+    for line in text.split('\n'):
+        fact = Fact.parse(line)
+        if fact is not None:
+            facts.append(fact)
+    return facts
+
+def render_facts(facts: Iterable[Fact]) -> str:
+    """Write facts back as newline-separated fact lines."""
+    return '\n'.join(fact.line for fact in facts)
+
+def find_fact(facts: Iterable[Fact], *predicates: str) -> Optional[Fact]:
+    """Return the first fact with one of the given predicates."""
+    for fact in facts:
+        if fact.predicate in predicates:
+            return fact
+    return None
+
+def fact_people(facts: Iterable[Fact]) -> set:
+    """Return everyone the facts mention."""
+    people = set()
+    for fact in facts:
+        people.update(fact.args)
+    return people
+
+@dataclass(frozen=True, slots=True)
+class Question:
+    """A question that is answered by a dedicated check rather than one Prolog query.
+
+    `kind` names the check (e.g. "brother_sister") and `args` holds its prolog atoms.
+    """
+    kind: str
+    args: Tuple[str, ...]
+
+@dataclass(frozen=True, slots=True)
+class ValidationOutcome:
+    """What validation decided about a statement's facts.
+
+    `valid` facts can be written as they are. Otherwise `action` names what has to happen
+    first, e.g. "ask_full_sibling_clarification" with `args` ("ann", "bob"), and is empty
+    for a plain rejection explained by `message`. A valid outcome may carry a `message`
+    noting why checks were skipped ("file_invalid", "consultation_error", ...).
+    """
+    valid: bool
+    action: str = ""
+    args: Tuple[str, ...] = ()
+    message: str = ""
+
+    @classmethod
+    def ok(cls, note: str = "") -> "ValidationOutcome":
+        return cls(True, message=note)
+
+    @classmethod
+    def rejected(cls, message: str) -> "ValidationOutcome":
+        return cls(False, message=message)
+
+    @classmethod
+    def needs(cls, action: str, *args: str) -> "ValidationOutcome":
+        return cls(False, action=action, args=tuple(args))
+
+    @classmethod
+    def of(cls, check_result: Union[str, "ValidationOutcome"]) -> Optional["ValidationOutcome"]:
+        """Turn a check's result (an outcome, a rejection message or "") into an outcome or None."""
+        if isinstance(check_result, ValidationOutcome):
+            return check_result
+        if check_result:
+            return cls.rejected(check_result)
+        return None
@@ -0,0 +1,128 @@
+import functools
+import json
+import os
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+
+# Per-session trace log, next to the knowledge base like provenance.jsonl
+TRACE_FILE = "trace.jsonl"
+
+# Spans recorded per trace; counts and durations keep adding up past it
+MAX_SPANS = 500
+
+# Request ids accepted from clients (X-Request-ID); anything else gets a generated one
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+class Trace:
+    """Timings of one chat turn: total seconds and calls per stage, plus the span tree.
+
+    Stages are named after what they time ("parse", "validate", "validate_file",
+    "consult", "prolog_query", "write", ...). A stage nested in another one is counted
+    in both, so the stage totals are not meant to add up to the turn.
+    """
+
+    def __init__(self, name: str, request_id: str = ""):
+        self.name = name
+        # Ties the log lines written during the turn to it
+        self.request_id = request_id if REQUEST_ID_PATTERN.match(request_id) else uuid.uuid4().hex[:12]
+        self.started_at = datetime.now().isoformat(timespec="milliseconds")
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self.depth = 0
+
+    def add(self, stage: str, seconds: float, offset: float, depth: int, detail: str = ""):
+        """Record one finished span."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + 1
+        if len(self.spans) < MAX_SPANS:
+            record = {"stage": stage, "offset_ms": round(offset * 1000, 3),
+                      "ms": round(seconds * 1000, 3), "depth": depth}
+            if detail:
+                record["detail"] = detail
+            self.spans.append(record)
+
+    def server_timing(self) -> str:
+        """Return the stages as a Server-Timing header value, in milliseconds."""
+        metrics = [f'total;dur={self.duration * 1000:.2f}']
+        for stage, seconds in self.stages.items():
+            metrics.append(f'{stage};desc="{self.counts[stage]}x";dur={seconds * 1000:.2f}')
+        return ", ".join(metrics)
+
+    def record(self) -> Dict[str, Any]:
+        """Return the trace as a trace.jsonl record."""
+        return {
+            "name": self.name,
+            "request_id": self.request_id,
+            "time": self.started_at,
+            "ms": round(self.duration * 1000, 3),
+            "stages": {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+            "counts": dict(self.counts),
+            "spans": self.spans,
+        }
+
+# The trace of the turn being processed, if any; each request task and worker thread
+# sees its own, so concurrent requests never record into each other's turn
+_active: ContextVar[Optional[Trace]] = ContextVar("active_trace", default=None)
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace spans are being recorded into, if any."""
+    return _active.get()
+
+@contextmanager
+def trace(name: str, request_id: str = ""):
+    """Record the spans of one turn; yields the Trace, complete once the block ends."""
+    turn = Trace(name, request_id)
+    token = _active.set(turn)
+    try:
+        yield turn
+    finally:
+        turn.duration = time.perf_counter() - turn.start
+        _active.reset(token)
+
+@contextmanager
+def span(stage: str, detail: str = ""):
+    """Time a stage of the current turn; `detail` (e.g. the query text) goes into the span record.
+
+    Costs one check when nothing is traced.
+    """
+    turn = _active.get()
+    if turn is None:
+        yield
+        return
+    start = time.perf_counter()
+    depth = turn.depth
+    turn.depth += 1
+    try:
+        yield
+    finally:
+        turn.depth = depth
+        end = time.perf_counter()
+        turn.add(stage, end - start, start - turn.start, depth, detail)
+
+def traced(stage: str):
+    """Decorator form of span() for functions that are a stage as a whole."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def append_trace_log(kb_file: str, turn: Trace):
+    """Append a finished trace to the trace log of the session that owns kb_file."""
+    path = os.path.join(os.path.dirname(kb_file), TRACE_FILE)
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(turn.record()) + "\n")
+    except OSError as e:
+        from logs import get_logger
+        get_logger("tracing").warning("could not write trace log", path=path, error=e)
@@ -1,5 +1,28 @@
 import re
-from typing import Tuple
+import os
+import time
+import hashlib
+from typing import Tuple, Optional, Dict, Any
+from tracing import span, traced
+import query_profile
+from query_profile import get_query_profiler, caller_name
+from metrics import CONSULTS
+from logs import get_logger
+
+log = get_logger("utils")
+
+# Stat data younger than this is not trusted on its own (coarse filesystem
+# timestamps can hide a same-size rewrite), so the content hash decides.
+RACY_WINDOW_NS = 2_000_000_000
+
+# Memoized validate_prolog_file results: file path -> (fingerprint, result)
+_validation_cache: Dict[str, Tuple[Dict[str, Any], bool]] = {}
+
+# Inference backend: "prolog" (SWI-Prolog via pyswip) or "datalog" (pure Python, see datalog.py)
+INFERENCE_BACKEND = os.environ.get("FAMILY_INFERENCE_BACKEND", "prolog").strip().lower()
+
+# Resident Prolog engine shared by the query handler, validator and fact manager
+_resident_engine: Dict[str, Any] = {"prolog": None, "kb_file": None, "fingerprint": None}
 
 def to_prolog_name(name: str) -> str:
     """Convert a name to Prolog format (lowercase)."""
@@ -21,53 +44,151 @@ def validate_name(name: str) -> Tuple[bool, str]:
     
     return True, ""
 
+def prolog_query(prolog, query, depth: int = 2):
+    """Execute a Prolog query, raising its error for callers that must tell a failure from no results.
+
+    `depth` is how many frames up the profiler finds the caller the query is attributed to.
+    """
+    # Disable any system calls that might cause pyrun issues
+    try:
+        prolog.query(":- set_prolog_flag(unknown, fail).")
+    except:
+        pass  # Ignore if this fails
+    
+    # Execute the actual query
+    start = time.perf_counter()
+    try:
+        with span("prolog_query", query):
+            results = list(prolog.query(query))
+    except Exception:
+        if query_profile.use_query_profiler:
+            get_query_profiler().record(query, time.perf_counter() - start, 0, caller_name(depth), error=True)
+        raise
+    if query_profile.use_query_profiler:
+        get_query_profiler().record(query, time.perf_counter() - start, len(results), caller_name(depth))
+    return results
+
 def safe_prolog_query(prolog, query):
     """Safely execute a Prolog query with error handling."""
     try:
-        # Disable any system calls that might cause pyrun issues
-        try:
-            prolog.query(":- set_prolog_flag(unknown, fail).")
-        except:
-            pass  # Ignore if this fails
-        
-        # Execute the actual query
-        results = list(prolog.query(query))
-        return results
+        return prolog_query(prolog, query, depth=3)
     except Exception as e:
-        print(f"Prolog query error for '{query}': {e}")
+        log.error("prolog query failed", query=query, error=e)
         return []
 
+def kb_fingerprint(file_path: str, known: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Fingerprint a file by mtime and size, hashing its content only when the stat data is ambiguous."""
+    st = os.stat(file_path)
+    fingerprint = {
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "checked_ns": time.time_ns(),
+        "digest": None,
+    }
+    
+    # Unchanged stat data that was already settled when last checked is trusted as-is
+    if (known and known["mtime_ns"] == st.st_mtime_ns and known["size"] == st.st_size
+            and known["checked_ns"] - known["mtime_ns"] > RACY_WINDOW_NS):
+        fingerprint["digest"] = known["digest"]
+        return fingerprint
+    
+    with open(file_path, "rb") as f:
+        fingerprint["digest"] = hashlib.sha1(f.read()).hexdigest()
+    return fingerprint
+
+def same_kb_content(known: Optional[Dict[str, Any]], fingerprint: Dict[str, Any]) -> bool:
+    """Check whether two fingerprints describe the same file content."""
+    return known is not None and known["digest"] == fingerprint["digest"]
+
+def get_prolog_engine(file_path: str):
+    """Return the resident Prolog engine with file_path consulted, re-consulting only when the file changed."""
+    if INFERENCE_BACKEND == "datalog":
+        # Derived relations stay materialized and follow the file's changes incrementally
+        from datalog import get_materialized_views
+        with span("consult"):
+            return get_materialized_views(file_path)
+    if INFERENCE_BACKEND != "prolog":
+        raise ValueError(f"Unknown inference backend: {INFERENCE_BACKEND}")
+    from pyswip import Prolog
+
+    state = _resident_engine
+    if state["prolog"] is None:
+        state["prolog"] = Prolog()
+    prolog = state["prolog"]
+    
+    known = state["fingerprint"] if state["kb_file"] == file_path else None
+    fingerprint = kb_fingerprint(file_path, known)
+    if same_kb_content(known, fingerprint):
+        state["fingerprint"] = fingerprint
+        return prolog
+    
+    # Drop the clauses of the previous session's file before loading another one
+    if state["kb_file"] and state["kb_file"] != file_path:
+        try:
+            previous = os.path.abspath(state["kb_file"]).replace("\\", "/")
+            list(prolog.query(f"unload_file('{previous}')"))
+        except Exception as e:
+            log.warning("could not unload knowledge base", kb=state["kb_file"], error=e)
+    
+    with span("consult"):
+        prolog.consult(file_path)
+    CONSULTS.inc(backend="prolog")
+    state["kb_file"] = file_path
+    state["fingerprint"] = fingerprint
+    return prolog
+
+@traced("validate_file")
 def validate_prolog_file(file_path: str) -> bool:
-    """Validate that a Prolog file can be consulted without errors."""
+    """Validate that a Prolog file can be consulted without errors.
+    
+    The result is memoized per file and only recomputed when the file content changes.
+    """
+    try:
+        cached = _validation_cache.get(file_path)
+        fingerprint = kb_fingerprint(file_path, cached[0] if cached else None)
+        if cached and same_kb_content(cached[0], fingerprint):
+            _validation_cache[file_path] = (fingerprint, cached[1])
+            return cached[1]
+        
+        result = _validate_prolog_content(file_path)
+        
+        # Cleaning may have rewritten the file, so fingerprint what is on disk now
+        _validation_cache[file_path] = (kb_fingerprint(file_path), result)
+        return result
+        
+    except Exception as e:
+        log.error("error validating prolog file", kb=file_path, error=e)
+        return False
+
+def _validate_prolog_content(file_path: str) -> bool:
+    """Run the actual validation checks for a Prolog file."""
     try:
         with open(file_path, "r", encoding="utf-8") as f:
             content = f.read()
         
         # Check for problematic module imports
         if "library(os)" in content or "library(system)" in content:
-            print(f"File contains problematic module imports: {file_path}")
+            log.warning("file contains problematic module imports", kb=file_path)
             return False
         
         # Check for any non-ASCII characters that might cause issues
         try:
             content.encode('ascii')
         except UnicodeEncodeError:
-            print(f"File contains non-ASCII characters: {file_path}")
+            log.warning("file contains non-ascii characters", kb=file_path)
             return False
         
-        # Try to consult the file with error handling
+        # Try to consult the file in the resident engine
         try:
-            from pyswip import Prolog
-            prolog = Prolog()
-            prolog.consult(file_path)
+            get_prolog_engine(file_path)
             return True
         except Exception as prolog_error:
-            print(f"Prolog consultation error: {prolog_error}")
+            log.warning("prolog consultation failed", kb=file_path, error=prolog_error)
             # If Prolog consultation fails, try to clean the file
             return clean_prolog_file(file_path)
         
     except Exception as e:
-        print(f"Error validating Prolog file {file_path}: {e}")
+        log.error("error validating prolog file", kb=file_path, error=e)
         return False
 
 def clean_prolog_file(file_path: str) -> bool:
@@ -90,7 +211,7 @@ def clean_prolog_file(file_path: str) -> bool:
                 line.encode('ascii')
                 cleaned_lines.append(line)
             except UnicodeEncodeError:
-                print(f"Skipping line with non-ASCII characters: {line}")
+                log.warning("skipping line with non-ascii characters", kb=file_path, line=line)
                 continue
         
         # Write the cleaned content back
@@ -99,16 +220,14 @@ def clean_prolog_file(file_path: str) -> bool:
         
         # Try to consult the cleaned file
         try:
-            from pyswip import Prolog
-            prolog = Prolog()
-            prolog.consult(file_path)
+            get_prolog_engine(file_path)
             return True
         except Exception as prolog_error:
-            print(f"Prolog consultation still fails after cleaning: {prolog_error}")
+            log.error("prolog consultation still fails after cleaning", kb=file_path, error=prolog_error)
             return False
         
     except Exception as e:
-        print(f"Error cleaning Prolog file {file_path}: {e}")
+        log.error("error cleaning prolog file", kb=file_path, error=e)
         return False
 
 def generate_unique_shared_parent_names(person1: str, person2: str, parent_type: str = "mother") -> Tuple[str, str]:
@@ -135,4 +254,16 @@ def generate_unique_shared_parent_names(person1: str, person2: str, parent_type:
         shared_parent_name = f"shared_father_{unique_id}"
         gender_fact = f"male({shared_parent_name})."
     
-    return shared_parent_name, gender_fact 
\ No newline at end of file
+    return shared_parent_name, gender_fact 
+def is_shared_parent(name: str) -> bool:
+    """Check whether a person is a generated placeholder parent rather than a named one."""
+    return name.startswith("shared_mother_") or name.startswith("shared_father_")
+
+def sibling_group_id(names) -> str:
+    """Return the group atom for a set of siblings; the same people always get the same group."""
+    key = "_".join(sorted(name.lower() for name in names))
+    return f"siblings_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:10]}"
+
+def is_sibling_group(name: str) -> bool:
+    """Check whether an atom is a sibling group id rather than a person."""
+    return name.startswith("siblings_")
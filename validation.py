@@ -1,143 +1,154 @@
 import re
-from typing import Tuple, Set
-from pyswip import Prolog
+from typing import Tuple, Set, List, Optional, Union
 from utils import to_prolog_name, safe_prolog_query, validate_prolog_file
+from family_graph import get_family_graph, get_scoped_engine
+from generation_index import get_generation_index
+from reachability import get_reachability_index
+from clarification_state import EngineSnapshot
+from statement_ir import Fact, ValidationOutcome, find_fact, fact_people
+from tracing import traced
+from logs import get_logger
 
 # Global variable for current knowledge base file
 current_kb_file = "relationships.pl"
 
+log = get_logger("validation")
+
 class RelationshipValidator:
     def __init__(self):
-        pass
+        # Scoped engine and people of the last validation, for follow-up questions
+        self.last_engine = None
+        self.last_scope: Set[str] = set()
+    
+    def snapshot(self) -> Optional[EngineSnapshot]:
+        """Return the engine state the last validation decided on, if it used one."""
+        if self.last_engine is None:
+            return None
+        return EngineSnapshot(current_kb_file, self.last_engine, self.last_scope)
     
-    def validate_relationship(self, statement: str, fact: str) -> Tuple[bool, str]:
-        """Validate a relationship before adding it to the knowledge base."""
+    @traced("validate")
+    def validate(self, statement: str, facts: List[Fact]) -> ValidationOutcome:
+        """Validate a statement's facts before adding them to the knowledge base."""
+        self.last_engine = None
         try:
-            # Check if the file has any existing facts (not just rules)
+            # Index the knowledge base once per file change instead of scanning it per statement
             try:
-                with open(current_kb_file, "r") as f:
-                    content = f.read()
-                print(f"DEBUG: File content length: {len(content)}")
-                # Check if there are any actual facts (not just rules)
-                has_facts = bool(re.search(r'^[a-z_]+\([a-z0-9_, ]+\)\.$', content, re.MULTILINE))
-                print(f"DEBUG: has_facts = {has_facts}")
-                if has_facts:
-                    facts = re.findall(r'^[a-z_]+\([a-z0-9_, ]+\)\.$', content, re.MULTILINE)
-                    print(f"DEBUG: Found facts: {facts}")
+                graph = get_family_graph(current_kb_file)
+                has_facts = graph.has_facts()
+                log.debug("indexed knowledge base", has_facts=has_facts)
             except Exception as e:
-                print(f"DEBUG: Error reading file: {e}")
+                log.warning("could not index knowledge base", kb=current_kb_file, error=e)
+                graph = None
                 has_facts = False
             
+            # Sibling groups are checked in one pass over their members; any other
+            # facts (the parent_of facts of "X, Y and Z are children of W") go on below
+            group_facts = [fact for fact in facts if fact.predicate == "sibling_group"]
+            if group_facts:
+                group_error = self._check_sibling_group(group_facts)
+                if group_error:
+                    return ValidationOutcome.rejected(group_error)
+                facts = [fact for fact in facts if fact.predicate != "sibling_group"]
+                if not facts:
+                    return ValidationOutcome.ok()
+            
             # Always perform validation, even if no facts exist yet
             # This ensures sibling clarification is triggered for all new sibling relationships
             if not has_facts:
-                print(f"No existing facts in {current_kb_file}, but performing validation for new relationships")
+                log.debug("no existing facts, validating new relationships only", kb=current_kb_file)
                 # For sibling relationships, always trigger clarification
-                if "sibling_of" in fact:
-                    # Extract sibling names
-                    match = re.search(r'sibling_of\(([^,]+),\s*([^)]+)\)', fact)
-                    if match:
-                        person1 = match.group(1)
-                        person2 = match.group(2)
-                        return False, f"ask_full_sibling_clarification:{person1}:{person2}"
+                sibling_fact = find_fact(facts, "sibling_of", "half_sibling_of")
+                if sibling_fact:
+                    return ValidationOutcome.needs("ask_full_sibling_clarification", *sibling_fact.args)
                 
                 # For parent relationships, check if there are any sibling relationships in the file
-                if "parent_of" in fact:
+                parent_fact = find_fact(facts, "parent_of")
+                if parent_fact and graph is not None:
                     try:
-                        # Check if there are any sibling relationships in the file
-                        with open(current_kb_file, "r") as f:
-                            content = f.read()
-                        sibling_matches = re.findall(r'sibling_of\(([^,]+),\s*([^)]+)\)', content)
-                        if sibling_matches:
-                            # Extract the child name from the parent fact
-                            parent_match = re.search(r'parent_of\(([^,]+),\s*([^)]+)\)', fact)
-                            if parent_match:
-                                child = parent_match.group(2)
-                                # Find siblings of this child (check both directions)
-                                siblings = []
-                                for sib1, sib2 in sibling_matches:
-                                    if sib1 == child:
-                                        siblings.append(sib2)
-                                    elif sib2 == child:
-                                        siblings.append(sib1)
-                                if siblings:
-                                    parent = parent_match.group(1)
-                                    return False, f"ask_sibling_parent_clarification:{parent}:{child}:{','.join(siblings)}"
+                        parent, child = parent_fact.args
+                        # Find siblings of this child (check both directions)
+                        siblings = []
+                        for _, (sib1, sib2) in graph.facts_about(child, "sibling_of"):
+                            if sib1 == child:
+                                siblings.append(sib2)
+                            elif sib2 == child:
+                                siblings.append(sib1)
+                        if siblings:
+                            return ValidationOutcome.needs("ask_sibling_parent_clarification", parent, child, ','.join(siblings))
                     except Exception as e:
-                        print(f"Error checking parent relationships: {e}")
+                        log.error("error checking parent relationships", error=e)
                 
                 # For other relationships, allow them to be added
-                return True, ""
+                return ValidationOutcome.ok()
             
             # Skip validation if Prolog file is invalid
             if not validate_prolog_file(current_kb_file):
-                print(f"Skipping validation due to invalid file: {current_kb_file}")
-                return True, "file_invalid"
+                log.warning("skipping validation, invalid knowledge base", kb=current_kb_file)
+                return ValidationOutcome.ok("file_invalid")
+            
+            # People in relationships, and everyone named, for the scope
+            person_names = fact_people(fact for fact in facts if len(fact.args) == 2)
+            scope_names = fact_people(facts)
             
-            # Try to consult the file, but skip validation if it fails
+            # Load only the facts near the people involved, but skip validation if it fails
             try:
-                prolog = Prolog()
-                prolog.consult(current_kb_file)
+                prolog = get_scoped_engine(current_kb_file, scope_names)
+                log.debug("loaded scope", facts=len(prolog.loaded), loaded=lambda: sorted(prolog.loaded))
+                self.last_engine = prolog
+                self.last_scope = scope_names
             except Exception as e:
-                print(f"Skipping validation due to Prolog consultation error: {e}")
-                return True, "consultation_error"
-            
-            # Extract person names from the fact
-            person_names = set()
-            for match in re.finditer(r'\(([^,]+),\s*([^)]+)\)', fact):
-                person_names.add(to_prolog_name(match.group(1)))
-                person_names.add(to_prolog_name(match.group(2)))
+                log.warning("skipping validation, consultation failed", kb=current_kb_file, error=e)
+                return ValidationOutcome.ok("consultation_error")
             
             # Check for gender contradictions
-            gender_error = self._check_gender_contradictions(statement, fact, prolog, True)
-            if gender_error:
-                return False, gender_error
+            outcome = ValidationOutcome.of(self._check_gender_contradictions(statement, facts, prolog, True))
+            if outcome:
+                return outcome
             
             # Check for impossible parent relationships
-            parent_error = self._check_parent_relationships(statement, fact, prolog, True)
-            if parent_error:
-                return False, parent_error
+            outcome = ValidationOutcome.of(self._check_parent_relationships(statement, facts, prolog, True))
+            if outcome:
+                return outcome
             
             # Check for sibling relationship conflicts
-            sibling_error = self._check_sibling_relationships(statement, fact, prolog, True)
-            if sibling_error:
-                return False, sibling_error
+            outcome = ValidationOutcome.of(self._check_sibling_relationships(statement, facts, prolog, True))
+            if outcome:
+                return outcome
             
             # Check for grandparent relationship validation
-            grandparent_error = self._check_grandparent_relationships(statement, fact, prolog, True)
-            if grandparent_error:
-                return False, grandparent_error
+            outcome = ValidationOutcome.of(self._check_grandparent_relationships(statement, facts, prolog, True))
+            if outcome:
+                return outcome
             
             # Check for aunt/uncle relationship validation
-            aunt_uncle_error = self._check_aunt_uncle_relationships(statement, fact, prolog, True)
-            if aunt_uncle_error:
-                return False, aunt_uncle_error
+            outcome = ValidationOutcome.of(self._check_aunt_uncle_relationships(statement, facts, prolog, True))
+            if outcome:
+                return outcome
             
             # Check for complex incestual scenarios
-            incest_error = self._check_incestual_scenarios(fact, person_names, prolog, True)
-            if incest_error:
-                return False, incest_error
+            outcome = ValidationOutcome.of(self._check_incestual_scenarios(facts, person_names, prolog, True))
+            if outcome:
+                return outcome
             
-            return True, ""
+            return ValidationOutcome.ok()
             
         except Exception as e:
-            print(f"Error during validation: {e}")
-            return True, "validation_error"
+            log.error("error during validation", error=e)
+            return ValidationOutcome.ok("validation_error")
     
     def check_sibling_possibility(self, person1: str, person2: str) -> Tuple[bool, str]:
         """Check if two people can be siblings without causing conflicts."""
         try:
             # Skip validation if Prolog file is invalid
             if not validate_prolog_file(current_kb_file):
-                print(f"Skipping sibling possibility check due to invalid file: {current_kb_file}")
+                log.warning("skipping sibling possibility check, invalid knowledge base", kb=current_kb_file)
                 return True, ""
             
-            # Try to consult the file, but skip validation if it fails
+            # Load only the facts near the two people, but skip validation if it fails
             try:
-                prolog = Prolog()
-                prolog.consult(current_kb_file)
+                prolog = get_scoped_engine(current_kb_file, [person1, person2])
             except Exception as e:
-                print(f"Skipping sibling possibility check due to Prolog consultation error: {e}")
+                log.warning("skipping sibling possibility check, consultation failed", kb=current_kb_file, error=e)
                 return True, ""
             
             # Check if they are already siblings
@@ -255,92 +266,76 @@ class RelationshipValidator:
             return True, ""
             
         except Exception as e:
-            print(f"Error checking sibling possibility: {e}")
+            log.error("error checking sibling possibility", error=e)
             return True, "validation_error"
     
-    def _check_gender_contradictions(self, statement: str, fact: str, prolog, has_content: bool) -> str:
+    def _check_gender_contradictions(self, statement: str, facts: List[Fact], prolog, has_content: bool) -> str:
         """Check for gender contradictions in the statement."""
         if not has_content:
             return ""
             
         try:
-            # Extract person names from the fact
-            person_names = set()
-            for match in re.finditer(r'\(([^,]+),\s*([^)]+)\)', fact):
-                person_names.add(to_prolog_name(match.group(1)))
-                person_names.add(to_prolog_name(match.group(2)))
+            parent_fact = find_fact(facts, "parent_of")
+            male_fact = find_fact(facts, "male")
+            female_fact = find_fact(facts, "female")
             
             # For gender facts, check if the person already has the opposite gender
-            if re.search(r'\bfather\b', statement.lower()) and "parent_of" in fact:
-                # Extract the parent name from the fact
-                parent_match = re.search(r'parent_of\(([^,]+),\s*([^)]+)\)', fact)
-                if parent_match:
-                    parent_name = to_prolog_name(parent_match.group(1))
-                    # Check if parent is already female
-                    try:
-                        female_results = list(prolog.query(f"female({parent_name})"))
-                        if female_results:
-                            return f"That's impossible! {parent_match.group(1).capitalize()} cannot be a father because they are already female."
-                    except Exception as e:
-                        print(f"Error checking female predicate: {e}")
+            if re.search(r'\bfather\b', statement.lower()) and parent_fact:
+                parent_name = parent_fact.args[0]
+                # Check if parent is already female
+                try:
+                    female_results = list(prolog.query(f"female({parent_name})"))
+                    if female_results:
+                        return f"That's impossible! {parent_name.capitalize()} cannot be a father because they are already female."
+                except Exception as e:
+                    log.error("error checking female predicate", error=e)
                         
-            elif re.search(r'\bmother\b', statement.lower()) and "parent_of" in fact:
-                # Extract the parent name from the fact
-                parent_match = re.search(r'parent_of\(([^,]+),\s*([^)]+)\)', fact)
-                if parent_match:
-                    parent_name = to_prolog_name(parent_match.group(1))
-                    # Check if parent is already male
-                    try:
-                        male_results = list(prolog.query(f"male({parent_name})"))
-                        if male_results:
-                            return f"That's impossible! {parent_match.group(1).capitalize()} cannot be a mother because they are already male."
-                    except Exception as e:
-                        print(f"Error checking male predicate: {e}")
+            elif re.search(r'\bmother\b', statement.lower()) and parent_fact:
+                parent_name = parent_fact.args[0]
+                # Check if parent is already male
+                try:
+                    male_results = list(prolog.query(f"male({parent_name})"))
+                    if male_results:
+                        return f"That's impossible! {parent_name.capitalize()} cannot be a mother because they are already male."
+                except Exception as e:
+                    log.error("error checking male predicate", error=e)
             
             # For explicit gender statements, check contradictions
-            elif re.search(r'\bmale\(', fact):
-                person_match = re.search(r'male\(([^)]+)\)', fact)
-                if person_match:
-                    person_name = to_prolog_name(person_match.group(1))
-                    # Check if person is already female
-                    try:
-                        female_results = list(prolog.query(f"female({person_name})"))
-                        if female_results:
-                            return f"That's impossible! {person_match.group(1).capitalize()} cannot be male because they are already female."
-                    except Exception as e:
-                        print(f"Error checking female predicate: {e}")
+            elif male_fact:
+                person_name = male_fact.args[0]
+                # Check if person is already female
+                try:
+                    female_results = list(prolog.query(f"female({person_name})"))
+                    if female_results:
+                        return f"That's impossible! {person_name.capitalize()} cannot be male because they are already female."
+                except Exception as e:
+                    log.error("error checking female predicate", error=e)
                         
-            elif re.search(r'\bfemale\(', fact):
-                person_match = re.search(r'female\(([^)]+)\)', fact)
-                if person_match:
-                    person_name = to_prolog_name(person_match.group(1))
-                    # Check if person is already male
-                    try:
-                        male_results = list(prolog.query(f"male({person_name})"))
-                        if male_results:
-                            return f"That's impossible! {person_match.group(1).capitalize()} cannot be female because they are already male."
-                    except Exception as e:
-                        print(f"Error checking male predicate: {e}")
+            elif female_fact:
+                person_name = female_fact.args[0]
+                # Check if person is already male
+                try:
+                    male_results = list(prolog.query(f"male({person_name})"))
+                    if male_results:
+                        return f"That's impossible! {person_name.capitalize()} cannot be female because they are already male."
+                except Exception as e:
+                    log.error("error checking male predicate", error=e)
                         
         except Exception as e:
-            print(f"Error in gender contradiction check: {e}")
+            log.error("error in gender contradiction check", error=e)
             
         return ""
     
-    def _check_parent_relationships(self, statement: str, fact: str, prolog, has_content: bool) -> str:
+    def _check_parent_relationships(self, statement: str, facts: List[Fact], prolog, has_content: bool) -> Union[str, ValidationOutcome]:
         """Check for impossible parent relationships."""
-        print(f"DEBUG: _check_parent_relationships called with statement='{statement}', fact='{fact}'")
+        log.debug("checking parent relationships", statement=statement, facts=facts)
         
-        if "parent_of" not in fact:
+        # A grandparent fact is checked as a parent link one generation up
+        parent_fact = find_fact(facts, "parent_of", "grandparent_of")
+        if not parent_fact:
             return ""
         
-        # Extract parent and child names
-        match = re.search(r'parent_of\(([^,]+),\s*([^)]+)\)', fact)
-        if not match:
-            return ""
-        
-        parent = match.group(1)
-        child = match.group(2)
+        parent, child = parent_fact.args
         
         # Check for hierarchical validation for parent-child relationships
         if has_content:
@@ -365,13 +360,13 @@ class RelationshipValidator:
                         return ""  # Same parent, no conflict
                     
                     # Check if the existing parent is a shared parent (check this BEFORE checking for third parent)
-                    print(f"DEBUG: Checking if shared parent is in existing_parent_names: {existing_parent_names}")
+                    log.debug("checking for a shared parent", child=child, parents=existing_parent_names)
                     has_shared_parent = any(name.startswith("shared_mother_") or name.startswith("shared_father_") for name in existing_parent_names)
                     if has_shared_parent:
-                        print(f"DEBUG: Found shared parent conflict for {child}")
+                        log.debug("shared parent conflict", child=child)
                         return self._handle_shared_parent_conflict(parent, child, prolog, statement)
                     else:
-                        print(f"DEBUG: shared parent not found in existing_parent_names")
+                        log.debug("no shared parent", child=child)
                         # If child already has 2 parents and none are shared, prevent adding a third
                         if len(existing_parent_names) >= 2:
                             return f"That's impossible! {child.capitalize()} already has two parents ({', '.join([p.capitalize() for p in existing_parent_names])}). A person cannot have more than two parents."
@@ -431,7 +426,7 @@ class RelationshipValidator:
                                 return f"That's impossible! {child.capitalize()} already has a mother ({existing_mother.capitalize()}). A person can only have one mother."
                         
             except Exception as e:
-                print(f"Error checking multiple parents: {e}")
+                log.error("error checking multiple parents", error=e)
         
         # Check for sibling clarification (triggered when adding parent to sibling set)
         if has_content:
@@ -494,12 +489,12 @@ class RelationshipValidator:
                                     half_sibling_relationship = safe_prolog_query(prolog, f"half_sibling_of({sibling_name}, {child})")
                                 if half_sibling_relationship:
                                     child_has_half_sibling_relationship = True
-                                    print(f"DEBUG: {child} has half sibling relationship with {sibling_name}")
+                                    log.debug("half sibling relationship", child=child, sibling=sibling_name)
                                     break
                         
                         # If child has half sibling relationship, these are half-siblings - do NOT share parents
                         if child_has_half_sibling_relationship:
-                            print(f"DEBUG: {child} has half sibling relationship, these are half-siblings - not sharing parent automatically")
+                            log.debug("half-siblings, not sharing parent automatically", child=child)
                             return ""  # Allow the parent to be added only to the specific child
                         
                         # Now check if the child has a sibling_of relationship with any of the siblings
@@ -514,18 +509,18 @@ class RelationshipValidator:
                                     half_sibling_relationship = safe_prolog_query(prolog, f"half_sibling_of({child}, {sibling_name})")
                                     if not half_sibling_relationship:
                                         child_has_full_sibling_relationship = True
-                                        print(f"DEBUG: {child} has full sibling relationship with {sibling_name}")
+                                        log.debug("full sibling relationship", child=child, sibling=sibling_name)
                                         break
                         
                         # If child has full sibling relationship, these are full siblings - no clarification needed
                         if child_has_full_sibling_relationship:
-                            print(f"DEBUG: {child} has full sibling relationship, these are full siblings - no clarification needed")
+                            log.debug("full siblings, no clarification needed", child=child)
                             # For full siblings, automatically add the parent to all siblings
-                            return f"add_parent_to_full_siblings:{parent}:{child}:{','.join(sibling_names)}"
+                            return ValidationOutcome.needs("add_parent_to_full_siblings", parent, child, ','.join(sibling_names))
                         else:
                             # These are half-siblings, check if any siblings need this parent type
                             siblings_needing_parent = []
-                            print(f"DEBUG: Checking half-siblings for {child}: {sibling_names}")
+                            log.debug("checking half-siblings", child=child, siblings=sibling_names)
                             
                             # Check each sibling (EXCLUDING the child being added)
                             for sibling_name in sibling_names:
@@ -552,54 +547,50 @@ class RelationshipValidator:
                                     
                                     if not sibling_has_parent_type:
                                         siblings_needing_parent.append(sibling_name)
-                                        print(f"DEBUG: {sibling_name} needs {parent_type}")
+                                        log.debug("sibling needs parent", sibling=sibling_name, parent_type=parent_type)
                             
                             # For half-siblings, do NOT automatically share parents
                             # Just add the parent to the specific child
-                            print(f"DEBUG: Half-siblings detected, not sharing parent automatically")
+                            log.debug("half-siblings detected, not sharing parent automatically", child=child)
                             return ""  # Allow the parent to be added only to the specific child
             except Exception as e:
-                print(f"Error checking siblings: {e}")
+                log.error("error checking siblings", error=e)
         
         # Check existing parents
-        print(f"DEBUG: has_content = {has_content}")
         if has_content:  # Only query if we have content
             try:
-                print(f"DEBUG: Querying existing parents for {child}")
                 existing_parents = safe_prolog_query(prolog, f"parent_of(X, {child})")
-                print(f"DEBUG: {child} has existing parents: {existing_parents}")
                 if existing_parents:
                     existing_parent_names = [result["X"] for result in existing_parents]
-                    print(f"DEBUG: existing_parent_names = {existing_parent_names}")
+                    log.debug("existing parents", child=child, parents=existing_parent_names)
                     
                     # Check if this new parent is already a parent
                     if parent in existing_parent_names:
-                        print(f"DEBUG: {parent} is already a parent of {child}")
+                        log.debug("already a parent", parent=parent, child=child)
                         return ""  # Same parent, no conflict
                     
                     # Check if the existing parent is a shared parent (check this BEFORE checking for third parent)
-                    print(f"DEBUG: Checking if shared parent is in existing_parent_names: {existing_parent_names}")
+                    log.debug("checking for a shared parent", child=child, parents=existing_parent_names)
                     has_shared_parent = any(name.startswith("shared_mother_") or name.startswith("shared_father_") for name in existing_parent_names)
                     if has_shared_parent:
-                        print(f"DEBUG: Found shared parent conflict for {child}")
+                        log.debug("shared parent conflict", child=child)
                         return self._handle_shared_parent_conflict(parent, child, prolog, statement)
                     else:
-                        print(f"DEBUG: shared parent not found in existing_parent_names")
+                        log.debug("no shared parent", child=child)
                         # Also check for gender conflicts with existing parents
                         gender_error = self._check_parent_gender_conflicts(parent, child, existing_parent_names, prolog)
                         if gender_error:
-                            print(f"DEBUG: Gender conflict found: {gender_error}")
+                            log.debug("gender conflict", parent=parent, child=child, error=gender_error)
                             return gender_error
                     
                     # Check for gender conflicts
-                    print(f"DEBUG: Checking gender conflicts for {parent} and {child}")
                     gender_error = self._check_parent_gender_conflicts(parent, child, existing_parent_names, prolog)
                     if gender_error:
-                        print(f"DEBUG: Gender conflict found: {gender_error}")
+                        log.debug("gender conflict", parent=parent, child=child, error=gender_error)
                         return gender_error
                     
             except Exception as e:
-                print(f"Error checking parent relationships: {e}")
+                log.error("error checking parent relationships", error=e)
         
         return ""
     
@@ -611,13 +602,13 @@ class RelationshipValidator:
             if not parent_results:
                 return f"Cannot establish grandparent relationship: {grandchild.capitalize()} has no known parent."
         except Exception as e:
-            print(f"Error checking grandparent relationship: {e}")
+            log.error("error checking grandparent relationship", error=e)
         
         return ""
     
-    def _handle_shared_parent_conflict(self, new_parent: str, child: str, prolog, statement: str) -> str:
+    def _handle_shared_parent_conflict(self, new_parent: str, child: str, prolog, statement: str) -> Union[str, ValidationOutcome]:
         """Handle conflicts with shared_parent relationships."""
-        print(f"DEBUG: _handle_shared_parent_conflict called with new_parent={new_parent}, child={child}")
+        log.debug("handling shared parent conflict", new_parent=new_parent, child=child)
         try:
             # Check if any shared parent exists (with unique names)
             shared_parents = safe_prolog_query(prolog, f"parent_of(X, {child})")
@@ -648,13 +639,13 @@ class RelationshipValidator:
             
             # If shared_father exists and we're adding a father, delete shared_father and add father
             if shared_father_exists and parent_type == "father":
-                print(f"DEBUG: Returning delete_shared_parent_add_father for {new_parent}")
-                return f"delete_shared_parent_add_father:{new_parent}:{child}"
+                log.debug("replacing shared father", new_parent=new_parent, child=child)
+                return ValidationOutcome.needs("delete_shared_parent_add_father", new_parent, child)
             
             # If shared_mother exists and we're adding a mother, delete shared_mother and add mother
             if shared_mother_exists and parent_type == "mother":
-                print(f"DEBUG: Returning delete_shared_parent_add_mother for {new_parent}")
-                return f"delete_shared_parent_add_mother:{new_parent}:{child}"
+                log.debug("replacing shared mother", new_parent=new_parent, child=child)
+                return ValidationOutcome.needs("delete_shared_parent_add_mother", new_parent, child)
             
             # Otherwise, ask for clarification
             siblings = safe_prolog_query(prolog, f"sibling_of({child}, X)")
@@ -662,14 +653,14 @@ class RelationshipValidator:
             
             if sibling_names:
                 sibling_list = ", ".join([s.capitalize() for s in sibling_names])
-                return f"ask_clarification:{new_parent}:{child}:{sibling_list}"
+                return ValidationOutcome.needs("ask_clarification", new_parent, child, sibling_list)
             else:
                 return "update_shared_parent"
         except Exception as e:
-            print(f"Error handling shared parent conflict: {e}")
+            log.error("error handling shared parent conflict", error=e)
             return "update_shared_parent"
     
-    def _check_parent_gender_conflicts(self, new_parent: str, child: str, existing_parents: list, prolog) -> str:
+    def _check_parent_gender_conflicts(self, new_parent: str, child: str, existing_parents: list, prolog) -> Union[str, ValidationOutcome]:
         """Check for gender conflicts between parents."""
         try:
             # Check if new parent is male
@@ -691,8 +682,8 @@ class RelationshipValidator:
                 # Check if the existing male parent is a placeholder (shared_father)
                 has_shared_father = any(parent.startswith("shared_father_") for parent in existing_male_parents)
                 if has_shared_father:
-                    print(f"DEBUG: Replacing shared_father with {new_parent}")
-                    return f"delete_shared_parent_add_father:{new_parent}:{child}"
+                    log.debug("replacing shared father", new_parent=new_parent, child=child)
+                    return ValidationOutcome.needs("delete_shared_parent_add_father", new_parent, child)
                 else:
                     return f"That's impossible! {child.capitalize()} already has a father ({existing_male_parents[0].capitalize()}). A person can only have one father."
             
@@ -701,32 +692,121 @@ class RelationshipValidator:
                 # Check if the existing female parent is a placeholder (shared_mother)
                 has_shared_mother = any(parent.startswith("shared_mother_") for parent in existing_female_parents)
                 if has_shared_mother:
-                    print(f"DEBUG: Replacing shared_mother with {new_parent}")
-                    return f"delete_shared_parent_add_mother:{new_parent}:{child}"
+                    log.debug("replacing shared mother", new_parent=new_parent, child=child)
+                    return ValidationOutcome.needs("delete_shared_parent_add_mother", new_parent, child)
                 else:
                     return f"That's impossible! {child.capitalize()} already has a mother ({existing_female_parents[0].capitalize()}). A person can only have one mother."
             
         except Exception as e:
-            print(f"Error checking gender conflicts: {e}")
+            log.error("error checking gender conflicts", error=e)
         
         return ""
     
-    def _check_sibling_relationships(self, statement: str, fact: str, prolog, has_content: bool) -> str:
+    def _check_sibling_group(self, group_facts: List[Fact]) -> str:
+        """Check that everyone in a sibling group can be siblings of each other.
+
+        People in different components of the generation index share no relationship yet,
+        so only members already connected to each other are checked against the knowledge base.
+        """
+        members = []
+        for fact in group_facts:
+            if fact.args[1] not in members:
+                members.append(fact.args[1])
+        
+        # Siblings share a generation; comparing each member with one connected
+        # representative is enough, since generation gaps add up along the index
+        generation_index = get_generation_index(current_kb_file)
+        components: List[List[str]] = []
+        for member in members:
+            for component in components:
+                representative = component[0]
+                if generation_index.connected(representative, member):
+                    if generation_index.generation_gap(representative, member) not in (None, 0):
+                        return f"That's impossible! {representative.capitalize()} and {member.capitalize()} cannot be siblings because they belong to different generations."
+                    component.append(member)
+                    break
+            else:
+                components.append([member])
+        
+        line_pair = get_reachability_index(current_kb_file).ancestor_among(members)
+        if line_pair:
+            ancestor, descendant = line_pair
+            return f"That's impossible! {ancestor.capitalize()} cannot be a sibling of {descendant.capitalize()} because {ancestor.capitalize()} is {descendant.capitalize()}'s ancestor."
+        
+        # Level members of one component may still be cousins, aunts or half-siblings
+        related = [component for component in components if len(component) > 1]
+        if not related:
+            return ""
+        try:
+            prolog = get_scoped_engine(current_kb_file, [member for component in related for member in component])
+        except Exception as e:
+            log.warning("skipping sibling group check, consultation failed", kb=current_kb_file, error=e)
+            return ""
+        for component in related:
+            for i, member in enumerate(component):
+                for earlier in component[:i]:
+                    error = self._check_sibling_group_pair(earlier, member, prolog)
+                    if error:
+                        return error
+        return ""
+    
+    def _check_sibling_group_pair(self, person1: str, person2: str, prolog) -> str:
+        """Check two connected members of a new sibling group against what is already known."""
+        try:
+            # Half-siblings do not become full siblings by sharing a group
+            half_sibling_check = (safe_prolog_query(prolog, f"half_sibling_of({person1}, {person2})")
+                                  or safe_prolog_query(prolog, f"half_sibling_of({person2}, {person1})"))
+            if half_sibling_check:
+                return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} are already half-siblings."
+            
+            # Full siblings named again are fine
+            if safe_prolog_query(prolog, f"sibling_of({person1}, {person2})"):
+                return ""
+            
+            # A sibling who is also a parent (incestual_sibling_parent once the group is stored)
+            parent_check = safe_prolog_query(prolog, f"parent_of({person1}, {person2})")
+            if parent_check:
+                return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s parent."
+            
+            parent_check = safe_prolog_query(prolog, f"parent_of({person2}, {person1})")
+            if parent_check:
+                return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s parent."
+            
+            # Check if they are cousins (have different parents who are siblings)
+            cousin_check = safe_prolog_query(prolog, f"parent_of(P1, {person1}), parent_of(P2, {person2}), sibling_of(P1, P2), P1 \\= P2")
+            if cousin_check:
+                return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are cousins (their parents are siblings)."
+            
+            # Check if they are second cousins (grandparents are siblings)
+            second_cousin_check = safe_prolog_query(prolog, f"parent_of(GP1, P1), parent_of(P1, {person1}), parent_of(GP2, P2), parent_of(P2, {person2}), sibling_of(GP1, GP2), GP1 \\= GP2")
+            if second_cousin_check:
+                return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are second cousins (their grandparents are siblings)."
+            
+            # Stored cousin facts need no parents to be known
+            if safe_prolog_query(prolog, f"cousin_of({person1}, {person2})") or safe_prolog_query(prolog, f"cousin_of({person2}, {person1})"):
+                return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are cousins."
+            
+            # Check if one is an aunt/uncle of the other
+            for relation in ("aunt", "uncle"):
+                if safe_prolog_query(prolog, f"{relation}_of({person1}, {person2})"):
+                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s {relation}."
+                if safe_prolog_query(prolog, f"{relation}_of({person2}, {person1})"):
+                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s {relation}."
+        except Exception as e:
+            log.error("error checking sibling group pair", error=e)
+        return ""
+    
+    def _check_sibling_relationships(self, statement: str, facts: List[Fact], prolog, has_content: bool) -> Union[str, ValidationOutcome]:
         """Check for sibling relationship conflicts."""
         # Check for sibling_of and half_sibling_of facts
-        sibling_match = re.search(r'sibling_of\(([^,]+),\s*([^)]+)\)', fact)
-        half_sibling_match = re.search(r'half_sibling_of\(([^,]+),\s*([^)]+)\)', fact)
-        
-        if not sibling_match and not half_sibling_match:
+        sibling_fact = find_fact(facts, "sibling_of", "half_sibling_of")
+        if not sibling_fact:
             return ""
         
-        # Extract person names
-        if sibling_match:
-            person1 = sibling_match.group(1)
-            person2 = sibling_match.group(2)
-        elif half_sibling_match:
-            person1 = half_sibling_match.group(1)
-            person2 = half_sibling_match.group(2)
+        person1, person2 = sibling_fact.args
+        
+        # Known when both are in one component of the generation index
+        gap = get_generation_index(current_kb_file).generation_gap(person1, person2)
         
         # Check if sibling relationship already exists
         if has_content:  # Only query if we have content
@@ -735,84 +815,90 @@ class RelationshipValidator:
                 if existing_sibling:
                     return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} are already siblings."
             except Exception as e:
-                print(f"Error checking existing sibling relationship: {e}")
+                log.error("error checking existing sibling relationship", error=e)
         
         # Check for impossible sibling relationships
         if has_content:
             try:
-                # Check if person1 is a parent of person2
-                parent_check = safe_prolog_query(prolog, f"parent_of({person1}, {person2})")
-                if parent_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s parent."
+                if gap is not None:
+                    # Both are in one consistent component of the generation index, so parents,
+                    # grandparents, aunts and nieces are ruled in or out by the gap alone
+                    if gap != 0:
+                        return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they belong to different generations."
+                else:
+                    # Check if person1 is a parent of person2
+                    parent_check = safe_prolog_query(prolog, f"parent_of({person1}, {person2})")
+                    if parent_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s parent."
                 
-                # Check if person2 is a parent of person1
-                parent_check = safe_prolog_query(prolog, f"parent_of({person2}, {person1})")
-                if parent_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s parent."
+                    # Check if person2 is a parent of person1
+                    parent_check = safe_prolog_query(prolog, f"parent_of({person2}, {person1})")
+                    if parent_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s parent."
                 
-                # Check if person1 is a grandparent of person2
-                grandparent_check = safe_prolog_query(prolog, f"grandparent_of({person1}, {person2})")
-                if grandparent_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s grandparent."
+                    # Check if person1 is a grandparent of person2
+                    grandparent_check = safe_prolog_query(prolog, f"grandparent_of({person1}, {person2})")
+                    if grandparent_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s grandparent."
                 
-                # Check if person2 is a grandparent of person1
-                grandparent_check = safe_prolog_query(prolog, f"grandparent_of({person2}, {person1})")
-                if grandparent_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s grandparent."
+                    # Check if person2 is a grandparent of person1
+                    grandparent_check = safe_prolog_query(prolog, f"grandparent_of({person2}, {person1})")
+                    if grandparent_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s grandparent."
                 
-                # Check if person1 is a great-grandparent of person2
-                great_grandparent_check = safe_prolog_query(prolog, f"parent_of({person1}, Z), parent_of(Z, W), parent_of(W, {person2})")
-                if great_grandparent_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s great-grandparent."
+                    # Check if person1 is a great-grandparent of person2
+                    great_grandparent_check = safe_prolog_query(prolog, f"parent_of({person1}, Z), parent_of(Z, W), parent_of(W, {person2})")
+                    if great_grandparent_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s great-grandparent."
                 
-                # Check if person2 is a great-grandparent of person1
-                great_grandparent_check = safe_prolog_query(prolog, f"parent_of({person2}, Z), parent_of(Z, W), parent_of(W, {person1})")
-                if great_grandparent_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s great-grandparent."
+                    # Check if person2 is a great-grandparent of person1
+                    great_grandparent_check = safe_prolog_query(prolog, f"parent_of({person2}, Z), parent_of(Z, W), parent_of(W, {person1})")
+                    if great_grandparent_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s great-grandparent."
                 
-                # Check if they are cousins (have different parents who are siblings)
-                cousin_check = safe_prolog_query(prolog, f"parent_of(P1, {person1}), parent_of(P2, {person2}), sibling_of(P1, P2), P1 \\= P2")
-                if cousin_check:
-                    return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are cousins (their parents are siblings)."
+                    # Check if one is an aunt/uncle of the other
+                    aunt_uncle_check = safe_prolog_query(prolog, f"aunt_of({person1}, {person2})")
+                    if aunt_uncle_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s aunt/uncle."
                 
-                # Check if they are second cousins (grandparents are siblings)
-                second_cousin_check = safe_prolog_query(prolog, f"parent_of(GP1, P1), parent_of(P1, {person1}), parent_of(GP2, P2), parent_of(P2, {person2}), sibling_of(GP1, GP2), GP1 \\= GP2")
-                if second_cousin_check:
-                    return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are second cousins (their grandparents are siblings)."
+                    aunt_uncle_check = safe_prolog_query(prolog, f"uncle_of({person1}, {person2})")
+                    if aunt_uncle_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s uncle."
                 
-                # Check if one is an aunt/uncle of the other
-                aunt_uncle_check = safe_prolog_query(prolog, f"aunt_of({person1}, {person2})")
-                if aunt_uncle_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s aunt/uncle."
+                    aunt_uncle_check = safe_prolog_query(prolog, f"aunt_of({person2}, {person1})")
+                    if aunt_uncle_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s aunt."
                 
-                aunt_uncle_check = safe_prolog_query(prolog, f"uncle_of({person1}, {person2})")
-                if aunt_uncle_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s uncle."
+                    aunt_uncle_check = safe_prolog_query(prolog, f"uncle_of({person2}, {person1})")
+                    if aunt_uncle_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s uncle."
                 
-                aunt_uncle_check = safe_prolog_query(prolog, f"aunt_of({person2}, {person1})")
-                if aunt_uncle_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s aunt."
+                    # Check if one is a niece/nephew of the other
+                    niece_nephew_check = safe_prolog_query(prolog, f"niece_of({person1}, {person2})")
+                    if niece_nephew_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s niece."
                 
-                aunt_uncle_check = safe_prolog_query(prolog, f"uncle_of({person2}, {person1})")
-                if aunt_uncle_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s uncle."
+                    niece_nephew_check = safe_prolog_query(prolog, f"nephew_of({person1}, {person2})")
+                    if niece_nephew_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s nephew."
                 
-                # Check if one is a niece/nephew of the other
-                niece_nephew_check = safe_prolog_query(prolog, f"niece_of({person1}, {person2})")
-                if niece_nephew_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s niece."
+                    niece_nephew_check = safe_prolog_query(prolog, f"niece_of({person2}, {person1})")
+                    if niece_nephew_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s niece."
                 
-                niece_nephew_check = safe_prolog_query(prolog, f"nephew_of({person1}, {person2})")
-                if niece_nephew_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person1.capitalize()} is {person2.capitalize()}'s nephew."
+                    niece_nephew_check = safe_prolog_query(prolog, f"nephew_of({person2}, {person1})")
+                    if niece_nephew_check:
+                        return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s nephew."
                 
-                niece_nephew_check = safe_prolog_query(prolog, f"niece_of({person2}, {person1})")
-                if niece_nephew_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s niece."
+                # Check if they are cousins (have different parents who are siblings)
+                cousin_check = safe_prolog_query(prolog, f"parent_of(P1, {person1}), parent_of(P2, {person2}), sibling_of(P1, P2), P1 \\= P2")
+                if cousin_check:
+                    return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are cousins (their parents are siblings)."
                 
-                niece_nephew_check = safe_prolog_query(prolog, f"nephew_of({person2}, {person1})")
-                if niece_nephew_check:
-                    return f"That's impossible! {person1.capitalize()} cannot be a sibling of {person2.capitalize()} because {person2.capitalize()} is {person1.capitalize()}'s nephew."
+                # Check if they are second cousins (grandparents are siblings)
+                second_cousin_check = safe_prolog_query(prolog, f"parent_of(GP1, P1), parent_of(P1, {person1}), parent_of(GP2, P2), parent_of(P2, {person2}), sibling_of(GP1, GP2), GP1 \\= GP2")
+                if second_cousin_check:
+                    return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are second cousins (their grandparents are siblings)."
                 
                 # Check if they are already related in a way that precludes being siblings
                 # This includes uncle-niece, aunt-nephew, etc.
@@ -848,51 +934,47 @@ class RelationshipValidator:
                         return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be siblings because they are already related in a way that precludes being siblings."
                 
             except Exception as e:
-                print(f"Error checking impossible sibling relationships: {e}")
+                log.error("error checking impossible sibling relationships", error=e)
         
         # Always trigger full sibling clarification for new sibling relationships
         # This ensures we always ask if siblings are full or half siblings
-        return f"ask_full_sibling_clarification:{person1}:{person2}"
+        return ValidationOutcome.needs("ask_full_sibling_clarification", person1, person2)
     
-    def _check_grandparent_relationships(self, statement: str, fact: str, prolog, has_content: bool) -> str:
+    def _check_grandparent_relationships(self, statement: str, facts: List[Fact], prolog, has_content: bool) -> Union[str, ValidationOutcome]:
         """Check for grandparent relationship validation."""
         # Check for direct grandmother/grandfather statements
-        grandmother_match = re.search(r'grandmother_of\(([^,]+),\s*([^)]+)\)', fact)
-        grandfather_match = re.search(r'grandfather_of\(([^,]+),\s*([^)]+)\)', fact)
+        grandmother_fact = find_fact(facts, "grandmother_of")
+        grandfather_fact = find_fact(facts, "grandfather_of")
+        grandparent_fact = find_fact(facts, "grandparent_of")
         
-        if grandmother_match:
-            grandparent = grandmother_match.group(1)
-            grandchild = grandmother_match.group(2)
+        if grandmother_fact:
+            grandparent, grandchild = grandmother_fact.args
             
             # Check for hierarchical validation FIRST
             hierarchical_error = self._check_hierarchical_validation(grandparent, grandchild, prolog, has_content)
             if hierarchical_error:
                 return hierarchical_error
                 
-            return f"handle_direct_grandparent:{grandparent}:{grandchild}:female"
-        elif grandfather_match:
-            grandparent = grandfather_match.group(1)
-            grandchild = grandfather_match.group(2)
+            return ValidationOutcome.needs("handle_direct_grandparent", grandparent, grandchild, "female")
+        elif grandfather_fact:
+            grandparent, grandchild = grandfather_fact.args
             
             # Check for hierarchical validation FIRST
             hierarchical_error = self._check_hierarchical_validation(grandparent, grandchild, prolog, has_content)
             if hierarchical_error:
                 return hierarchical_error
                 
-            return f"handle_direct_grandparent:{grandparent}:{grandchild}:male"
-        elif "grandparent_of" in fact:
+            return ValidationOutcome.needs("handle_direct_grandparent", grandparent, grandchild, "male")
+        elif grandparent_fact:
             # Generic grandparent relationship
-            match = re.search(r'grandparent_of\(([^,]+),\s*([^)]+)\)', fact)
-            if match:
-                grandparent = match.group(1)
-                grandchild = match.group(2)
+            grandparent, grandchild = grandparent_fact.args
+            
+            # Check for hierarchical validation FIRST
+            hierarchical_error = self._check_hierarchical_validation(grandparent, grandchild, prolog, has_content)
+            if hierarchical_error:
+                return hierarchical_error
                 
-                # Check for hierarchical validation FIRST
-                hierarchical_error = self._check_hierarchical_validation(grandparent, grandchild, prolog, has_content)
-                if hierarchical_error:
-                    return hierarchical_error
-                    
-                return f"handle_direct_grandparent:{grandparent}:{grandchild}:unknown"
+            return ValidationOutcome.needs("handle_direct_grandparent", grandparent, grandchild, "unknown")
         
         return ""
     
@@ -900,6 +982,14 @@ class RelationshipValidator:
         """Check for hierarchical validation to prevent impossible relationships."""
         if not has_content:
             return ""
+        
+        # Within one consistent component of the generation index every relation checked
+        # below (parent, sibling, cousin, aunt, niece, ancestor either way) sits at another gap
+        gap = get_generation_index(current_kb_file).generation_gap(grandparent, grandchild)
+        if gap is not None:
+            if gap != 2:
+                return f"That's impossible! {grandparent.capitalize()} cannot be a grandparent of {grandchild.capitalize()} because they belong to incompatible generations."
+            return ""
             
         try:
             # Check if grandchild is already a parent of grandparent (impossible hierarchy)
@@ -961,12 +1051,23 @@ class RelationshipValidator:
                 return f"That's impossible! {grandparent.capitalize()} cannot be a grandparent of {grandchild.capitalize()} because {grandparent.capitalize()} is {grandchild.capitalize()}'s nephew."
             
         except Exception as e:
-            print(f"Error checking hierarchical validation: {e}")
+            log.error("error checking hierarchical validation", error=e)
         
         return ""
     
     def _check_parent_child_hierarchical_validation(self, parent: str, child: str, prolog) -> str:
         """Check for hierarchical validation to prevent impossible parent-child relationships."""
+        # Within one consistent component of the generation index the generation checks below
+        # (grandparent, sibling, cousin, aunt, niece, ancestor) come down to the gap
+        gap = get_generation_index(current_kb_file).generation_gap(parent, child)
+        if gap is not None:
+            if gap != 1:
+                return f"That's impossible! {parent.capitalize()} cannot be a parent of {child.capitalize()} because they belong to incompatible generations."
+            # Check if parent is already a child of child (impossible hierarchy)
+            if safe_prolog_query(prolog, f"parent_of({parent}, {child})"):
+                return f"That's impossible! {parent.capitalize()} cannot be a parent of {child.capitalize()} because {parent.capitalize()} is {child.capitalize()}'s child."
+            return ""
+        
         try:
             # Check if child is already a parent of parent (impossible hierarchy)
             child_is_parent = safe_prolog_query(prolog, f"parent_of({child}, {parent})")
@@ -1016,23 +1117,22 @@ class RelationshipValidator:
             if parent_is_niece_nephew:
                 return f"That's impossible! {parent.capitalize()} cannot be a parent of {child.capitalize()} because {parent.capitalize()} is {child.capitalize()}'s nephew."
             
+            # A longer chain (e.g. great-grandparent) would make the family tree circular
+            if get_reachability_index(current_kb_file).would_create_cycle(parent, child):
+                return f"That's impossible! {parent.capitalize()} cannot be a parent of {child.capitalize()} because {child.capitalize()} is {parent.capitalize()}'s ancestor."
+            
         except Exception as e:
-            print(f"Error checking parent-child hierarchical validation: {e}")
+            log.error("error checking parent-child hierarchical validation", error=e)
         
         return ""
     
-    def _check_aunt_uncle_relationships(self, statement: str, fact: str, prolog, has_content: bool) -> str:
+    def _check_aunt_uncle_relationships(self, statement: str, facts: List[Fact], prolog, has_content: bool) -> Union[str, ValidationOutcome]:
         """Check for aunt/uncle relationship validation."""
-        if "aunt_of" not in fact and "uncle_of" not in fact:
-            return ""
-        
-        # Extract aunt/uncle and niece/nephew names
-        match = re.search(r'(?:aunt|uncle)_of\(([^,]+),\s*([^)]+)\)', fact)
-        if not match:
+        aunt_uncle_fact = find_fact(facts, "aunt_of", "uncle_of")
+        if not aunt_uncle_fact:
             return ""
         
-        aunt_uncle = match.group(1)
-        niece_nephew = match.group(2)
+        aunt_uncle, niece_nephew = aunt_uncle_fact.args
         
         try:
             # Find the parent of the niece/nephew
@@ -1044,16 +1144,16 @@ class RelationshipValidator:
                 existing_sibling = safe_prolog_query(prolog, f"sibling_of({aunt_uncle}, {parent_name})")
                 if not existing_sibling:
                     # Trigger the new sophisticated aunt/uncle clarification
-                    return f"ask_aunt_uncle_sophisticated:{aunt_uncle}:{niece_nephew}:{parent_name}"
+                    return ValidationOutcome.needs("ask_aunt_uncle_sophisticated", aunt_uncle, niece_nephew, parent_name)
             else:
                 # No parent found - add aunt/uncle fact directly
-                return f"add_direct_aunt_uncle:{aunt_uncle}:{niece_nephew}"
+                return ValidationOutcome.needs("add_direct_aunt_uncle", aunt_uncle, niece_nephew)
         except Exception as e:
-            print(f"Error checking aunt/uncle relationship: {e}")
+            log.error("error checking aunt/uncle relationship", error=e)
         
         return ""
     
-    def _check_incestual_scenarios(self, fact: str, person_names: Set[str], prolog, has_content: bool) -> str:
+    def _check_incestual_scenarios(self, facts: List[Fact], person_names: Set[str], prolog, has_content: bool) -> str:
         """Check for complex incestual scenarios."""
         if has_content:  # Only query if we have content
             try:
@@ -1072,6 +1172,6 @@ class RelationshipValidator:
                                 return f"That's impossible! {person1.capitalize()} and {person2.capitalize()} cannot be each other's parents."
                 
             except Exception as e:
-                print(f"Error checking incestual scenarios: {e}")
+                log.error("error checking incestual scenarios", error=e)
         
         return "" 
\ No newline at end of file